@@ -1,13 +1,14 @@
 import heapq
 import time
 import Maze
+import SearchWorkspace
 import tracemalloc
 
 # A* Algorithm Implementation
 class AAStar:
 
     # Set up the A* search object
-    def __init__(self, maze: Maze.Maze, search_type="Graph"):
+    def __init__(self, maze: Maze.Maze, search_type="Graph", workspace: SearchWorkspace.SearchWorkspace = None, cost_policy="astar"):
 
         self.maze = maze
 
@@ -15,6 +16,13 @@ class AAStar:
         self.start = (maze.startx, maze.starty)
         self.end = (maze.endx, maze.endy)
 
+        # Inside the search every node is the single int index y * width + x,
+        # so heap entries are (f, g, int) instead of carrying a nested (x, y) tuple
+        # (the heap's int is the key x * height + y, see Maze.heap_key, so f / g ties still pop in (x, y) order)
+        self.width = maze.get_maze_x()
+        self.start_index = maze.index(maze.startx, maze.starty)
+        self.end_index = maze.index(maze.endx, maze.endy)
+
         # The Open Set: We use a list, but treat it as a min-heap (priority queue)
         """
         Update: I have figured out why the algorithm has inconsistent speeds and significantly slows down in the Tree variant.
@@ -50,19 +58,38 @@ class AAStar:
         """
         self.open_list = []
 
-        # G-Score: Tracks the actual cost from the start to any node we've found so far
-        self.g_score = {}
-
-        # Parent Map: How we rebuild the path. Maps child -> parent
-        self.parent_map = {}
-
-        # Visited/Closed Set: Only used for Graph Search to avoid re-exploring nodes
-        # A set is best here for instant lookups (O(1))
-        self.visited = set()
+        # G-Score, Parent Map and Visited/Closed Set all live in the workspace arrays, indexed by cell
+        #   workspace.seen[i] == epoch   -> g_score[i] is the best known cost to node i and parent[i] its parent (-1 for start)
+        #   workspace.closed[i] == epoch -> node i is closed, only used for Graph Search to avoid re-exploring nodes
+        # an array lookup is as instant as a set/dict lookup but skips the hashing, and the arrays are reused between runs
+        if workspace is None or not workspace.fits(maze):
+            workspace = SearchWorkspace.SearchWorkspace.for_maze(maze)
+        self.workspace = workspace
+        self._epoch = 0
+
+        # Resumable state (see SearchCheckpoint), with it the object holds everything the search needs
+        #   _started -> the start node has been pushed, search() must not initialise again
+        #   _pending -> the node yielded last but not expanded yet, -1 if none
+        #   steps    -> number of nodes yielded so far
+        self._started = False
+        self._pending = -1
+        self.steps = 0
+
+        # Work counters (see SearchWorkspace.SEARCH_COUNTERS), part of the resumable state too
+        # stale_pops and peak_frontier are the heap bloat described above, in numbers
+        self.generated = self.expanded = self.pushes = self.pops = self.stale_pops = 0
+        self.peak_frontier = self.peak_parents = 0
+
+        # Optional searchTrace.SearchTracer, times the phases of every N-th step
+        self.trace = None
 
         # Search toggle for "Graph" (default and prevents cycles) or "Tree" (allows for cycles)
         self.search_type = search_type
 
+        # Name of the Maze edge cost policy used for g-scores
+        # "astar" (cost of the entered tile) is the original rule, "ucs" gives the same costs as UCS
+        self.cost_policy = cost_policy
+
         # baseline for per-run memory delta
         self._mem_base = 0
 
@@ -84,23 +111,17 @@ class AAStar:
     def get_neighbours(self, x, y):
 
         # Finds all adjacent tiles that are within the maze boundaries and that are traversable
+        # The maze's neighbour table already holds them in Up, Down, Left, Right order (-1 when blocked)
 
         neighbours = []
 
-        maze_width = self.maze.get_maze_x()
-        maze_height = self.maze.get_maze_y()
+        table = self.maze.neighbour_table()
+        base = 4 * self.maze.index(x, y)
 
-        # Defines the 4 possible move changes: (dx, dy)
-        cardinal_moves = [(0, -1), (0, 1), (-1, 0), (1, 0)]  # Up, Down, Left, Right
-
-        for dx, dy in cardinal_moves:
-            nx, ny = x + dx, y + dy  # New x, New y
-
-            # Check boundaries first
-            if 0 <= nx < maze_width and 0 <= ny < maze_height:
-                # Check traversability
-                if self.maze.traversable(x, y, nx, ny):
-                    neighbours.append((nx, ny))
+        for d in range(4):
+            nxt = table[base + d]
+            if nxt >= 0:
+                neighbours.append(self.maze.coords(nxt))
 
         return neighbours
 
@@ -109,9 +130,8 @@ class AAStar:
     # Main A* loop
     def search(self):
 
-        # Ensure tracemalloc is running (visualiser *should* do this, but this makes A* robust)
-        if not tracemalloc.is_tracing():
-            tracemalloc.start()
+        # tracemalloc is started by whoever wants memory numbers (the visualiser does, headless batch runs
+        # can leave it off for speed), when it is not tracing every memory reading is just 0
 
         # Baseline at the start of THIS run
         self._mem_base, _ = tracemalloc.get_traced_memory()
@@ -119,69 +139,145 @@ class AAStar:
         # Implemented as a generator to feed steps to a visualiser
         # Yields (current_node, info_text, time_taken_ns) on each step
 
-        # Set up the starting node's scores and push it onto the heap
-        self.g_score[self.start] = 0.0
-        f_start = self.heuristic(self.start)
-        # Heap item structure: (f_score, g_score, node)
-        heapq.heappush(self.open_list, (f_start, 0.0, self.start))
-        self.parent_map[self.start] = None  # Start has no parent
+        # Fresh marks for this run, unless this search was restored from a checkpoint
+        if not self._started:
+            self._epoch = self.workspace.reset()
+        epoch = self._epoch
+        seen = self.workspace.seen
+        closed = self.workspace.closed
+        g_score = self.workspace.g_score
+        parent = self.workspace.parent
+        table = self.maze.neighbour_table()
+        width = self.width
+        height = self.maze.get_maze_y()
+        end = self.end_index
+        (gx, gy) = self.end
+        graph = self.search_type == "Graph"
+        edge_costs = self.maze.edge_costs(self.cost_policy)
+        open_list = self.open_list
+        trace = self.trace
+        sampled = False
+        # Frontier push, swapped for a timed one in traced expansions (see searchTrace)
+        push = heapq.heappush
+
+        # Counted in locals, written back before every yield
+        generated, expanded, pushes, pops = self.generated, self.expanded, self.pushes, self.pops
+        stale_pops, peak_frontier, peak_parents = self.stale_pops, self.peak_frontier, self.peak_parents
+
+        if not self._started:
+            self._started = True
+
+            # Set up the starting node's scores and push it onto the heap
+            start = self.start_index
+            seen[start] = epoch
+            g_score[start] = 0.0
+            parent[start] = -1  # Start has no parent
+            f_start = self.heuristic(self.start)
+            # Heap item structure: (f_score, g_score, node heap key)
+            heapq.heappush(open_list, (f_start, 0.0, self.maze.heap_key(start)))
+            pushes = peak_frontier = peak_parents = 1
 
         # Main search loop: continue while there are nodes to explore
-        while self.open_list:
-            step_start = time.perf_counter_ns()
+        # (or a node restored from a checkpoint still waits to be expanded)
+        while open_list or self._pending >= 0:
+            if self._pending >= 0:
+                current = self._pending
+            else:
+                step_start = time.perf_counter_ns()
+
+                # Pop the node with the lowest f-score (best estimate)
+                f_current, g_current, key = heapq.heappop(open_list)
+                current = (key % height) * width + key // height
+                pops += 1
+
+                # In Graph Search, we might have added this node before with a worse path
+                # If it's already visited, skip this outdated heap entry
+                if graph and closed[current] == epoch:
+                    stale_pops += 1
+                    continue
 
-            # Pop the node with the lowest f-score (best estimate)
-            f_current, g_current, current_node = heapq.heappop(self.open_list)
+                # Mark node as visited after processing its neighbours, if we were doing Tree Search
+                # For Graph Search, we mark it now
+                if graph:
+                    closed[current] = epoch
 
-            # In Graph Search, we might have added this node before with a worse path
-            # If it's already visited, skip this outdated heap entry
-            if self.search_type == "Graph" and current_node in self.visited:
-                continue
+                step_time = time.perf_counter_ns() - step_start
 
-            # Mark node as visited after processing its neighbours, if we were doing Tree Search
-            # For Graph Search, we mark it now
-            if self.search_type == "Graph":
-                self.visited.add(current_node)
+                # Memory in BYTES (delta since run start)
+                cur_mem, _ = tracemalloc.get_traced_memory()
+                mem_delta = cur_mem - self._mem_base
+                if mem_delta < 0:
+                    mem_delta = 0
 
-            step_time = time.perf_counter_ns() - step_start
+                # Remember the node until it is expanded, a checkpoint taken at the yield has to finish it later
+                self._pending = current
+                self.steps += 1
 
-            # Memory in BYTES (delta since run start)
-            cur_mem, _ = tracemalloc.get_traced_memory()
-            mem_delta = cur_mem - self._mem_base
-            if mem_delta < 0:
-                mem_delta = 0
+                self.generated, self.expanded, self.pushes, self.pops = generated, expanded, pushes, pops
+                self.stale_pops, self.peak_frontier, self.peak_parents = stale_pops, peak_frontier, peak_parents
 
-            # Send the current node back to the visualiser
-            yield current_node, "", step_time, mem_delta
+                sampled = trace is not None and trace.sampled(self.steps)
+                if sampled:
+                    trace.span("pop", step_start, step_start + step_time)
+                    yield_start = time.perf_counter_ns()
+
+                # Send the current node back to the visualiser
+                yield (current % width, current // width), "", step_time, mem_delta
+
+                if sampled:
+                    trace.span("yield", yield_start, time.perf_counter_ns())
 
             # Success (found the goal)
-            if current_node == self.end:
+            if sampled:
+                check_start = time.perf_counter_ns()
+            if current == end:
                 return
+            if sampled:
+                trace.span("goal_check", check_start, time.perf_counter_ns())
+                push = trace.expand_begin(push)
+
+            # Explore all valid neighbours, Up, Down, Left, Right
+            expanded += 1
+            base = 4 * current
+            for d in range(4):
+                neighbour = table[base + d]
+                if neighbour < 0:
+                    continue
+                generated += 1
 
-            # Explore all valid neighbours
-            (x, y) = current_node
-            neighbours = self.get_neighbours(x, y)
-
-            for neighbour in neighbours:
                 # Tree-search: don't immediately backtrack to the parent
-                if self.search_type == "Tree" and neighbour == self.parent_map.get(current_node):
+                if not graph and neighbour == parent[current]:
                     continue
 
-                # Calculate the cost to reach this neighbour through the current path
-                tentative_g = self.g_score.get(current_node, g_current) + self.maze.get_node_cost(neighbour[0], neighbour[1])
+                # Calculate the cost to reach this neighbour through the current path (one lookup in the edge cost table)
+                tentative_g = g_score[current] + edge_costs[base + d]
 
                 # Graph Search Optimisation: If our new path (tentative_g) is worse than or
                 # equal to the best path we've already found, ignore it
-                if self.search_type == "Graph" and tentative_g >= self.g_score.get(neighbour, float("inf")):
+                if graph and seen[neighbour] == epoch and tentative_g >= g_score[neighbour]:
                     continue
 
                 # We found a better path -> Record it.
-                self.parent_map[neighbour] = current_node
-                self.g_score[neighbour] = tentative_g
-                f_neighbour = tentative_g + self.heuristic(neighbour)
+                if seen[neighbour] != epoch:
+                    seen[neighbour] = epoch
+                    peak_parents += 1
+                parent[neighbour] = current
+                g_score[neighbour] = tentative_g
+                f_neighbour = tentative_g + abs(neighbour % width - gx) + abs(neighbour // width - gy)
 
                 # Push the new, better path onto the heap
-                heapq.heappush(self.open_list, (f_neighbour, tentative_g, neighbour))
+                push(open_list, (f_neighbour, tentative_g, (neighbour % width) * height + neighbour // width))
+                pushes += 1
+            if len(open_list) > peak_frontier:
+                peak_frontier = len(open_list)
+            if sampled:
+                trace.expand_end()
+                push = heapq.heappush
+
+            self._pending = -1
+
+        self.generated, self.expanded, self.pushes, self.pops = generated, expanded, pushes, pops
+        self.stale_pops, self.peak_frontier, self.peak_parents = stale_pops, peak_frontier, peak_parents
 
         # If the open list runs out before the goal is reached, the search failed
         yield None, "", 0, 0
@@ -190,18 +286,15 @@ class AAStar:
 
     def reconstruct_path(self):
 
-        #Walks backward from the end node using the parent_map to build the final path
+        #Walks backward from the end node using the parent links to build the final path
         #Returns the path list (start to end) or None if the goal wasn't reached
-        path = []
-        current = self.end
+        if self.workspace.epoch != self._epoch:
+            raise RuntimeError("The search workspace has been reused by another search since this one ran")
 
-        # Safety check: if the end node isn't in the map, no path exists
-        if current not in self.parent_map:
+        # Safety check: if the end node never got a parent, no path exists
+        path = self.workspace.path_to(self.end_index)
+        if path is None:
             return None
 
-        while current is not None:
-            path.append(current)
-            current = self.parent_map[current]
-
-        # Path was built backwards, so we flip it
-        return path[::-1]
\ No newline at end of file
+        # path_to already flips the walk to run start to end, only the tuples are left to build
+        return [(i % self.width, i // self.width) for i in path]
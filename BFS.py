@@ -1,138 +1,213 @@
 import Maze
+import SearchWorkspace
 import time
 import tracemalloc
+from collections import deque
 
 
 # BFS Algorithm Implementation
-class BFS: 
+class BFS:
 
     # Intialise the BFS search object
-    def __init__(self, maze: Maze.Maze, search_type="Graph"):
-        self.maze = maze 
-        
+    def __init__(self, maze: Maze.Maze, search_type="Graph", workspace: SearchWorkspace.SearchWorkspace = None):
+        self.maze = maze
+
         # Get start and end positions from the Maze object as tuples
         self.start = (maze.startx, maze.starty)
         self.end = (maze.endx, maze.endy)
-        
-        # A list to function as a queue (FIFO) for BFS (Uses .pop(0) to dequeue)
-        self.queue = [] 
-        
-        # Store visited nodes for Graph search, set for easy lookup
-        self.visited = set()
-        
-        # A dictionary to rebuild the path after the search is done, stores {child_node: parent_node}
-        self.parent_map = {}
-        
+
+        # Internally every node is the single int index y * width + x, tuples are only built when yielding
+        self.width = maze.get_maze_x()
+        self.start_index = maze.index(maze.startx, maze.starty)
+        self.end_index = maze.index(maze.endx, maze.endy)
+
+        # A deque to function as a queue (FIFO) for BFS, holds cell indices
+        self.queue = deque()
+
+        # Visited marks and the parent links live in the workspace arrays instead of a set and a dict
+        #   workspace.closed[i] == epoch -> node i is visited (Graph search)
+        #   workspace.seen[i] == epoch   -> workspace.parent[i] is the parent of node i, -1 for the start
+        # the workspace can be shared between runs so repeated searches don't allocate new containers
+        if workspace is None or not workspace.fits(maze):
+            workspace = SearchWorkspace.SearchWorkspace.for_maze(maze)
+        self.workspace = workspace
+        self._epoch = 0
+
+        # Resumable state (see SearchCheckpoint), everything else the search needs is in the fields above
+        #   _started -> the start node has been queued, search() must not initialise again
+        #   _pending -> the node yielded last but not expanded yet, -1 if none
+        #   steps    -> number of nodes yielded so far
+        self._started = False
+        self._pending = -1
+        self.steps = 0
+
+        # Work counters (see SearchWorkspace.SEARCH_COUNTERS), part of the resumable state too
+        self.generated = self.expanded = self.pushes = self.pops = self.stale_pops = 0
+        self.peak_frontier = self.peak_parents = 0
+
+        # Optional searchTrace.SearchTracer, times the phases of every N-th step
+        self.trace = None
+
         # Search toggle for Graph or Tree search, tree search can cause infinite loops
         self.search_type = search_type
 
         # Memory tracking variable
         self._mem_base = 0
-    
-    # Get valid neighbour nodes
+
+    # Get valid neighbour nodes as (x, y) tuples
     def get_neighbours(self, x, y):
         neighbours = []
-        
-        # Get the maze boundaries
-        maze_width = self.maze.get_maze_x()
-        maze_height = self.maze.get_maze_y()
-        
-        # Check up, if not at top edge and traversable
-        if y > 0 and self.maze.traversable(x, y, x, y -1):
-            neighbours.append((x, y - 1))
-            
-        # Check down, if not at bottom edge and traversable
-        if y < maze_height - 1 and self.maze.traversable(x, y, x, y + 1):
-            neighbours.append((x, y + 1))
-            
-        # Check left, if not at left edge and traversable
-        if x > 0 and self.maze.traversable(x, y, x - 1, y):
-            neighbours.append((x - 1, y))
-            
-        # Check right, if not at right edge and traversable
-        if x < maze_width - 1 and self.maze.traversable(x, y, x + 1, y):
-            neighbours.append((x + 1, y))
-            
+        table = self.maze.neighbour_table()
+        base = 4 * self.maze.index(x, y)
+
+        # Up, down, left, right, the table already drops walls and moves off the edge
+        for d in range(4):
+            nxt = table[base + d]
+            if nxt >= 0:
+                neighbours.append(self.maze.coords(nxt))
+
         return neighbours
-    
+
     # Search as a generator, returns one step at a time allowing visualisation without freezing
     def search(self):
-        # Start tracking memory if not already started
-        if not tracemalloc.is_tracing():
-            tracemalloc.start()
-
+        # Memory numbers are only real while tracemalloc is tracing, the visualiser starts it
+        # (it is left off for headless batch runs, where tracing would slow every allocation down)
         # Record the memory baseline
         self._mem_base, _ = tracemalloc.get_traced_memory()
 
-        # Add the start node to the queue and set its parent to None
-        self.queue.append(self.start) 
-        self.parent_map[self.start] = None 
-
-        # Mark the start node as visited for Graph search
-        if self.search_type == "Graph":
-            self.visited.add(self.start) 
+        # Fresh marks for this run, unless this search was restored from a checkpoint
+        if not self._started:
+            self._epoch = self.workspace.reset()
+        epoch = self._epoch
+        seen = self.workspace.seen
+        closed = self.workspace.closed
+        parent = self.workspace.parent
+        table = self.maze.neighbour_table()
+        width = self.width
+        end = self.end_index
+        graph = self.search_type == "Graph"
+        queue = self.queue
+        trace = self.trace
+        sampled = False
+        # Frontier push, swapped for a timed one in traced expansions (see searchTrace)
+        push = queue.append
+
+        # Counted in locals, written back before every yield
+        generated, expanded, pushes, pops = self.generated, self.expanded, self.pushes, self.pops
+        peak_frontier, peak_parents = self.peak_frontier, self.peak_parents
+
+        if not self._started:
+            self._started = True
+
+            # Add the start node to the queue and set its parent to None
+            queue.append(self.start_index)
+            seen[self.start_index] = epoch
+            parent[self.start_index] = -1
+            pushes = peak_frontier = peak_parents = 1
+
+            # Mark the start node as visited for Graph search
+            if graph:
+                closed[self.start_index] = epoch
 
         # Loop while there are still nodes to explore in the queue
-        while self.queue:
-            # Measure time and memory for this step
-            step_start = time.perf_counter_ns()
-            
-            # Pop the first node from the queue
-            current_node = self.queue.pop(0) 
+        # (a restored search can also owe the expansion of the node it yielded last)
+        while queue or self._pending >= 0:
+            if self._pending >= 0:
+                current = self._pending
+            else:
+                # Measure time and memory for this step
+                step_start = time.perf_counter_ns()
 
-            # Measure time for this step
-            step_time = time.perf_counter_ns() - step_start
+                # Pop the first node from the queue
+                current = queue.popleft()
+                pops += 1
 
-            # Measure time and memory for this step
-            cur_mem, _ = tracemalloc.get_traced_memory()
-            used_mem = cur_mem - self._mem_base
-            if used_mem < 0:
-                used_mem = 0
+                # Measure time for this step
+                step_time = time.perf_counter_ns() - step_start
 
+                # Measure time and memory for this step
+                cur_mem, _ = tracemalloc.get_traced_memory()
+                used_mem = cur_mem - self._mem_base
+                if used_mem < 0:
+                    used_mem = 0
 
-            # Yield the current node for visualization, this pauses the function here so the visualiser can update
-            yield current_node, "", step_time, used_mem
+                # Remember the node until it is expanded, so a checkpoint taken at the yield can finish it later
+                self._pending = current
+                self.steps += 1
 
-            # Check if we have reached the end and return
-            if current_node == self.end:
-                return 
+                self.generated, self.expanded, self.pushes, self.pops = generated, expanded, pushes, pops
+                self.peak_frontier, self.peak_parents = peak_frontier, peak_parents
+
+                sampled = trace is not None and trace.sampled(self.steps)
+                if sampled:
+                    trace.span("pop", step_start, step_start + step_time)
+                    yield_start = time.perf_counter_ns()
+
+                # Yield the current node for visualization, this pauses the function here so the visualiser can update
+                yield (current % width, current // width), "", step_time, used_mem
 
-            # Get neighbours of the current node as (x, y) tuples
-            (x, y) = current_node
-            neighbours = self.get_neighbours(x, y)
+                if sampled:
+                    trace.span("yield", yield_start, time.perf_counter_ns())
 
-            # Add neighbors to Queue
-            for neighbour in neighbours:
-                if self.search_type == "Graph":
+            # Check if we have reached the end and return
+            if sampled:
+                check_start = time.perf_counter_ns()
+            if current == end:
+                return
+            if sampled:
+                trace.span("goal_check", check_start, time.perf_counter_ns())
+                push = trace.expand_begin(push)
+
+            # Add neighbors to Queue, up, down, left, right
+            expanded += 1
+            base = 4 * current
+            for d in range(4):
+                neighbour = table[base + d]
+                if neighbour < 0:
+                    continue
+                generated += 1
+                if graph:
                     # Graph logic, only add unvisited neighbors
-                    if neighbour not in self.visited:
-                        self.visited.add(neighbour) 
-                        self.parent_map[neighbour] = current_node
-                        self.queue.append(neighbour) 
+                    if closed[neighbour] != epoch:
+                        closed[neighbour] = epoch
+                        seen[neighbour] = epoch
+                        parent[neighbour] = current
+                        push(neighbour)
+                        pushes += 1
+                        peak_parents += 1
                 else:
                     # Tree logic, add all neighbors except the parent
-                    if neighbour != self.parent_map.get(current_node):
-                        self.parent_map[neighbour] = current_node
-                        self.queue.append(neighbour) 
-        
+                    if neighbour != parent[current]:
+                        if seen[neighbour] != epoch:
+                            seen[neighbour] = epoch
+                            peak_parents += 1
+                        parent[neighbour] = current
+                        push(neighbour)
+                        pushes += 1
+            if len(queue) > peak_frontier:
+                peak_frontier = len(queue)
+            if sampled:
+                trace.expand_end()
+                push = queue.append
+
+            self._pending = -1
+
+        self.generated, self.expanded, self.pushes, self.pops = generated, expanded, pushes, pops
+        self.peak_frontier, self.peak_parents = peak_frontier, peak_parents
+
         # If queue is empty and end not found yield None to indicate failure
         yield None, "", 0, 0
 
     # Helper function to reconstruct path after search is complete
     def reconstruct_path(self):
-        # This is called after the search finds the end uses the parent_map to work backwards from the end to the start
-        path = []
-        # Start from the end node
-        current = self.end 
-        
-        # If the end never added to the map no path found
-        if self.end not in self.parent_map:
-            return None 
-
-        # Loop backwards until start node, parent is None
-        while current is not None:
-            path.append(current) 
-            current = self.parent_map[current]
-        
-        # Reverse the path to be from start to end and return
-        return path[::-1]
\ No newline at end of file
+        # This is called after the search finds the end uses the parent links to work backwards from the end to the start
+        if self.workspace.epoch != self._epoch:
+            raise RuntimeError("The search workspace has been reused by another search since this one ran")
+
+        # If the end never got a parent no path found
+        path = self.workspace.path_to(self.end_index)
+        if path is None:
+            return None
+
+        # Convert back to (x, y) tuples, path_to already runs from start to end
+        return [(i % self.width, i // self.width) for i in path]
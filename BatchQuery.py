@@ -0,0 +1,204 @@
+import heapq
+from array import array
+from collections import Counter
+from dataclasses import dataclass
+
+import Maze
+import SearchWorkspace
+
+
+@dataclass
+class BatchResult:
+    """Answers to a batch of (start, goal) queries, stored as flat arrays in query order."""
+
+    costs: array  # 'd', path cost of query k, -1 if the goal is unreachable
+    lengths: array  # 'i', number of moves of query k, -1 if the goal is unreachable
+    path_offsets: array  # 'i', the cells of query k are path_cells[path_offsets[k]:path_offsets[k + 1]]
+    path_cells: array  # 'i', every path concatenated, as cell indices (y * width + x)
+    width: int
+
+    def __len__(self):
+        return len(self.costs)
+
+    # Rebuild the path of query k as (x, y) tuples, None if the goal is unreachable
+    def path(self, k):
+        if not self.path_offsets:
+            raise ValueError("paths were not requested for this batch")
+        if self.lengths[k] < 0:
+            return None
+        start, stop = self.path_offsets[k], self.path_offsets[k + 1]
+        return [(i % self.width, i // self.width) for i in self.path_cells[start:stop]]
+
+
+# Answers many (start, goal) queries on one maze in a single call
+class BatchQuery:
+
+    # Queries sharing a start (or a goal) are answered from one shortest path tree:
+    #   * grouped by start: one forward search from the start settles every goal of the group
+    #   * grouped by goal: one backward search over the reversed edges settles every start of the group
+    # the neighbour and edge cost tables come from the maze, which builds them once,
+    # so nothing is re-derived per query the way a fresh BFS/UCS/AAStar instance does,
+    # and the per-cell scratch arrays live in a SearchWorkspace that is reused for every tree
+
+    # cost_policy is the name of a Maze edge cost policy:
+    #   "steps" every move costs 1 (what BFS minimises), "ucs" the UCS rule, "astar" the A* rule
+    def __init__(self, maze: Maze.Maze, cost_policy="steps", workspace: SearchWorkspace.SearchWorkspace = None):
+        if cost_policy not in Maze.EDGE_COST_POLICIES:
+            raise ValueError(f"Unknown cost policy: {cost_policy}")
+
+        self.maze = maze
+        self.cost_policy = cost_policy
+
+        # Scratch arrays shared by every tree of every query() call, built on first use if not given
+        self.workspace = workspace
+        self._heap = []
+
+    # Answer every (start, goal) pair, start and goal are (x, y) tuples
+    def query(self, pairs, with_paths=True) -> BatchResult:
+        width = self.maze.get_maze_x()
+        height = self.maze.get_maze_y()
+
+        # Convert to cell indices up front, this also validates the input
+        queries = []
+        for start, goal in pairs:
+            for (x, y) in (start, goal):
+                if not (0 <= x < width and 0 <= y < height):
+                    raise ValueError(f"Position ({x}, {y}) is out of bounds for a {width}x{height} maze.")
+            queries.append((start[1] * width + start[0], goal[1] * width + goal[0]))
+
+        # Group each query under whichever of its start or goal is shared by more queries
+        start_count = Counter(s for s, _ in queries)
+        goal_count = Counter(g for _, g in queries)
+        groups = {}
+        for k, (s, g) in enumerate(queries):
+            if start_count[s] >= goal_count[g]:
+                groups.setdefault((True, s), []).append(k)
+            else:
+                groups.setdefault((False, g), []).append(k)
+
+        costs = array("d", [-1.0]) * len(queries)
+        lengths = array("i", [-1]) * len(queries)
+        paths = [None] * len(queries) if with_paths else None
+
+        # One workspace serves every group, it is only reset (O(1)) between trees
+        if self.workspace is None or not self.workspace.fits(self.maze):
+            self.workspace = SearchWorkspace.SearchWorkspace.for_maze(self.maze)
+        closed = self.workspace.closed
+        g_score = self.workspace.g_score
+        parent = self.workspace.parent
+
+        for (forward, root), members in groups.items():
+            # Cells the search has to settle before it can stop
+            targets = {queries[k][1] if forward else queries[k][0] for k in members}
+            self._shortest_path_tree(root, forward, targets)
+            epoch = self.workspace.epoch
+
+            for k in members:
+                other = queries[k][1] if forward else queries[k][0]
+                if closed[other] != epoch:
+                    continue
+                costs[k] = g_score[other]
+
+                # Walk the tree from the other end back to the root
+                path = [other]
+                while path[-1] != root:
+                    path.append(parent[path[-1]])
+                lengths[k] = len(path) - 1
+                if with_paths:
+                    # A forward tree points back towards the start, a backward tree points on towards the goal
+                    if forward:
+                        path.reverse()
+                    paths[k] = path
+
+        # Pack the paths into one flat array
+        path_offsets = array("i")
+        path_cells = array("i")
+        if with_paths:
+            path_offsets.append(0)
+            for path in paths:
+                if path is not None:
+                    path_cells.extend(path)
+                path_offsets.append(len(path_cells))
+
+        return BatchResult(costs, lengths, path_offsets, path_cells, width)
+
+    # Single source search from root, forward over the neighbour table or backward over the reversed one
+    # stops early once every cell in targets is settled, the tree is left in the workspace:
+    # closed[i] == epoch marks settled cells, g_score holds their distance and parent points back to root
+    def _shortest_path_tree(self, root, forward, targets):
+        if forward:
+            table = self.maze.neighbour_table()
+        else:
+            table = self.maze.reverse_neighbour_table()
+        edge_costs = self.maze.edge_costs(self.cost_policy)
+        opposite = (1, 0, 3, 2)
+
+        workspace = self.workspace
+        epoch = workspace.reset()
+        seen = workspace.seen
+        closed = workspace.closed
+        g_score = workspace.g_score
+        parent = workspace.parent
+
+        remaining = len(targets)
+        seen[root] = epoch
+        g_score[root] = 0
+        parent[root] = -1
+
+        if self.cost_policy == "steps":
+            # Unit costs, a plain BFS already settles cells in order of distance
+            # the queue is the workspace's flat buffer, head and tail just move along it
+            queue = workspace.queue
+            queue[0] = root
+            closed[root] = epoch
+            if root in targets:
+                remaining -= 1
+            head, tail = 0, 1
+            while head < tail and remaining:
+                current = queue[head]
+                head += 1
+                base = 4 * current
+                for d in range(4):
+                    nxt = table[base + d]
+                    if nxt < 0 or closed[nxt] == epoch:
+                        continue
+                    closed[nxt] = epoch
+                    seen[nxt] = epoch
+                    g_score[nxt] = g_score[current] + 1
+                    parent[nxt] = current
+                    if nxt in targets:
+                        remaining -= 1
+                    queue[tail] = nxt
+                    tail += 1
+            return
+
+        # Weighted costs, Dijkstra with lazy deletion of outdated heap entries
+        heap = self._heap
+        heap.clear()
+        heap.append((0, root))
+        while heap and remaining:
+            current_cost, current = heapq.heappop(heap)
+            if closed[current] == epoch:
+                continue
+            closed[current] = epoch
+            if current in targets:
+                remaining -= 1
+
+            base = 4 * current
+            for d in range(4):
+                nxt = table[base + d]
+                if nxt < 0 or closed[nxt] == epoch:
+                    continue
+                # Backward edges are stored on the cell they lead into, so look the cost up from the other side
+                if forward:
+                    cost = current_cost + edge_costs[base + d]
+                else:
+                    cost = current_cost + edge_costs[4 * nxt + opposite[d]]
+                if seen[nxt] != epoch or cost < g_score[nxt]:
+                    seen[nxt] = epoch
+                    g_score[nxt] = cost
+                    parent[nxt] = current
+                    heapq.heappush(heap, (cost, nxt))
+
+        # The loop only stops once every target is settled or nothing reachable is left,
+        # so the g-score of every settled target is final here
@@ -1,12 +1,49 @@
 # Maze Class, defines the maze environment for pathfinding algorithms
+import hashlib
+import itertools
 import os
 import random
+import struct
+import sys
 import warnings
+from array import array
 
 import Node
 
 
+# Edge cost policies, each one gives the cost of moving from (x1, y1) to the adjacent (x2, y2)
+# they are only called while Maze.edge_costs builds its table, never inside a search loop
+def _steps_cost(maze, x1, y1, x2, y2):
+    # every move costs 1, what BFS minimises
+    return 1
+
+
+def _ucs_cost(maze, x1, y1, x2, y2):
+    # base cost 1 (0 for one ways) + cost of the entered bloc
+    return (1 if maze.traversable(x2, y2, x1, y1) else 0) + maze.get_node_cost(x2, y2)
+
+
+def _entry_cost(maze, x1, y1, x2, y2):
+    # cost of the entered bloc only, the rule A* has always used
+    return maze.get_node_cost(x2, y2)
+
+
+EDGE_COST_POLICIES = {
+    "steps": _steps_cost,
+    "ucs": _ucs_cost,
+    "astar": _entry_cost,
+}
+
+
+# Add a named cost policy, usable by UCS, AAStar and BatchQuery through their cost_policy argument
+def register_cost_policy(name: str, policy):
+    EDGE_COST_POLICIES[name] = policy
+
+
 class Maze:
+    # Move offsets (dx, dy) in the same up, down, left, right order as the traversable array
+    DIRECTIONS = ((0, -1), (0, 1), (-1, 0), (1, 0))
+
     # Instance variables
     startx: int
     starty: int
@@ -66,6 +103,24 @@ class Maze:
         self.path = []
         self.path_dirs = {}
 
+        # Lazily built lookup tables (see neighbour_table and edge_costs), cleared whenever the maze changes
+        self._neighbour_table = None
+        self._reverse_neighbour_table = None
+        self._edge_cost_tables = {}
+
+    # Build a width x height maze with every wall closed, meant to be filled in by randomize()
+    # (randomize rewrites every inner wall and cost, so this gives the same maze for a seed as any other starting layout)
+    @classmethod
+    def blank(cls, width: int, height: int):
+        if width < 1 or height < 1 or width * height < 2:
+            raise ValueError("A maze needs at least 2 cells")
+        layout = [[([False, False, False, False], 0) for _ in range(width)] for _ in range(height)]
+        endx, endy = (1, 0) if width > 1 else (0, 1)
+        # every node starts isolated, which is expected here so don't warn about it
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            return cls(layout, 0, 0, endx, endy)
+
     # Set the path found by a search algorithm
     def set_path(self, path: list[tuple[int, int]]):
         # Stores a found path
@@ -121,6 +176,192 @@ class Maze:
     def get_node_cost(self, x, y):
         return self.Maze[y][x].get_cost()
 
+    # Cell index helpers, a cell (x, y) is stored as the single int y * width + x in the flat tables
+    def index(self, x, y):
+        return y * self.maze_width + x
+
+    def coords(self, index):
+        y, x = divmod(index, self.maze_width)
+        return x, y
+
+    # UCS / A* heaps hold the column-major key x * height + y instead of the index, it sorts the same as the (x, y)
+    # tuple their heaps used to hold, so ties on cost still go the way they always did (the searches inline these)
+    def heap_key(self, index):
+        y, x = divmod(index, self.maze_width)
+        return x * self.maze_height + y
+
+    def heap_index(self, key):
+        x, y = divmod(key, self.maze_height)
+        return y * self.maze_width + x
+
+    # Flat table of directed neighbours, 4 entries per cell in up, down, left, right order
+    # entry 4 * i + d is the index of the cell reached by moving from cell i in direction d, or -1 if blocked
+    # built once and shared by every search on this maze, so the hot loops never call traversable()
+    def neighbour_table(self) -> array:
+        if self._neighbour_table is None:
+            width = self.maze_width
+            height = self.maze_height
+            table = array("i", [-1]) * (4 * width * height)
+            for y in range(height):
+                row = self.Maze[y]
+                for x in range(width):
+                    node = row[x]
+                    base = 4 * (y * width + x)
+                    # Moves that would leave the grid are dropped even if the node allows them
+                    if node.up and y > 0:
+                        table[base] = (y - 1) * width + x
+                    if node.down and y < height - 1:
+                        table[base + 1] = (y + 1) * width + x
+                    if node.left and x > 0:
+                        table[base + 2] = y * width + x - 1
+                    if node.right and x < width - 1:
+                        table[base + 3] = y * width + x + 1
+            self._neighbour_table = table
+        return self._neighbour_table
+
+    # Same layout as neighbour_table but for incoming edges
+    # entry 4 * j + d is the index of the cell in direction d of cell j that can move into j, or -1
+    def reverse_neighbour_table(self) -> array:
+        if self._reverse_neighbour_table is None:
+            forward = self.neighbour_table()
+            table = array("i", [-1]) * len(forward)
+            # Moving from i in direction d lands on j, so i sits in the opposite direction of j
+            opposite = (1, 0, 3, 2)
+            for k in range(len(forward)):
+                j = forward[k]
+                if j >= 0:
+                    table[4 * j + opposite[k & 3]] = k >> 2
+            self._reverse_neighbour_table = table
+        return self._reverse_neighbour_table
+
+    # Flat table of directed edge costs under a named policy, same layout as neighbour_table
+    # entry 4 * i + d is the cost of moving from cell i in direction d (0 where the move is blocked)
+    # computed once per policy, so a search pays a single array lookup per relaxation
+    def edge_costs(self, policy="ucs") -> array:
+        table = self._edge_cost_tables.get(policy)
+        if table is None:
+            if policy not in EDGE_COST_POLICIES:
+                raise ValueError(f"Unknown cost policy: {policy}")
+            cost_of = EDGE_COST_POLICIES[policy]
+
+            neighbours = self.neighbour_table()
+            width = self.maze_width
+            costs = [0] * len(neighbours)
+            for k in range(len(neighbours)):
+                j = neighbours[k]
+                if j >= 0:
+                    y1, x1 = divmod(k >> 2, width)
+                    y2, x2 = divmod(j, width)
+                    costs[k] = cost_of(self, x1, y1, x2, y2)
+
+            # Keep integer costs integral so reported path costs look the same as before
+            if all(isinstance(c, int) for c in costs):
+                table = array("q", costs)
+            else:
+                table = array("d", costs)
+            self._edge_cost_tables[policy] = table
+        return table
+
+    # Short hash of everything that defines the maze (size, walls, costs, start and end)
+    # two mazes with the same fingerprint behave identically for every search, whatever seed made them
+    def fingerprint(self) -> str:
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(struct.pack("<IIIIII", self.maze_width, self.maze_height,
+                                  self.startx, self.starty, self.endx, self.endy))
+        table = self.neighbour_table()
+        costs = array("q", [node.cost for row in self.Maze for node in row])
+        # hash little endian bytes so the fingerprint is the same on every machine
+        if sys.byteorder == "big":
+            table = array("i", table)
+            table.byteswap()
+            costs.byteswap()
+        digest.update(table.tobytes())
+        digest.update(costs.tobytes())
+        return digest.hexdigest()
+
+    # Like fingerprint, but the same for all 8 rotations / mirror images of the maze (start, end and the one-way
+    # walls turned along with it): the smallest hash of the 8 variants. mazeIndex uses it to catch copies that are the
+    # same problem turned around. The searches visit neighbours in a fixed order, so they can still take different
+    # steps on a turned copy, which is why SearchCheckpoint keeps the exact fingerprint
+    def canonical_fingerprint(self) -> str:
+        width, height = self.maze_width, self.maze_height
+        table = self.neighbour_table()
+        # Open moves of each cell as 4 bits, in DIRECTIONS order
+        moves = bytearray(width * height)
+        for k in range(len(table)):
+            if table[k] >= 0:
+                moves[k >> 2] |= 1 << (k & 3)
+        costs = [node.cost for row in self.Maze for node in row]
+
+        best = None
+        for transpose, flip_x, flip_y in itertools.product((False, True), repeat=3):
+            new_width, new_height = (height, width) if transpose else (width, height)
+
+            def place(x, y):
+                if transpose:
+                    x, y = y, x
+                return (new_width - 1 - x if flip_x else x), (new_height - 1 - y if flip_y else y)
+
+            # Where each direction points after the turn, then the same for every 4 bit move set
+            turned = []
+            for dx, dy in self.DIRECTIONS:
+                if transpose:
+                    dx, dy = dy, dx
+                turned.append(self.DIRECTIONS.index((-dx if flip_x else dx, -dy if flip_y else dy)))
+            remap = bytes(sum(1 << turned[d] for d in range(4) if mask >> d & 1) for mask in range(16))
+
+            new_moves = bytearray(len(moves))
+            new_costs = array("q", bytes(8 * len(costs)))
+            i = 0
+            for y in range(height):
+                for x in range(width):
+                    nx, ny = place(x, y)
+                    j = ny * new_width + nx
+                    new_moves[j] = remap[moves[i]]
+                    new_costs[j] = costs[i]
+                    i += 1
+            if sys.byteorder == "big":
+                new_costs.byteswap()
+
+            digest = hashlib.blake2b(digest_size=16)
+            digest.update(struct.pack("<IIIIII", new_width, new_height, *place(self.startx, self.starty),
+                                      *place(self.endx, self.endy)))
+            digest.update(new_moves)
+            digest.update(new_costs.tobytes())
+            variant = digest.hexdigest()
+            if best is None or variant < best:
+                best = variant
+        return best
+
+    # Whether the end can be reached from the start at all, following the one-way walls
+    # a flood fill over neighbour_table, far cheaper than running (let alone drawing) a search, so batch runs use it
+    # to throw unsolvable mazes away straight after randomize()
+    def is_solvable(self) -> bool:
+        table = self.neighbour_table()
+        start = self.index(self.startx, self.starty)
+        end = self.index(self.endx, self.endy)
+        if start == end:
+            return True
+        seen = bytearray(self.maze_width * self.maze_height)
+        seen[start] = 1
+        stack = [start]
+        while stack:
+            base = 4 * stack.pop()
+            for k in range(base, base + 4):
+                j = table[k]
+                if j >= 0 and not seen[j]:
+                    if j == end:
+                        return True
+                    seen[j] = 1
+                    stack.append(j)
+        return False
+
+    # Drop the cached tables, must be called after editing walls or costs by hand
+    def invalidate_tables(self):
+        self._neighbour_table = None
+        self._reverse_neighbour_table = None
+        self._edge_cost_tables = {}
+
     # Print the node at (x, y) for debugging
     def print_node(self, x, y):
         print(self.Maze[y][x])
@@ -175,6 +416,9 @@ class Maze:
         self.startx, self.starty = startx, starty
         self.endx, self.endy = endx, endy
 
+        # walls and costs are about to change so the cached tables are stale
+        self.invalidate_tables()
+
         # --------------------------------------------------
 
         """ OLD
@@ -0,0 +1,278 @@
+import heapq
+import os
+import struct
+import sys
+import zlib
+from array import array
+
+import AAStar
+import BFS
+import DFS
+import Maze
+import SearchWorkspace
+import UCS
+
+
+# Snapshots of an in-progress search, so long runs can be paused, moved or resumed after a crash
+#
+# A search object holds its whole state: the frontier (queue / stack / heap), the workspace arrays
+# (parent, g-score, seen and closed marks), the step counter and the node it yielded last but has not
+# expanded yet. Saving writes those out, loading rebuilds an object whose search() carries on from there.
+#
+# File layout (everything little endian):
+#   b"MZCK", format version (1 byte), then a zlib compressed body:
+#     maze fingerprint (16 bytes), width, height, start index, end index, steps, pending node, pending cost
+#     algorithm, search type, cost policy, seed token (length prefixed utf-8)
+#     frontier columns, seen cells, their parents and g-scores, closed cells (typed arrays)
+#     (UCS / A* heap entries are saved with the cell index in place of their heap key, see Maze.heap_key)
+#     the search counters, SearchWorkspace.SEARCH_COUNTERS order (typed array, version 2 on)
+# a version 1 checkpoint still loads, its search counts from zero again
+
+CHECKPOINT_MAGIC = b"MZCK"
+CHECKPOINT_VERSION = 2
+_READABLE_VERSIONS = (1, 2)
+
+# Algorithm classes by name, plus the attribute each one keeps its frontier in
+_ALGORITHMS = {
+    "BFS": (BFS.BFS, "queue"),
+    "DFS": (DFS.DFS, "stack"),
+    "UCS": (UCS.UCS, "queue"),
+    "AAStar": (AAStar.AAStar, "open_list"),
+}
+
+# Searches whose heap entries end in a heap key rather than a cell index
+_HEAP_KEYED = ("UCS", "AAStar")
+
+_HEADER = struct.Struct("<16sIIiiqqd")
+
+
+# --- Binary helpers ---------------------------------------------------
+
+def _pack_str(text: str) -> bytes:
+    raw = text.encode("utf-8")
+    return struct.pack("<H", len(raw)) + raw
+
+
+def _unpack_str(body: bytes, offset: int):
+    (length,) = struct.unpack_from("<H", body, offset)
+    offset += 2
+    return body[offset:offset + length].decode("utf-8"), offset + length
+
+
+def _pack_array(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return struct.pack("<cQ", values.typecode.encode("ascii"), len(values)) + values.tobytes()
+
+
+def _unpack_array(body: bytes, offset: int):
+    typecode, count = struct.unpack_from("<cQ", body, offset)
+    offset += 9
+    values = array(typecode.decode("ascii"))
+    size = values.itemsize * count
+    values.frombytes(body[offset:offset + size])
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values, offset + size
+
+
+# Frontier entries are either plain cell indices (BFS, DFS) or tuples like (cost, index) and (f, g, index)
+# they are stored column by column, int columns as 'q' and anything else as 'd'
+def _frontier_columns(frontier):
+    entries = list(frontier)
+    if not entries or not isinstance(entries[0], tuple):
+        return 0, [array("q", entries)]
+    columns = []
+    for values in zip(*entries):
+        typecode = "q" if all(isinstance(v, int) for v in values) else "d"
+        columns.append(array(typecode, values))
+    return len(columns), columns
+
+
+# --- Save / load ------------------------------------------------------
+
+def save_checkpoint(search, path, seed_token=""):
+    """Write the state of a started search to path (atomically, via a temp file)."""
+    name = type(search).__name__
+    if name not in _ALGORITHMS:
+        raise ValueError(f"Cannot checkpoint a {name} search")
+    if not search._started:
+        raise ValueError("The search has not started yet, there is nothing to save")
+
+    workspace = search.workspace
+    if workspace.epoch != search._epoch:
+        raise RuntimeError("The search workspace has been reused by another search since this one ran")
+
+    # Only the cells stamped in this run are worth saving
+    epoch = search._epoch
+    seen = array("i", [i for i in range(workspace.size) if workspace.seen[i] == epoch])
+    closed = array("i", [i for i in range(workspace.size) if workspace.closed[i] == epoch])
+    parents = array("i", [workspace.parent[i] for i in seen])
+    g_scores = array("d", [workspace.g_score[i] for i in seen])
+
+    maze = search.maze
+    frontier = getattr(search, _ALGORITHMS[name][1])
+    if name in _HEAP_KEYED:
+        frontier = [(*entry[:-1], maze.heap_index(entry[-1])) for entry in frontier]
+    tuple_size, columns = _frontier_columns(frontier)
+
+    body = [
+        _HEADER.pack(bytes.fromhex(maze.fingerprint()), maze.get_maze_x(), maze.get_maze_y(),
+                     search.start_index, search.end_index, search.steps, search._pending,
+                     float(getattr(search, "_pending_cost", 0))),
+        _pack_str(name),
+        _pack_str(search.search_type),
+        _pack_str(getattr(search, "cost_policy", "")),
+        _pack_str(seed_token or ""),
+        struct.pack("<B", tuple_size),
+    ]
+    body.extend(_pack_array(column) for column in columns)
+    body.extend(_pack_array(values) for values in (seen, parents, g_scores, closed))
+    body.append(_pack_array(array("q", [getattr(search, name) for name in SearchWorkspace.SEARCH_COUNTERS])))
+
+    data = CHECKPOINT_MAGIC + struct.pack("<B", CHECKPOINT_VERSION) + zlib.compress(b"".join(body))
+
+    # Write then rename, so a crash while saving never leaves a half written checkpoint behind
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as fh:
+        fh.write(data)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(path):
+    """Read a checkpoint file into a dict, use restore_search to turn it back into a search."""
+    with open(path, "rb") as fh:
+        data = fh.read()
+
+    if data[:4] != CHECKPOINT_MAGIC:
+        raise ValueError("Not a search checkpoint file")
+    if data[4] not in _READABLE_VERSIONS:
+        raise ValueError(f"Unsupported checkpoint version {data[4]}")
+    body = zlib.decompress(data[5:])
+
+    fingerprint, width, height, start, end, steps, pending, pending_cost = _HEADER.unpack_from(body, 0)
+    offset = _HEADER.size
+    algorithm, offset = _unpack_str(body, offset)
+    search_type, offset = _unpack_str(body, offset)
+    cost_policy, offset = _unpack_str(body, offset)
+    seed_token, offset = _unpack_str(body, offset)
+
+    (tuple_size,) = struct.unpack_from("<B", body, offset)
+    offset += 1
+    columns = []
+    for _ in range(max(1, tuple_size)):
+        column, offset = _unpack_array(body, offset)
+        columns.append(column)
+    if tuple_size:
+        frontier = list(zip(*columns))
+    else:
+        frontier = list(columns[0])
+
+    seen, offset = _unpack_array(body, offset)
+    parents, offset = _unpack_array(body, offset)
+    g_scores, offset = _unpack_array(body, offset)
+    closed, offset = _unpack_array(body, offset)
+    counters = {}
+    if data[4] >= 2:
+        values, offset = _unpack_array(body, offset)
+        counters = dict(zip(SearchWorkspace.SEARCH_COUNTERS, values))
+
+    return {
+        "fingerprint": fingerprint.hex(),
+        "width": width,
+        "height": height,
+        "start": start,
+        "end": end,
+        "steps": steps,
+        "pending": pending,
+        "pending_cost": pending_cost,
+        "algorithm": algorithm,
+        "search_type": search_type,
+        "cost_policy": cost_policy,
+        "seed_token": seed_token,
+        "frontier": frontier,
+        "seen": seen,
+        "parents": parents,
+        "g_scores": g_scores,
+        "closed": closed,
+        "counters": counters,
+    }
+
+
+def restore_search(state, maze: Maze.Maze, workspace: SearchWorkspace.SearchWorkspace = None):
+    """Rebuild a search from load_checkpoint's dict, its search() generator continues where the saved one stopped."""
+    if maze.fingerprint() != state["fingerprint"]:
+        raise ValueError("The checkpoint was taken on a different maze")
+
+    cls, frontier_attr = _ALGORITHMS[state["algorithm"]]
+    if state["cost_policy"]:
+        search = cls(maze, state["search_type"], workspace=workspace, cost_policy=state["cost_policy"])
+    else:
+        search = cls(maze, state["search_type"], workspace=workspace)
+
+    # Stamp the saved cells with a fresh epoch of the (possibly shared) workspace
+    workspace = search.workspace
+    epoch = workspace.reset()
+    for i, parent, g in zip(state["seen"], state["parents"], state["g_scores"]):
+        workspace.seen[i] = epoch
+        workspace.parent[i] = parent
+        workspace.g_score[i] = g
+    for i in state["closed"]:
+        workspace.closed[i] = epoch
+
+    # The frontier goes back in saved order
+    frontier = getattr(search, frontier_attr)
+    if state["algorithm"] in _HEAP_KEYED:
+        # Keys don't sort like indices, so the heap is rebuilt (its pop order only depends on the entries)
+        frontier.extend((*entry[:-1], maze.heap_key(entry[-1])) for entry in state["frontier"])
+        heapq.heapify(frontier)
+    else:
+        frontier.extend(state["frontier"])
+
+    search._epoch = epoch
+    search._started = True
+    search._pending = state["pending"]
+    search.steps = state["steps"]
+    for name, value in state.get("counters", {}).items():
+        setattr(search, name, value)
+    if hasattr(search, "_pending_cost"):
+        pending_cost = state["pending_cost"]
+        search._pending_cost = int(pending_cost) if pending_cost.is_integer() else pending_cost
+    return search
+
+
+def resume_search(path, maze: Maze.Maze, workspace: SearchWorkspace.SearchWorkspace = None):
+    """Shortcut for restore_search(load_checkpoint(path), maze)."""
+    return restore_search(load_checkpoint(path), maze, workspace)
+
+
+def run_with_checkpoints(search, path, every_steps=100_000, seed_token="", max_steps=None):
+    """Drive a search without a GUI, saving a checkpoint every every_steps yielded nodes.
+
+    Returns "success", "fail" or "timeout" (max_steps reached). A checkpoint is also written when
+    max_steps is reached or the run is interrupted, so an unfinished run can be resumed from path.
+    """
+    end = search.end
+    generator = search.search()
+    try:
+        for current_node, _, _, _ in generator:
+            if current_node is None:
+                return "fail"
+            if current_node == end:
+                return "success"
+            if every_steps and search.steps % every_steps == 0:
+                save_checkpoint(search, path, seed_token)
+            if max_steps is not None and search.steps >= max_steps:
+                save_checkpoint(search, path, seed_token)
+                return "timeout"
+        return "fail"
+    except BaseException:
+        # Ctrl+C or a crash inside the loop, keep the progress made so far
+        if search._started:
+            save_checkpoint(search, path, seed_token)
+        raise
+    finally:
+        generator.close()
@@ -0,0 +1,78 @@
+from array import array
+
+import Maze
+
+# Counters every search keeps about its own work, read back into RunMetrics after a run
+#   generated     neighbours reached through an open edge (before any visited / duplicate check)
+#   expanded      nodes whose neighbours were generated
+#   pushes, pops  entries added to / taken off the frontier (queue, stack or heap)
+#   stale_pops    pops thrown away because the node was already closed (outdated heap / stack entries)
+#   peak_frontier largest the frontier got
+#   peak_parents  cells with a parent link this run, i.e. the size the parent map would have as a dict
+# the searches count in locals and write them back to the object at every yield, so they cost next to nothing
+SEARCH_COUNTERS = ("generated", "expanded", "pushes", "pops", "stale_pops", "peak_frontier", "peak_parents")
+
+
+# Reusable scratch memory for searches on one maze size
+class SearchWorkspace:
+
+    # Every search needs a parent per cell, a g-score per cell and a visited mark per cell.
+    # Allocating fresh dicts/sets for that on every run churns the allocator and the GC,
+    # so instead the workspace keeps flat arrays (one slot per cell index y * width + x) and reuses them.
+    #
+    # Clearing the arrays between runs would cost O(cells), so entries are stamped with an epoch instead:
+    #   * seen[i] == epoch   -> parent[i] and g_score[i] were written during the current run
+    #   * closed[i] == epoch -> cell i was visited / expanded during the current run
+    # reset() bumps the epoch, which invalidates every stamp at once in O(1).
+
+    def __init__(self, size: int):
+        self.size = size
+
+        # Per-cell data, only meaningful where the matching stamp equals the epoch
+        self.parent = array("i", [-1]) * size
+        self.g_score = array("d", bytes(8 * size))
+
+        # Generation stamps
+        self.seen = array("I", bytes(4 * size))
+        self.closed = array("I", bytes(4 * size))
+
+        # Flat FIFO buffer, every cell is enqueued at most once per run in a Graph BFS so size cells is enough
+        self.queue = array("i", [0]) * size
+
+        # Largest stamp the arrays can hold before the epoch has to wrap around
+        self._max_epoch = (1 << (8 * self.seen.itemsize)) - 1
+
+        # Stamps start at 0, so the first run uses epoch 1
+        self.epoch = 0
+        self.reset()
+
+    @classmethod
+    def for_maze(cls, maze: Maze.Maze):
+        return cls(maze.get_maze_x() * maze.get_maze_y())
+
+    # Check that this workspace is big enough for the given maze
+    def fits(self, maze: Maze.Maze):
+        return self.size >= maze.get_maze_x() * maze.get_maze_y()
+
+    # Start a new run, returns the epoch to stamp entries with
+    def reset(self):
+        self.epoch += 1
+        if self.epoch > self._max_epoch:
+            # Only after ~4 billion runs, stale stamps could now collide so clear them for real
+            zero = bytes(4 * self.size)
+            self.seen = array("I", zero)
+            self.closed = array("I", zero)
+            self.epoch = 1
+        return self.epoch
+
+    # Walk the parent links of the current run back from index, returns the cell indices from root to index
+    # None if index was not reached in this run
+    def path_to(self, index):
+        if self.seen[index] != self.epoch:
+            return None
+        path = []
+        while index >= 0:
+            path.append(index)
+            index = self.parent[index]
+        path.reverse()
+        return path
@@ -3,6 +3,7 @@ import time
 import tracemalloc
 
 import Maze
+import SearchWorkspace
 
 
 class UCS:
@@ -17,122 +18,212 @@ class UCS:
     end: tuple[int, int]
     pathing: list[tuple[int, int]]
     text: bool # flag to define the return to be for gui or for text based terminals
-    parent_map: dict[tuple[int, int], tuple[int, int]]
-    visited: set
+    workspace: SearchWorkspace.SearchWorkspace # holds the closed set and parent links as flat arrays
 
-    def __init__(self, maze: Maze.Maze, search_type="Graph", text=False):
+    def __init__(self, maze: Maze.Maze, search_type="Graph", text=False, workspace: SearchWorkspace.SearchWorkspace = None, cost_policy="ucs"):
 
         # define the maze and the start and end of said maze
         self.execution_time = 0
         self.maze = maze
         self.start = (maze.startx, maze.starty)
         self.end = (maze.endx, maze.endy)
-        self.parent_map = {}
+        # nodes are handled as the int index y * width + x inside the search, tuples only at the edges
+        self.width = maze.get_maze_x()
+        self.start_index = maze.index(maze.startx, maze.starty)
+        self.end_index = maze.index(maze.endx, maze.endy)
+        if workspace is None or not workspace.fits(maze):
+            workspace = SearchWorkspace.SearchWorkspace.for_maze(maze)
+        self.workspace = workspace
+        self._epoch = 0
         self.pathing = [self.start]
         self.search_type = search_type
         self.text = text
         self.temp = {}
+        # name of the Maze edge cost policy, "ucs" is the original rule, "astar" makes results comparable with A*
+        self.cost_policy = cost_policy
+
+        # open set, heap entries are (cost, heap key), kept on the object so a checkpoint can save it
+        # the key is x * height + y (see Maze.heap_key) so equal costs pop in (x, y) order like they always have
+        self.queue = []
+
+        # Resumable state (see SearchCheckpoint)
+        #   _started -> the start node has been pushed, search() must not initialise again
+        #   _pending / _pending_cost -> the node yielded last but not expanded yet (-1 if none) and its cost
+        #   steps -> number of nodes yielded so far
+        self._started = False
+        self._pending = -1
+        self._pending_cost = 0
+        self.steps = 0
+
+        # Work counters (see SearchWorkspace.SEARCH_COUNTERS), part of the resumable state too
+        # (no stale pops here, a node is never pushed while it is still queued)
+        self.generated = self.expanded = self.pushes = self.pops = self.stale_pops = 0
+        self.peak_frontier = self.peak_parents = 0
+
+        # Optional searchTrace.SearchTracer, times the phases of every N-th step
+        self.trace = None
 
     def search(self):
         start_time = time.time_ns() # start the timer
-        tracemalloc.start()
-        queue = [(0, self.start)] # open set
-        self.parent_map[self.start] = None
-        # dict to store shortest path to visited nodes
-        self.visited = set() # closed set
+        # tracemalloc is left to the caller (the visualiser starts it), peak reads 0 when it is not tracing
+
+        # Fresh marks for this run, the workspace arrays stand in for the old visited set and parent dict
+        #   closed[i] == epoch -> node i is in the closed set
+        #   seen[i] == epoch   -> parent[i] is the parent of node i, -1 for the start
+        # (a search restored from a checkpoint keeps the marks it was saved with)
+        if not self._started:
+            self._epoch = self.workspace.reset()
+        epoch = self._epoch
+        seen = self.workspace.seen
+        closed = self.workspace.closed
+        parent = self.workspace.parent
+        table = self.maze.neighbour_table()
+        width = self.width
+        height = self.maze.get_maze_y()
+        end = self.end_index
+        tree = self.search_type == "Tree"
+        edge_costs = self.maze.edge_costs(self.cost_policy)
+
+        queue = self.queue
+        trace = self.trace
+        sampled = False
+        # Frontier push, swapped for a timed one in traced expansions (see searchTrace)
+        push = heapq.heappush
+
+        # Counted in locals, written back before every yield
+        generated, expanded, pushes, pops = self.generated, self.expanded, self.pushes, self.pops
+        peak_frontier, peak_parents = self.peak_frontier, self.peak_parents
+
+        if not self._started:
+            self._started = True
+            queue.append((0, self.maze.heap_key(self.start_index)))
+            seen[self.start_index] = epoch
+            parent[self.start_index] = -1
+            pushes = peak_frontier = peak_parents = 1
         # succeeded = []
-        while queue:
-            # pops the node with the lowest cost from the queue
-            current_cost, current_node = heapq.heappop(queue) # get info of the current node and pathing to get to the path
-
-            self.visited.add(current_node) # add current node to visited
-
-            # return the path and the cost of the path is goal is reached
-            if current_node == self.end:
-                # self.pathing += pathing
-                # self.execution_time = time.time_ns() - start_time  # end the timer and save it within the object
-                if self.text:
-                    tracemalloc.stop()
-                    return "UCS:\n" + str(self.maze) + "\nPath found with " + str(len(self.pathing)) + " steps with " + str(current_cost) + " cost\nFull path: " + str(self.pathing)
-                else:
+        while queue or self._pending >= 0:
+            if self._pending >= 0:
+                # resumed from a checkpoint taken right after this node was yielded
+                current, current_cost = self._pending, self._pending_cost
+            else:
+                # the step about to be yielded, every N-th one is timed phase by phase
+                sampled = trace is not None and trace.sampled(self.steps + 1)
+                if sampled:
+                    pop_start = time.perf_counter_ns()
+
+                # pops the node with the lowest cost from the queue
+                current_cost, key = heapq.heappop(queue) # get info of the current node and pathing to get to the path
+                current = (key % height) * width + key // height
+                pops += 1
+                current_node = (current % width, current // width) # tuple form, only for what leaves the generator
+
+                closed[current] = epoch # add current node to visited
+
+                # remember it until it is expanded, so a checkpoint taken at the yield can finish it later
+                self._pending, self._pending_cost = current, current_cost
+                self.steps += 1
+
+                self.generated, self.expanded, self.pushes, self.pops = generated, expanded, pushes, pops
+                self.peak_frontier, self.peak_parents = peak_frontier, peak_parents
+
+                if sampled:
+                    check_start = time.perf_counter_ns()
+                    trace.span("pop", pop_start, check_start)
+                at_goal = current == end
+                if sampled:
+                    yield_start = time.perf_counter_ns()
+                    trace.span("goal_check", check_start, yield_start)
+
+                # return the path and the cost of the path is goal is reached
+                if at_goal:
+                    # self.pathing += pathing
+                    # self.execution_time = time.time_ns() - start_time  # end the timer and save it within the object
+                    if self.text:
+                        return "UCS:\n" + str(self.maze) + "\nPath found with " + str(len(self.pathing)) + " steps with " + str(current_cost) + " cost\nFull path: " + str(self.pathing)
+                    else:
+                        _, peak = tracemalloc.get_traced_memory()
+                        yield current_node, f"current node: {str(current_node)}   current cost: {str(current_cost)}", time.time_ns() - start_time, peak
+
+                # yielding current node to the GUI
+                elif not self.text:
                     _, peak = tracemalloc.get_traced_memory()
-                    yield current_node, f"current node: {str(current_node)}   current cost: {str(current_cost)}", time.time_ns() - start_time, peak
+                    yield current_node, f"current node: {str(current_node)}   current cost: {str(current_cost)}\nmem use: {peak}", time.time_ns() - start_time, peak
 
-            # yielding current node to the GUI
-            elif not self.text:
-                _, peak = tracemalloc.get_traced_memory()
-                yield current_node, f"current node: {str(current_node)}   current cost: {str(current_cost)}\nmem use: {peak}", time.time_ns() - start_time, peak
+                if sampled:
+                    trace.span("yield", yield_start, time.perf_counter_ns())
 
             start_time = time.time_ns()  # restart the timer
-
-            # explore the neighbors
-            neighbors = self.maze.get_traversable_array(current_node[0], current_node[1])
-            for y in range(len(neighbors)):
-                if neighbors[y]:
-                    # it is expected that the maze used to run this does not have nodes that can travel into the void
-                    # so we are not checking that here
-
-                    # get next node
-                    if y == 0: # up
-                        next_node = (current_node[0], current_node[1] - 1)
-                    elif y == 1: # down
-                        next_node = (current_node[0], current_node[1] + 1)
-                    elif y == 2: # left
-                        next_node = (current_node[0] - 1, current_node[1])
-                    else: # right
-                        next_node = (current_node[0] + 1, current_node[1])
-
-                    # when tree search dont check the visited list but still maintain it
-                    if (not next_node in self.visited or self.search_type == "Tree") or next_node == self.end:
-                        # succeeded.append(next_node)
-                        if next_node not in self.parent_map:
-                            self.parent_map[next_node] = current_node
-                        # next_node_pathing = pathing + [next_node] # modify the pathing array
-                        next_node_cost = current_cost + self.get_cost(current_node, next_node) # adds the cost to travel to the next node, default cost per node is 1
-
-                        # if the current node is a deadend then dont push it into the queue
-                        in_queue = False
-
-                        # check if next node is already in queue, if so dont put it in again
-                        for t in queue:
-                            in_queue = t[1] == next_node
-                            if in_queue:
-                                break
-
-                        if not in_queue:
-                            heapq.heappush(queue, (next_node_cost, next_node)) # push the next node into the queue
+            if sampled:
+                push = trace.expand_begin(push)
+
+            # explore the neighbors, up, down, left, right
+            # the neighbour table already drops walls and moves off the edge of the maze
+            expanded += 1
+            base = 4 * current
+            for d in range(4):
+                next_node = table[base + d]
+                if next_node < 0:
+                    continue
+                generated += 1
+
+                # when tree search dont check the visited list but still maintain it
+                if (closed[next_node] != epoch or tree) or next_node == end:
+                    # succeeded.append(next_node)
+                    if seen[next_node] != epoch:
+                        seen[next_node] = epoch
+                        parent[next_node] = current
+                        peak_parents += 1
+                    # adds the cost to travel to the next node, looked up in the maze's precomputed edge costs
+                    next_node_cost = current_cost + edge_costs[base + d]
+                    next_key = (next_node % width) * height + next_node // width
+
+                    # if the current node is a deadend then dont push it into the queue
+                    in_queue = False
+
+                    # check if next node is already in queue, if so dont put it in again
+                    for t in queue:
+                        in_queue = t[1] == next_key
+                        if in_queue:
+                            break
+
+                    if not in_queue:
+                        push(queue, (next_node_cost, next_key)) # push the next node into the queue
+                        pushes += 1
+            if len(queue) > peak_frontier:
+                peak_frontier = len(queue)
+            if sampled:
+                trace.expand_end()
+                push = heapq.heappush
+
+            self._pending = -1
+
+        self.generated, self.expanded, self.pushes, self.pops = generated, expanded, pushes, pops
+        self.peak_frontier, self.peak_parents = peak_frontier, peak_parents
 
         # yield for GUI
         if not self.text:
-            tracemalloc.stop()
             yield None, "", 0, 0
         else:
-            tracemalloc.stop()
             return "Path not found"
 
     # function to get the cost to traverse to a coord
-    # current rules: base cost 1 (0 for one ways) + cost of bloc
+    # the rule comes from the cost policy, by default: base cost 1 (0 for one ways) + cost of bloc
     def get_cost(self, current_node, next_node):
-        return (1 if self.maze.traversable(next_node[0], next_node[1], current_node[0], current_node[1]) else 0) + self.maze.get_node_cost(next_node[0], next_node[1])
+        return Maze.EDGE_COST_POLICIES[self.cost_policy](self.maze, current_node[0], current_node[1], next_node[0], next_node[1])
 
     # Helper function to reconstruct path after search is complete
     def reconstruct_path(self):
-        # This is called after the search finds the end uses the parent_map to work backwards from the end to the start
-        path = []
-        # Start from the end node
-        current = self.end
+        # This is called after the search finds the end uses the parent links to work backwards from the end to the start
+        if self.workspace.epoch != self._epoch:
+            raise RuntimeError("The search workspace has been reused by another search since this one ran")
 
-        # If the end never added to the map no path found
-        if self.end not in self.parent_map:
+        # If the end never got a parent no path found
+        path = self.workspace.path_to(self.end_index)
+        if path is None:
             return None
 
-        # Loop backwards until start node, parent is None
-        while current is not None:
-            path.append(current)
-            current = self.parent_map[current]
-
-        # Reverse the path to be from start to end and return
-        return path[::-1]
+        # Convert back to (x, y) tuples, path_to already runs from start to end
+        return [(i % self.width, i // self.width) for i in path]
 
         # return self.pathing
 
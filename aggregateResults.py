@@ -0,0 +1,445 @@
+# Aggregates batch result CSVs into summary statistics, and regenerates the README comparison table from them
+#
+# the rows are streamed (one CSV row in memory at a time) into per group accumulators:
+#   - mean and variance: Welford's online update (sweepScheduler.RunningStats)
+#   - percentiles: exact from the values themselves for the first EXACT_SAMPLES of a group (a batch's groups are
+#     usually far smaller), past that the P² estimator (Jain & Chlamtac), five markers per percentile
+#   - success rate: a count per status
+# so memory depends only on the number of groups, not on the number of rows, and multi GB result sets work.
+#
+# inputs are batch_results_*.csv / sweep_results_*.csv files, plain or gzip, given as files, directories or globs.
+# older CSVs without some columns (e.g. path_cost) are fine, the missing metrics are just empty.
+#
+# usage:
+#   python aggregateResults.py batch_outputs/                               table grouped by algorithm
+#   python aggregateResults.py results/*.csv.gz --group-by algorithm,status,wall --bucket 10
+#   python aggregateResults.py batch_outputs/ --readme                      print the README comparison table
+#   python aggregateResults.py batch_outputs/ --update-readme README.md     ... and write it into the README
+import argparse
+import json
+import math
+import sys
+from array import array
+from collections import Counter
+from pathlib import Path
+
+from SearchWorkspace import SEARCH_COUNTERS
+from batchCore import ALGO_OPTIONS, decode_seed_token
+from searchMemory import MEMORY_FIELDS
+from seedStream import RESULT_PATTERNS, expand_seed_paths, iter_result_rows
+from sweepScheduler import RunningStats
+
+# Numeric CSV columns that get statistics
+METRICS = ("steps", "unique_visited", "repeats", "path_len", "path_cost", "reported_time_ns", "wall_time_ns",
+           "avg_mem_bytes", *SEARCH_COUNTERS, *MEMORY_FIELDS)
+
+# What rows can be grouped by, wall / oneway are bucketed by --bucket, size and max_cost come from the seed token
+# (or the width / height / max_cost columns of sweep CSVs from before the v2 token)
+GROUP_KEYS = ("algorithm", "search_type", "status", "wall", "oneway", "size", "max_cost")
+
+DEFAULT_PERCENTILES = (50, 90, 99)
+
+# Values per group and metric kept for exact percentiles, P² only takes over for groups bigger than this
+# (P² is poor on small samples: with a handful of values its markers barely move off the median)
+EXACT_SAMPLES = 4096
+
+# The README table rows: (label, metric whose mean is shown), plus a success rate row
+README_HEADING = "Graph Search Comparison Table"
+README_ROWS = (
+    ("Avg. Path Length", "path_len"),
+    ("Avg. Nodes Explored", "steps"),
+    ("Avg. Path Cost", "path_cost"),
+)
+
+
+class P2Quantile:
+    """Streaming estimate of one quantile with the P² algorithm, constant memory and O(1) per value.
+
+    The first five values are kept exactly, after that five markers track the min, the p/2, p, (1+p)/2 quantiles
+    and the max, nudged towards their ideal positions with a piecewise parabolic fit.
+    """
+
+    def __init__(self, p: float):
+        if not 0 < p < 1:
+            raise ValueError("p must be between 0 and 1")
+        self.p = p
+        self.count = 0
+        self._heights = []
+        self._positions = [0, 1, 2, 3, 4]
+        self._desired = [0, 2 * p, 4 * p, 2 + 2 * p, 4]
+        self._increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def add(self, value):
+        self.count += 1
+        q = self._heights
+        if self.count <= 5:
+            q.append(value)
+            if self.count == 5:
+                q.sort()
+            return
+
+        n = self._positions
+        # Cell of the new value, stretching the end markers if it is a new min / max
+        if value < q[0]:
+            q[0] = value
+            k = 0
+        elif value >= q[4]:
+            q[4] = value
+            k = 3
+        else:
+            k = 0
+            while value >= q[k + 1]:
+                k += 1
+
+        for i in range(k + 1, 5):
+            n[i] += 1
+        # (only the middle markers' desired positions are ever used, the end ones sit at the min / max)
+        desired = self._desired
+        increments = self._increments
+        desired[1] += increments[1]
+        desired[2] += increments[2]
+        desired[3] += increments[3]
+
+        # Move the middle markers that are off by a position or more
+        for i in range(1, 4):
+            d = desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                height = self._parabolic(i, d)
+                if not q[i - 1] < height < q[i + 1]:
+                    height = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = height
+                n[i] += d
+
+    def _parabolic(self, i, d):
+        q, n = self._heights, self._positions
+        return q[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    @property
+    def value(self):
+        if not self.count:
+            return None
+        if self.count > 5:
+            return self._heights[2]
+        # Too few values for the markers, interpolate between the exact ones
+        return exact_quantile(sorted(self._heights), self.p)
+
+
+def exact_quantile(ordered, p: float):
+    """Quantile p of sorted values, linear interpolation between the closest ranks."""
+    rank = p * (len(ordered) - 1)
+    low = math.floor(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+class MetricStats:
+    """Mean / variance / percentiles of one metric in one group."""
+
+    def __init__(self, percentiles):
+        self.running = RunningStats()
+        self.percentiles = percentiles
+        # The values themselves until there are more than EXACT_SAMPLES, then P² estimators (None until then)
+        self.samples = array("d")
+        self.quantiles = None
+
+    def add(self, value):
+        self.running.add(value)
+        if self.quantiles is not None:
+            for quantile in self.quantiles.values():
+                quantile.add(value)
+            return
+        self.samples.append(value)
+        if len(self.samples) > EXACT_SAMPLES:
+            # Hand over to P², fed the buffered values in the order they came
+            self.quantiles = {pct: P2Quantile(pct / 100) for pct in self.percentiles}
+            for buffered in self.samples:
+                for quantile in self.quantiles.values():
+                    quantile.add(buffered)
+            self.samples = array("d")
+
+    def percentile_values(self):
+        """{pct: value}, exact while the samples are kept, else the P² estimates kept in order (p99 >= p90 ...)."""
+        if self.quantiles is None:
+            ordered = sorted(self.samples)
+            return {pct: exact_quantile(ordered, pct / 100) if ordered else None for pct in self.percentiles}
+        values = {}
+        highest = -math.inf
+        for pct in sorted(self.quantiles):
+            highest = max(highest, self.quantiles[pct].value)
+            values[pct] = highest
+        return {pct: values[pct] for pct in self.percentiles}
+
+    def summary(self):
+        running = self.running
+        return {
+            "n": running.n,
+            "mean": running.mean if running.n else None,
+            "variance": running.variance,
+            "std": math.sqrt(running.variance),
+            **{f"p{pct:g}": value for pct, value in self.percentile_values().items()},
+        }
+
+
+class GroupStats:
+    """Everything aggregated for one group of rows."""
+
+    def __init__(self, percentiles):
+        self.percentiles = percentiles
+        self.rows = 0
+        self.statuses = Counter()
+        self.metrics = {}
+
+    def add(self, row):
+        self.rows += 1
+        self.statuses[row.get("status") or ""] += 1
+        for metric in METRICS:
+            raw = row.get(metric)
+            if raw in (None, ""):
+                continue
+            try:
+                value = float(raw)
+            except ValueError:
+                continue
+            stats = self.metrics.get(metric)
+            if stats is None:
+                stats = self.metrics[metric] = MetricStats(self.percentiles)
+            stats.add(value)
+
+    @property
+    def success_rate(self):
+        return self.statuses["success"] / self.rows if self.rows else 0.0
+
+    def mean(self, metric):
+        stats = self.metrics.get(metric)
+        return stats.running.mean if stats is not None and stats.running.n else None
+
+    def summary(self):
+        return {
+            "rows": self.rows,
+            "success_rate": self.success_rate,
+            "statuses": dict(self.statuses),
+            "metrics": {metric: stats.summary() for metric, stats in self.metrics.items()},
+        }
+
+
+# --- Reading ---
+
+def iter_rows(sources):
+    """Every row of every result file (CSV, plain or gzip, or columnar .mzcol) the sources expand to, one at a time."""
+    paths = expand_seed_paths(sources, patterns=RESULT_PATTERNS)
+    if not paths:
+        raise ValueError(f"No result CSVs found for {', '.join(map(str, sources))}")
+    for path in paths:
+        yield from iter_result_rows(path)
+
+
+def _bucket(raw, width):
+    try:
+        value = int(float(raw))
+    except (TypeError, ValueError):
+        return "?"
+    if width <= 1:
+        return str(value)
+    low = value // width * width
+    return f"{low}-{low + width - 1}"
+
+
+def _token_payload(row, cache):
+    # Decoding a token is cheap, but a batch has 8 rows per token
+    token = row.get("seed_token") or ""
+    if cache.get("token") != token:
+        cache["token"] = token
+        cache["payload"] = decode_seed_token(token)
+    return cache["payload"]
+
+
+def group_key(row, group_by, bucket, cache):
+    key = []
+    for name in group_by:
+        if name == "wall":
+            key.append(_bucket(row.get("wall_pct"), bucket))
+        elif name == "oneway":
+            key.append(_bucket(row.get("oneway_pct"), bucket))
+        elif name == "size":
+            width, height = row.get("width"), row.get("height")
+            if not width or not height:
+                payload = _token_payload(row, cache)
+                width = payload and payload["width"]
+                height = payload and payload["height"]
+            key.append(f"{width}x{height}" if width and height else "?")
+        elif name == "max_cost":
+            max_cost = row.get("max_cost")
+            if not max_cost:
+                payload = _token_payload(row, cache)
+                max_cost = payload["max_cost"] if payload else None
+            key.append(str(max_cost) if max_cost not in (None, "") else "?")
+        else:
+            key.append(row.get(name) or "")
+    return tuple(key)
+
+
+def aggregate(sources, group_by=("algorithm",), bucket=10, percentiles=DEFAULT_PERCENTILES, search_type=None):
+    """Stream the rows of the sources into a {group key: GroupStats} dict, returns (groups, rows read)."""
+    unknown = [name for name in group_by if name not in GROUP_KEYS]
+    if unknown:
+        raise ValueError(f"Unknown group(s): {', '.join(unknown)} (choose from {', '.join(GROUP_KEYS)})")
+
+    groups = {}
+    cache = {}
+    total = 0
+    for row in iter_rows(sources):
+        if search_type is not None and row.get("search_type") != search_type:
+            continue
+        total += 1
+        key = group_key(row, group_by, bucket, cache)
+        stats = groups.get(key)
+        if stats is None:
+            stats = groups[key] = GroupStats(percentiles)
+        stats.add(row)
+    return groups, total
+
+
+def _algorithm_order(key):
+    # The dropdown order for algorithm labels, everything else alphabetical
+    return tuple((ALGO_OPTIONS.index(part), "") if part in ALGO_OPTIONS else (len(ALGO_OPTIONS), part) for part in key)
+
+
+# --- Output ---
+
+def _fmt(value, digits=2):
+    if value is None:
+        return "-"
+    if abs(value) >= 1e6:
+        return f"{value:.3g}"
+    return f"{value:.{digits}f}"
+
+
+def print_table(groups, group_by, metrics, percentiles):
+    widths = [max([len(name)] + [len(key[i]) for key in groups]) for i, name in enumerate(group_by)]
+    pct_names = [f"p{pct:g}" for pct in percentiles]
+    header = "  ".join(name.ljust(width) for name, width in zip(group_by, widths))
+    header += f"  {'rows':>7} {'success':>8}  {'metric':<16} {'n':>7} {'mean':>10} {'std':>10} "
+    header += " ".join(f"{name:>10}" for name in pct_names)
+    print(header)
+    for key in sorted(groups, key=_algorithm_order):
+        stats = groups[key]
+        label = "  ".join(part.ljust(width) for part, width in zip(key, widths))
+        lead = f"{label}  {stats.rows:>7} {stats.success_rate:>8.1%}"
+        shown = [metric for metric in metrics if metric in stats.metrics] or [None]
+        for metric in shown:
+            if metric is None:
+                print(f"{lead}  {'-':<16}")
+                break
+            summary = stats.metrics[metric].summary()
+            print(f"{lead}  {metric:<16} {summary['n']:>7} {_fmt(summary['mean']):>10} {_fmt(summary['std']):>10} "
+                  + " ".join(f"{_fmt(summary[name]):>10}" for name in pct_names))
+            lead = " " * len(lead)
+
+
+def readme_table(groups):
+    """The README comparison table (markdown) from groups keyed by algorithm only."""
+    algorithms = [key[0] for key in sorted(groups, key=_algorithm_order)]
+    lines = [
+        "| Metric | " + " | ".join(algorithms) + " |",
+        "| --- |" + " --- |" * len(algorithms),
+    ]
+    for label, metric in README_ROWS:
+        cells = [_fmt(groups[(algo,)].mean(metric)) for algo in algorithms]
+        lines.append(f"| **{label}** | " + " | ".join(cells) + " |")
+    cells = [f"{groups[(algo,)].success_rate:.0%}" for algo in algorithms]
+    lines.append("| **Success Rate** | " + " | ".join(cells) + " |")
+    return "\n".join(lines)
+
+
+def replace_readme_table(text, table):
+    """Swap the first markdown table after the comparison table heading for a new one."""
+    lines = text.split("\n")
+    heading = next((i for i, line in enumerate(lines) if README_HEADING in line), None)
+    if heading is None:
+        raise ValueError(f"No '{README_HEADING}' heading in the README")
+    start = next((i for i in range(heading + 1, len(lines)) if lines[i].lstrip().startswith("|")), None)
+    if start is None:
+        raise ValueError(f"No table after the '{README_HEADING}' heading")
+    end = start
+    while end < len(lines) and lines[end].lstrip().startswith("|"):
+        end += 1
+    return "\n".join(lines[:start] + table.split("\n") + lines[end:])
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Aggregate batch result CSVs (streamed, constant memory).")
+    parser.add_argument("sources", nargs="+", help="result CSVs (plain or gzip) or .mzcol files, directories of them or globs")
+    parser.add_argument("--group-by", default="algorithm",
+                        help=f"comma separated, from {', '.join(GROUP_KEYS)} (default algorithm)")
+    parser.add_argument("--bucket", type=int, default=10, help="width of the wall / oneway %% buckets (default 10)")
+    parser.add_argument("--metrics", default="steps,path_len,path_cost",
+                        help=f"metrics shown in the table, from {', '.join(METRICS)} (default steps,path_len,path_cost)")
+    parser.add_argument("--percentiles", default=",".join(map(str, DEFAULT_PERCENTILES)),
+                        help="percentiles to estimate (default 50,90,99)")
+    parser.add_argument("--search-type", choices=("Graph", "Tree"), help="only rows of this search type")
+    parser.add_argument("--json", help="write every group's full statistics to this JSON file")
+    parser.add_argument("--readme", action="store_true",
+                        help="print the README comparison table (Graph searches, grouped by algorithm)")
+    parser.add_argument("--update-readme", metavar="README", help="write the comparison table into this README")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    metrics = [m.strip() for m in args.metrics.split(",") if m.strip()]
+    try:
+        percentiles = tuple(float(p) for p in args.percentiles.split(",") if p.strip())
+        if any(not 0 < p < 100 for p in percentiles):
+            raise ValueError("percentiles must be between 0 and 100")
+        unknown = [m for m in metrics if m not in METRICS]
+        if unknown:
+            raise ValueError(f"Unknown metric(s): {', '.join(unknown)}")
+
+        readme = args.readme or args.update_readme
+        if readme:
+            group_by = ("algorithm",)
+            search_type = args.search_type or "Graph"
+        else:
+            group_by = tuple(g.strip() for g in args.group_by.split(",") if g.strip())
+            search_type = args.search_type
+        groups, total = aggregate(args.sources, group_by, args.bucket, percentiles, search_type)
+    except (OSError, ValueError) as e:
+        print(f"Aggregate: {e}", file=sys.stderr)
+        return 2
+
+    if not groups:
+        print("Aggregate: no rows", file=sys.stderr)
+        return 1
+
+    if args.json:
+        report = {
+            "group_by": list(group_by),
+            "rows": total,
+            "groups": [{"key": dict(zip(group_by, key)), **groups[key].summary()}
+                       for key in sorted(groups, key=_algorithm_order)],
+        }
+        Path(args.json).write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    if readme:
+        table = readme_table(groups)
+        if args.update_readme:
+            path = Path(args.update_readme)
+            try:
+                path.write_text(replace_readme_table(path.read_text(encoding="utf-8"), table), encoding="utf-8")
+            except (OSError, ValueError) as e:
+                print(f"Aggregate: {e}", file=sys.stderr)
+                return 2
+            print(f"Aggregate: updated the table in {path} from {total} rows")
+        print(table)
+    else:
+        print_table(groups, group_by, metrics, percentiles)
+        print(f"\n{total} rows in {len(groups)} groups")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,779 @@
+# Batch testing pieces that don't need a GUI
+# shared by the visualiser (mazeVisualiser.py) and the headless command line runner (batchRunner.py)
+import base64
+import csv
+import gc
+import io
+import json
+import os
+import secrets
+import struct
+import time
+import tracemalloc
+import zlib
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+import AAStar
+import BFS
+import DFS
+import Maze
+import UCS
+import columnarResults
+import searchMemory
+import searchProfile
+import searchTrace
+from SearchWorkspace import SEARCH_COUNTERS
+from batchJournal import JOURNAL_VERSION, BatchJournal, truncate_outputs
+
+
+# -------- (Aiman) ----------------------------
+# If we do change the seed format, we should increase the version
+SEED_PREFIX = "MZ1:"  # Somewhat redundant with the version in the payload, so we can change it to just "MZ" if we really want
+
+# v2 tokens are a fixed binary struct instead of JSON, about half the length of a v1 token and they carry every
+# randomize() setting, so a token alone rebuilds the exact maze:
+#   version, 128 bit seed, wall %, one-way %, width, height, max cost, flags, CRC32 of the bytes before it
+# width / height 0 means the token doesn't fix a size (e.g. the scaling benchmark uses one token at every size)
+# v1 tokens (JSON, string seed) are still decoded, and still written for seeds that aren't a 128 bit number
+# (a raw seed typed into the GUI)
+SEED_PREFIX_V2 = "MZ2:"
+_SEED_V2 = struct.Struct(">B16sBBHHHB")
+_SEED_V2_CRC = struct.Struct(">I")
+_SEED_V2_SIZE = _SEED_V2.size + _SEED_V2_CRC.size
+SEED_FLAG_START_END_SPLIT = 1
+
+# randomize()'s defaults, what a v1 token was always generated with
+DEFAULT_MAX_COST = 5
+DEFAULT_START_END_SPLIT = True
+
+# Base64 is used so we can convert bytes into strings
+def _seed_padding(b64: str):
+    # Restores base64 padding (=) for urlsafe decoding, as base64 strings length needs to be a multiple of 4
+    return "=" * (-len(b64) % 4)
+
+# We use encoding and decoding so we can easily change the seed to include more data, e.g. max/min cost
+def encode_seed_token(*, rng_seed, wall_percentage: int, oneway_percentage: int, width: int = 0, height: int = 0,
+                      max_cost: int = DEFAULT_MAX_COST, force_start_end_split: bool = DEFAULT_START_END_SPLIT):
+    # When the same token is used again, the maze + settings are reproducible
+    if isinstance(rng_seed, int) and 0 <= rng_seed < 1 << 128:
+        raw = _SEED_V2.pack(2, rng_seed.to_bytes(16, "big"), int(wall_percentage), int(oneway_percentage),
+                            int(width), int(height), int(max_cost),
+                            SEED_FLAG_START_END_SPLIT if force_start_end_split else 0)
+        raw += _SEED_V2_CRC.pack(zlib.crc32(raw))
+        token = base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+        return f"{SEED_PREFIX_V2}{token}"
+
+    # v1 can only rebuild mazes of the default cost range / start + end placement
+    if int(max_cost) != DEFAULT_MAX_COST or bool(force_start_end_split) != DEFAULT_START_END_SPLIT:
+        raise ValueError("A v1 seed token can't store max_cost / force_start_end_split, use an integer seed")
+    payload = {
+        "v": 1,  # V stands for version
+        "rng": str(rng_seed),
+        "wall": int(wall_percentage),
+        "oneway": int(oneway_percentage),
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    token = base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+    return f"{SEED_PREFIX}{token}"
+
+
+def _decode_seed_v2(token: str):
+    try:
+        raw = base64.urlsafe_b64decode(token + _seed_padding(token))
+    except Exception:
+        return None
+    if len(raw) != _SEED_V2_SIZE:
+        return None
+    body = raw[:_SEED_V2.size]
+    if _SEED_V2_CRC.unpack_from(raw, _SEED_V2.size)[0] != zlib.crc32(body):
+        return None
+
+    version, seed, wall, oneway, width, height, max_cost, flags = _SEED_V2.unpack(body)
+    if version != 2 or wall + oneway > 100:
+        return None
+    return {
+        "v": 2,
+        "rng": int.from_bytes(seed, "big"),
+        "wall": wall,
+        "oneway": oneway,
+        "width": width or None,
+        "height": height or None,
+        "max_cost": max_cost,
+        "split": bool(flags & SEED_FLAG_START_END_SPLIT),
+    }
+
+
+def decode_seed_token(seed_text: str):
+    # Returns a dict if valid, otherwise None
+    # every version gives the same keys: v, rng, wall, oneway, width, height (None = any size), max_cost, split
+
+    if not isinstance(seed_text, str):
+        return None
+    seed_text = seed_text.strip()
+    if seed_text.startswith(SEED_PREFIX_V2):
+        return _decode_seed_v2(seed_text[len(SEED_PREFIX_V2):])
+    if not seed_text.startswith(SEED_PREFIX):
+        return None
+
+    try:
+        token = seed_text[len(SEED_PREFIX):]
+        raw = base64.urlsafe_b64decode(token + _seed_padding(token))
+        payload = json.loads(raw.decode("utf-8"))
+    except Exception:
+        return None
+
+    # Basic validation
+    if payload.get("v") != 1:
+        return None
+    if "rng" not in payload or "wall" not in payload or "oneway" not in payload:
+        return None
+
+    payload.update(width=None, height=None, max_cost=DEFAULT_MAX_COST, split=DEFAULT_START_END_SPLIT)
+    return payload
+
+
+def randomize_from_seed(maze: Maze.Maze, payload: dict):
+    """Regenerate a maze from a decoded seed token, with every setting the token carries.
+
+    The maze has to have the token's size already (when the token has one), see seed_maze_size.
+    """
+    maze.randomize(int(payload["wall"]), int(payload["oneway"]), force_start_end_split=payload["split"],
+                   max_cost_rng=payload["max_cost"], seed=payload["rng"])
+
+
+def seed_maze_size(payload: dict, width: int, height: int):
+    """(width, height) to build a token's maze at, the token's own size or the given one if it has none."""
+    return payload["width"] or width, payload["height"] or height
+
+@dataclass
+class RunMetrics:
+    """Lightweight container for one search run's results (manual or batch)."""
+
+    algo_choice: str
+    search_type: str
+    status: str  # success/fail/timeout/oom/error/stopped
+    steps: int
+    unique_visited: int
+    repeats: int
+    reported_time_ns: int
+    wall_time_ns: int
+    avg_mem_bytes: float
+    path_len: Optional[int] = None
+    path_cost: Optional[int] = None  # under the UCS cost rule, so every algorithm's paths compare
+    # The search's own work counters (SearchWorkspace.SEARCH_COUNTERS), None when the run couldn't report them
+    generated: Optional[int] = None
+    expanded: Optional[int] = None
+    pushes: Optional[int] = None
+    pops: Optional[int] = None
+    stale_pops: Optional[int] = None
+    peak_frontier: Optional[int] = None
+    peak_parents: Optional[int] = None
+    # Bytes of the search's own structures (searchMemory.MEMORY_FIELDS), traced_bytes only with the file probe on
+    frontier_bytes: Optional[int] = None
+    visited_bytes: Optional[int] = None
+    parent_bytes: Optional[int] = None
+    g_score_bytes: Optional[int] = None
+    traced_bytes: Optional[int] = None
+# ------------------------------------
+
+
+# Algorithm labels, the same ones the visualiser's dropdown shows
+# BFS (Graph) has to stay first, batch runs use it to decide whether a maze is solvable
+ALGO_OPTIONS = ["BFS (Graph)", "DFS (Graph)", "UCS (Graph)", "AStar (Graph)", "BFS (Tree)", "DFS (Tree)", "UCS (Tree)", "AStar (Tree)"]
+
+# Safeguards for batch mode (prevents Tree search from looping forever)
+DEFAULT_MAX_STEPS_TREE = 200_000
+DEFAULT_MAX_STEPS_GRAPH = 50_000
+
+# Per-algorithm time limit for batch + replay runs
+DEFAULT_TIME_LIMIT_SECONDS = 180.0
+
+# Columns of the batch results CSV
+CSV_FIELDNAMES = [
+    "run_id",
+    "seed_token",
+    "wall_pct",
+    "oneway_pct",
+    "algorithm",
+    "search_type",
+    "status",
+    "steps",
+    "unique_visited",
+    "repeats",
+    "path_len",
+    "path_cost",
+    "reported_time_ns",
+    "wall_time_ns",
+    "avg_mem_bytes",
+    *SEARCH_COUNTERS,
+    *searchMemory.MEMORY_FIELDS,
+]
+
+
+def create_search_instance(maze: Maze.Maze, algo_choice: str, workspace=None):
+    """Create a search instance based on the dropdown label, returns (instance, search_type)."""
+    search_type = "Graph"
+    if "(Tree)" in algo_choice:
+        search_type = "Tree"
+
+    if "BFS" in algo_choice:
+        return BFS.BFS(maze, search_type, workspace=workspace), search_type
+    elif "DFS" in algo_choice:
+        return DFS.DFS(maze, search_type, workspace=workspace), search_type
+    elif "UCS" in algo_choice:
+        return UCS.UCS(maze, search_type, workspace=workspace), search_type
+    elif "AStar" in algo_choice:
+        return AAStar.AAStar(maze, search_type, workspace=workspace), search_type
+
+    raise ValueError(f"Unknown algorithm: {algo_choice}")
+
+
+def max_steps_for(algo_choice: str) -> int:
+    """Step limit safety for batch runs (Tree can loop)."""
+    return DEFAULT_MAX_STEPS_TREE if "(Tree)" in algo_choice else DEFAULT_MAX_STEPS_GRAPH
+
+
+def time_limit_ns_from_seconds(raw) -> int:
+    """Turn a user supplied time limit in seconds into nanoseconds.
+
+    Invalid or non-positive values fall back to the default (180 s), values are capped at 24h.
+    """
+    seconds = DEFAULT_TIME_LIMIT_SECONDS
+    raw = str(raw if raw is not None else "").strip()
+    if raw:
+        try:
+            seconds = float(raw)
+        except Exception:
+            seconds = DEFAULT_TIME_LIMIT_SECONDS
+
+    # Keep it safe + predictable
+    if seconds <= 0:
+        seconds = DEFAULT_TIME_LIMIT_SECONDS
+
+    # Cap to 24h to avoid ridiculous values
+    if seconds > 24 * 60 * 60:
+        seconds = 24 * 60 * 60
+
+    return int(seconds * 1_000_000_000)
+
+
+def random_percentages(wall_max: int, oneway_max: int, randbelow=secrets.randbelow):
+    """Pick wall/one-way percentages uniformly below the given maxima (their sum stays <= 100)."""
+    wall_max = max(0, min(100, int(wall_max)))
+    oneway_max = max(0, min(100, int(oneway_max)))
+
+    wall_pct = 0
+    oneway_pct = 0
+    for _ in range(200):
+        wall_pct = randbelow(wall_max + 1)
+        oneway_pct = randbelow(oneway_max + 1)
+        if wall_pct + oneway_pct <= 100:
+            break
+    else: # runs if break triggered in for loop
+        wall_pct = min(wall_max, 100)
+        oneway_pct = min(oneway_max, max(0, 100 - wall_pct))
+    return wall_pct, oneway_pct
+
+
+def random_seed_token(wall_max: int, oneway_max: int, rng=None, *, width: int = 0, height: int = 0):
+    """A fresh random maze token for random batch mode, returns (token, rng_seed, wall_pct, oneway_pct).
+
+    Pass a random.Random as rng to get a reproducible stream of tokens (e.g. from a master seed),
+    by default the tokens come from the secrets module. width / height are stored in the token (0 = any size).
+    """
+    if rng is None:
+        wall_pct, oneway_pct = random_percentages(wall_max, oneway_max)
+        rng_seed = secrets.randbits(128)
+    else:
+        wall_pct, oneway_pct = random_percentages(wall_max, oneway_max, randbelow=rng.randrange)
+        rng_seed = rng.getrandbits(128)
+    token = encode_seed_token(rng_seed=rng_seed, wall_percentage=wall_pct, oneway_percentage=oneway_pct,
+                              width=width, height=height)
+    return token, rng_seed, wall_pct, oneway_pct
+
+
+def path_cost(maze: Maze.Maze, path, policy="ucs"):
+    """Cost of a path under one of the maze's edge cost policies."""
+    cost_fn = Maze.EDGE_COST_POLICIES[policy]
+    return sum(cost_fn(maze, x1, y1, x2, y2) for (x1, y1), (x2, y2) in zip(path, path[1:]))
+
+
+def search_counters(search_instance) -> dict:
+    """The work counters of a search instance (keyword arguments for RunMetrics), empty if it has none."""
+    return {name: int(getattr(search_instance, name)) for name in SEARCH_COUNTERS
+            if hasattr(search_instance, name)}
+
+
+def run_search(maze: Maze.Maze, algo_choice: str, *, workspace=None, max_steps: Optional[int] = None,
+               time_limit_ns: Optional[int] = None, progress=None) -> RunMetrics:
+    """Run one algorithm to completion without a GUI and collect the same metrics as the visualiser.
+
+    The generator is driven directly (no animation, no canvas), the step/time limits are checked
+    before every step exactly like MazeVisualizer.run_search_step does.
+    Memory numbers are only recorded while tracemalloc is tracing, traced_bytes only with searchMemory's file probe on.
+    The probe's snapshots are left out of the time limit and wall_time_ns, so a probed run ends the same way.
+    With a searchTrace tracer set (searchTrace.set_tracer) the search's sampled steps are traced into it.
+    With a searchProfile profiler set (searchProfile.set_profiler) the step loop is run under its cProfile.
+    progress can be a shared multiprocessing.Value, its value is kept near the step count (see searchWatchdog).
+    """
+    start_node = (maze.startx, maze.starty)
+    goal_node = (maze.endx, maze.endy)
+
+    search_instance, search_type = create_search_instance(maze, algo_choice, workspace)
+
+    gc.collect()  # reduces noise
+
+    steps = 0
+    repeats = 0
+    visited = set()
+    reported_time_ns = 0
+    mem_total = 0
+    mem_samples = 0
+    tracing = tracemalloc.is_tracing()
+    mem_baseline = tracemalloc.get_traced_memory()[0] if tracing else 0
+    status = "fail"
+    probe = searchMemory.FileMemoryProbe(search_instance) if searchMemory.file_probe_enabled() else None
+    tracer = searchTrace.active_tracer()
+    if tracer is not None:
+        search_instance.trace = tracer
+        tracer.begin_run(algo_choice)
+    profiler = searchProfile.active_profiler()
+    if profiler is not None:
+        profiler.begin_run(algo_choice)
+
+    generator = search_instance.search()
+    run_start_ns = time.perf_counter_ns()
+    # Time spent in the memory probe, taken off the clock
+    probe_ns = 0
+    try:
+        if profiler is not None:
+            profiler.resume()
+        while True:
+            if max_steps is not None and steps >= max_steps:
+                status = "timeout"
+                break
+            if time_limit_ns is not None and time.perf_counter_ns() - run_start_ns - probe_ns >= time_limit_ns:
+                status = "timeout"
+                break
+
+            try:
+                current_node, _, execution_time, mem_use = next(generator)
+            except StopIteration:
+                status = "fail"
+                break
+            if probe is not None:
+                probe_start_ns = time.perf_counter_ns()
+                probe.sample(current_node)
+                probe_ns += time.perf_counter_ns() - probe_start_ns
+
+            steps += 1
+            if progress is not None and not steps & 1023:
+                progress.value = steps
+            reported_time_ns += max(0, int(execution_time or 0))
+
+            # Same memory rule as the visualiser: use the algorithm's number, else sample tracemalloc
+            mem_i = int(mem_use) if mem_use is not None else -1
+            if mem_i < 0 and tracing:
+                mem_i = max(0, tracemalloc.get_traced_memory()[0] - mem_baseline)
+            if mem_i >= 0:
+                mem_total += mem_i
+                mem_samples += 1
+
+            # If the generator yields None no path was found
+            if current_node is None:
+                status = "fail"
+                break
+
+            # Count repeats the way the visualiser colours them (start and goal are not counted)
+            if current_node != start_node and current_node != goal_node:
+                if current_node in visited:
+                    repeats += 1
+                else:
+                    visited.add(current_node)
+
+            if current_node == goal_node:
+                status = "success"
+                break
+    except MemoryError:
+        # Out of the memory budget (the address space limit a supervised run sets, see searchWatchdog)
+        status = "oom"
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        status = "error"
+    finally:
+        if profiler is not None:
+            profiler.end_run()
+        generator.close()
+        if tracer is not None:
+            tracer.end_run()
+        if progress is not None:
+            progress.value = steps
+
+    wall_time_ns = max(0, time.perf_counter_ns() - run_start_ns - probe_ns)
+
+    path_len = None
+    cost = None
+    if status == "success" and search_type != "Tree":
+        try:
+            path = search_instance.reconstruct_path()
+            if path:
+                path_len = max(0, len(path) - 1)
+                cost = path_cost(maze, path)
+        except Exception:
+            path_len = None
+            cost = None
+
+    return RunMetrics(
+        algo_choice=algo_choice,
+        search_type=search_type,
+        status=status,
+        steps=steps,
+        unique_visited=len(visited),
+        repeats=repeats,
+        reported_time_ns=reported_time_ns,
+        wall_time_ns=wall_time_ns,
+        avg_mem_bytes=float(mem_total / mem_samples) if mem_samples else 0.0,
+        path_len=path_len,
+        path_cost=cost,
+        traced_bytes=probe.peak_bytes if probe is not None else None,
+        **search_counters(search_instance),
+        **searchMemory.structure_bytes(search_instance),
+    )
+
+
+def make_row(run_id: int, seed_token: str, wall_pct: int, oneway_pct: int, metrics: RunMetrics) -> dict:
+    """One row of the batch results CSV."""
+    return {
+        "run_id": run_id,
+        "seed_token": seed_token,
+        "wall_pct": wall_pct,
+        "oneway_pct": oneway_pct,
+        "algorithm": metrics.algo_choice,
+        "search_type": metrics.search_type,
+        "status": metrics.status,
+        "steps": metrics.steps,
+        "unique_visited": metrics.unique_visited,
+        "repeats": metrics.repeats,
+        "path_len": "" if metrics.path_len is None else metrics.path_len,
+        "path_cost": "" if metrics.path_cost is None else metrics.path_cost,
+        "reported_time_ns": metrics.reported_time_ns,
+        "wall_time_ns": metrics.wall_time_ns,
+        "avg_mem_bytes": round(metrics.avg_mem_bytes, 2),
+        **{name: "" if getattr(metrics, name) is None else getattr(metrics, name)
+           for name in (*SEARCH_COUNTERS, *searchMemory.MEMORY_FIELDS)},
+    }
+
+
+# Output buffering: rows are written out (and synced to disk) every FLUSH_ROWS rows or FLUSH_SECONDS seconds,
+# whichever comes first (checked as rows come in), and always at the end of a batch / on stop
+DEFAULT_FLUSH_ROWS = 256
+DEFAULT_FLUSH_SECONDS = 5.0
+
+# csv = batch_results_*.csv, columnar = batch_results_*.mzcol (see columnarResults.py)
+RESULT_FORMATS = ("csv", "columnar")
+
+
+class CsvRowWriter:
+    """Appends rows to a batch CSV, kept in memory until write_pending() (same interface as ColumnarWriter)."""
+
+    def __init__(self, path, fieldnames=None, *, append=False):
+        self.path = str(path)
+        if append:
+            # Keep the columns the file was started with, in case they changed since
+            with open(self.path, newline="", encoding="utf-8") as fh:
+                fieldnames = next(csv.reader(fh), None) or fieldnames
+        self.fieldnames = list(fieldnames)
+        self._line = io.StringIO(newline="")
+        self._writer = csv.DictWriter(self._line, fieldnames=self.fieldnames,
+                                      extrasaction="ignore" if append else "raise")
+        self._fh = open(self.path, "ab" if append else "wb")
+        if not append:
+            self._writer.writeheader()
+            self._fh.write(self._take())
+            self._fh.flush()
+        self.size = self._fh.tell()
+        self._pending = []
+        self._offsets = []
+        self._pending_size = self.size
+
+    def _take(self) -> bytes:
+        data = self._line.getvalue().encode("utf-8")
+        self._line.seek(0)
+        self._line.truncate()
+        return data
+
+    def add(self, row: dict):
+        self._writer.writerow(row)
+        data = self._take()
+        self._pending.append(data)
+        self._pending_size += len(data)
+        self._offsets.append(self._pending_size)
+
+    def write_pending(self):
+        """Write the rows added since the last call, returns the file size after each of them."""
+        if self._fh is None or not self._pending:
+            return []
+        self._fh.write(b"".join(self._pending))
+        self._fh.flush()
+        self.size = self._pending_size
+        offsets = self._offsets
+        self._pending = []
+        self._offsets = []
+        return offsets
+
+    def fileno(self):
+        return self._fh.fileno()
+
+    def close(self):
+        if self._fh is not None:
+            try:
+                self._fh.close()
+            except Exception:
+                pass
+        self._fh = None
+
+
+def open_results_writer(path, *, append=False):
+    """CsvRowWriter or ColumnarWriter, picked by the file name."""
+    if str(path).endswith(columnarResults.SUFFIX):
+        return columnarResults.ColumnarWriter(path, CSV_FIELDNAMES, append=append)
+    return CsvRowWriter(path, CSV_FIELDNAMES, append=append)
+
+
+def _read_results(path):
+    """Rows of a batch results file (CSV or columnar) as dicts."""
+    if str(path).endswith(columnarResults.SUFFIX):
+        yield from columnarResults.iter_rows(path)
+        return
+    with open(path, newline="", encoding="utf-8") as fh:
+        yield from csv.DictReader(fh)
+
+
+def reject_summary(rejected: int, accepted: int, duplicates: int = 0, flagged: int = 0) -> str:
+    """" | generated N mazes: X unsolvable (x%), Y duplicates skipped (y%)" for a batch summary, "" if nothing was
+    rejected. duplicates were skipped, flagged ones were kept (and are counted in accepted)."""
+    generated = rejected + accepted + duplicates
+    parts = []
+    for count, what in ((rejected, "unsolvable"), (duplicates, "duplicates skipped"), (flagged, "duplicates flagged")):
+        if count:
+            parts.append(f"{count} {what} ({100 * count / generated:.1f}%)")
+    if not parts:
+        return ""
+    return f" | generated {generated} mazes: {', '.join(parts)}"
+
+
+class BatchOutputs:
+    """The results file + seeds file of one batch run, plus its progress journal (see batchJournal).
+
+    results_format is "csv" or "columnar". Rows, seeds and journal events are buffered and written out together
+    every flush_rows rows / flush_seconds seconds, and by flush(), finish() and close(), so a stopped batch keeps
+    everything and a crashed one loses at most the unflushed rows (which a resume runs again).
+    store is an optional resultsStore.ResultsStore that gets every row too, as batch <stamp>.
+    metrics is an optional batchMetrics.BatchMetrics that counts the runs and mazes as they are recorded
+    (it is left open by close(), whoever made it closes it).
+    """
+
+    def __init__(self, out_dir="batch_outputs", stamp: Optional[str] = None, *, settings: Optional[dict] = None,
+                 journal: bool = True, store=None, metrics=None, results_format: str = "csv",
+                 flush_rows: int = DEFAULT_FLUSH_ROWS, flush_seconds: float = DEFAULT_FLUSH_SECONDS):
+        if results_format not in RESULT_FORMATS:
+            raise ValueError(f"Unknown results format {results_format!r}")
+        out_dir = Path(out_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+
+        stamp = stamp or datetime.now().strftime("%Y%m%d_%H%M%S")
+        suffix = columnarResults.SUFFIX if results_format == "columnar" else ".csv"
+        self.stamp = stamp
+        self.csv_path = str(out_dir / f"batch_results_{stamp}{suffix}")
+        self.seed_path = str(out_dir / f"batch_seeds_{stamp}.txt")
+        self.journal_path = str(out_dir / f"batch_journal_{stamp}.jsonl") if journal else ""
+
+        self._results = open_results_writer(self.csv_path)
+        self._seed_fh = open(self.seed_path, "wb")
+        self._init_buffers(flush_rows, flush_seconds)
+
+        self.journal = None
+        if journal:
+            self.journal = BatchJournal(self.journal_path)
+            self.journal.record("start", v=JOURNAL_VERSION, settings=settings or {}, csv_path=self.csv_path,
+                                seed_path=self.seed_path, csv_offset=self._results.size)
+
+        self.store = store
+        if store is not None:
+            store.begin_batch(stamp, settings)
+
+        self.metrics = metrics
+        if metrics is not None:
+            settings = settings or {}
+            metrics.begin_batch(stamp, mode="replay" if settings.get("replay") else "random",
+                                target=settings.get("mazes"))
+
+    def _init_buffers(self, flush_rows, flush_seconds):
+        self.flush_rows = max(1, int(flush_rows))
+        self.flush_seconds = float(flush_seconds)
+        self._seeds_size = self._seed_fh.tell()
+        # Mazes accepted / thrown away as unsolvable / skipped or flagged as duplicates (see reject_summary)
+        self.accepted = 0
+        self.rejected = 0
+        self.duplicates = 0
+        self.flagged = 0
+        self._seed_buf = []
+        self._events = []
+        self._buffered_rows = 0
+        self._last_flush = time.monotonic()
+
+    @classmethod
+    def resume(cls, journal_path, state: dict, *, store=None, metrics=None, flush_rows: int = DEFAULT_FLUSH_ROWS,
+               flush_seconds: float = DEFAULT_FLUSH_SECONDS):
+        """Reopen the outputs of an interrupted batch for appending, state comes from batchJournal.load_journal."""
+        truncate_outputs(state)
+
+        outputs = cls.__new__(cls)
+        outputs.stamp = Path(state["csv_path"]).stem[len("batch_results_"):]
+        outputs.csv_path = state["csv_path"]
+        outputs.seed_path = state["seed_path"]
+        outputs.journal_path = str(journal_path)
+        outputs._results = open_results_writer(outputs.csv_path, append=True)
+        outputs._seed_fh = open(outputs.seed_path, "ab")
+        outputs._init_buffers(flush_rows, flush_seconds)
+        outputs.accepted = state["accepted"]
+        outputs.rejected = state["rejected"]
+        outputs.duplicates = state["duplicates"]
+        outputs.flagged = state["flagged"]
+        outputs.journal = BatchJournal(journal_path, append=True)
+        outputs.journal.record("resume", completed=state["completed"])
+
+        # The store may have lost rows it hadn't committed yet (or kept some the results file was cut back from),
+        # reload the batch from the results file, which is what the journal vouches for
+        outputs.store = store
+        if store is not None:
+            store.begin_batch(outputs.stamp, state["settings"])
+            store.discard_runs_after(outputs.stamp, 0)
+            for row in _read_results(outputs.csv_path):
+                store.add_run(outputs.stamp, row)
+            store.flush()
+
+        outputs.metrics = metrics
+        if metrics is not None:
+            settings = state["settings"]
+            metrics.begin_batch(outputs.stamp, mode="replay" if settings.get("replay") else "random",
+                                target=settings.get("mazes"), completed=state["completed"],
+                                accepted=state["accepted"], rejected=state["rejected"],
+                                duplicates=state["duplicates"])
+        return outputs
+
+    def _record(self, event: str, **fields):
+        # Journal events wait for the rows / seeds they describe to be written out
+        if self.journal is not None:
+            self._events.append((event, fields))
+
+    def _maybe_flush(self):
+        if (self._buffered_rows >= self.flush_rows
+                or time.monotonic() - self._last_flush >= self.flush_seconds):
+            self.flush()
+
+    def write_row(self, row: dict):
+        if self._results is None:
+            return
+        self._results.add(row)
+        if self.store is not None:
+            self.store.add_run(self.stamp, row)
+        if self.metrics is not None:
+            self.metrics.observe_run(row["algorithm"], row["status"], row["wall_time_ns"])
+        # csv_offset is filled in by flush()
+        self._record("row", run_id=row["run_id"], algorithm=row["algorithm"], csv_offset=None)
+        self._buffered_rows += 1
+        self._maybe_flush()
+
+    def start_maze(self, seed_token: str, *, candidate: Optional[int] = None, index: Optional[int] = None):
+        """Journal the maze about to be run, candidate = place in the random token stream, index = line in a seeds file."""
+        self._record("maze", token=seed_token, candidate=candidate, index=index)
+
+    def reject_maze(self, reason: str = "unsolvable"):
+        """Journal that the current maze doesn't count, because it was unsolvable or a duplicate (see mazeIndex)."""
+        if reason == "duplicate":
+            self.duplicates += 1
+            self._record("reject", reason=reason)
+        else:
+            self.rejected += 1
+            self._record("reject")
+        if self.metrics is not None:
+            self.metrics.reject_maze(reason)
+
+    def flag_duplicate(self, duplicate_of: str):
+        """Journal that the current (accepted) maze is the same maze as an earlier token."""
+        self.flagged += 1
+        self._record("duplicate", duplicate_of=duplicate_of)
+
+    def accept_maze(self, seed_token: str, run_id: Optional[int] = None):
+        """Record an accepted maze seed token so the batch can be replayed."""
+        if self._seed_fh is None:
+            return
+        line = f"{seed_token}\n".encode("utf-8")
+        self._seed_buf.append(line)
+        self._seeds_size += len(line)
+        self.accepted += 1
+        self._record("accept", run_id=run_id, seeds_offset=self._seeds_size)
+        if self.metrics is not None:
+            self.metrics.accept_maze()
+
+    def finish_maze(self, run_id: int):
+        """Journal that every algorithm of run_id is done."""
+        self._record("done", run_id=run_id)
+        if self.metrics is not None:
+            self.metrics.maze_done(run_id)
+        if self._results is not None:
+            self._maybe_flush()
+
+    def flush(self):
+        """Write out the buffered rows, seeds and journal events, and sync them to disk."""
+        if self._results is None:
+            return
+        offsets = iter(self._results.write_pending())
+        if self._seed_buf:
+            self._seed_fh.write(b"".join(self._seed_buf))
+            self._seed_fh.flush()
+            self._seed_buf = []
+        for fh in (self._results, self._seed_fh):
+            os.fsync(fh.fileno())
+
+        if self.journal is not None and self._events:
+            for event, fields in self._events:
+                if event == "row":
+                    fields["csv_offset"] = next(offsets)
+            self.journal.record_many(self._events)
+            self.journal.sync()
+        self._events = []
+        self._buffered_rows = 0
+        self._last_flush = time.monotonic()
+
+    def finish(self):
+        """Journal that the batch ended normally (a stopped or crashed batch never gets this, so it can be resumed)."""
+        self._record("finish")
+        self.flush()
+
+    def close(self):
+        """Write out anything still buffered and close the batch output files."""
+        try:
+            self.flush()
+        except Exception:
+            pass
+        for fh in (self._results, self._seed_fh):
+            if fh is not None:
+                try:
+                    fh.close()
+                except Exception:
+                    pass
+        self._results = None
+        self._seed_fh = None
+        if self.journal is not None:
+            self.journal.close()
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+        if self.metrics is not None:
+            self.metrics.end_batch()
+            self.metrics = None
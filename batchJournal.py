@@ -0,0 +1,164 @@
+# Progress journal of a batch run, so a batch that dies halfway (GUI closed, crash, Ctrl+C, reboot) can be resumed
+#
+# The journal is an append-only JSON lines file next to the CSV + seeds files, one event per line:
+#   start   the batch settings and the output file paths
+#   maze    a maze was picked: its seed token, plus its place in the token stream (candidate) or seeds file (index)
+#   reject  the maze was unsolvable (or a duplicate, reason=duplicate) and doesn't count (random mode)
+#   accept  the maze got its run_id, its token is in the seeds file (seeds_offset = seeds file size after it)
+#   duplicate  the accepted maze is the same maze as an earlier token (--dedup flag)
+#   row     (run_id, algorithm) is done, its row is in the CSV (csv_offset = CSV size after it)
+#   done    every algorithm of run_id is done
+#   finish  the batch ended normally
+# BatchOutputs buffers rows and writes them out (then their events) every few hundred rows / seconds and at the end
+# of a batch or on stop, syncing everything to disk each time, so the journal never gets ahead of the output files.
+# A torn last line is ignored.
+# Resuming cuts the CSV + seeds files back to the last offsets the journal knows about (dropping any half written
+# row) and carries on from the first unfinished (run_id, algorithm), appending to the same files.
+import json
+import os
+
+JOURNAL_VERSION = 1
+
+
+class BatchJournal:
+    """Writer side of the journal."""
+
+    def __init__(self, path, *, append=False):
+        self.path = str(path)
+        self._fh = open(self.path, "a" if append else "w", encoding="utf-8")
+
+    def record(self, event: str, **fields):
+        if self._fh is None:
+            return
+        fields["e"] = event
+        self._fh.write(json.dumps(fields, separators=(",", ":")) + "\n")
+        self._fh.flush()
+
+    def record_many(self, events):
+        """Write several (event, fields) at once with a single flush."""
+        if self._fh is None or not events:
+            return
+        lines = []
+        for event, fields in events:
+            fields["e"] = event
+            lines.append(json.dumps(fields, separators=(",", ":")) + "\n")
+        self._fh.write("".join(lines))
+        self._fh.flush()
+
+    def sync(self):
+        """Push the journal to disk (the output files are synced before this by BatchOutputs)."""
+        if self._fh is not None:
+            os.fsync(self._fh.fileno())
+
+    def close(self):
+        if self._fh is not None:
+            try:
+                self._fh.close()
+            except Exception:
+                pass
+        self._fh = None
+
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def load_journal(path):
+    """Replay a journal into the state a resume needs.
+
+    Returns a dict with:
+      settings, csv_path, seed_path   from the start event
+      completed        number of finished mazes (the last done run_id)
+      accepted, rejected   how many mazes were accepted / rejected as unsolvable
+      duplicates, flagged  how many duplicate mazes were skipped / flagged
+      csv_offset, seeds_offset        how much of the output files is backed by the journal
+      current          the maze in progress: {"token", "candidate", "index", "run_id", "accepted", "algorithms"} or None
+      next_candidate   how many tokens of the random stream have been used
+      next_index       the next line of the replay seeds file
+      finished         the batch already ended normally
+    Events whose offsets point past the end of the output files (written to the journal but lost from the files in a
+    power cut) and anything after them are ignored.
+    """
+    with open(path, encoding="utf-8") as fh:
+        lines = fh.read().split("\n")
+
+    events = []
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            events.append(json.loads(line))
+        except json.JSONDecodeError:
+            # Torn last line
+            break
+
+    if not events or events[0].get("e") != "start":
+        raise ValueError(f"{path} is not a batch journal")
+    start = events[0]
+    if start.get("v") != JOURNAL_VERSION:
+        raise ValueError(f"Unsupported batch journal version {start.get('v')}")
+
+    csv_size = _file_size(start["csv_path"])
+    seeds_size = _file_size(start["seed_path"])
+
+    state = {
+        "settings": start.get("settings", {}),
+        "csv_path": start["csv_path"],
+        "seed_path": start["seed_path"],
+        "completed": 0,
+        "accepted": 0,
+        "rejected": 0,
+        "duplicates": 0,
+        "flagged": 0,
+        "csv_offset": start.get("csv_offset", 0),
+        "seeds_offset": 0,
+        "current": None,
+        "next_candidate": 0,
+        "next_index": 0,
+        "finished": False,
+    }
+    for event in events[1:]:
+        kind = event.get("e")
+        if kind == "maze":
+            state["current"] = {"token": event["token"], "candidate": event.get("candidate"),
+                                "index": event.get("index"), "run_id": None, "accepted": False, "algorithms": []}
+            if event.get("candidate") is not None:
+                state["next_candidate"] = event["candidate"] + 1
+            if event.get("index") is not None:
+                state["next_index"] = event["index"] + 1
+        elif kind == "reject":
+            state["current"] = None
+            state["duplicates" if event.get("reason") == "duplicate" else "rejected"] += 1
+        elif kind == "duplicate":
+            state["flagged"] += 1
+        elif kind == "accept":
+            if event["seeds_offset"] > seeds_size:
+                break
+            state["seeds_offset"] = event["seeds_offset"]
+            state["accepted"] += 1
+            if state["current"] is not None:
+                state["current"]["run_id"] = event["run_id"]
+                state["current"]["accepted"] = True
+        elif kind == "row":
+            if event["csv_offset"] > csv_size:
+                break
+            state["csv_offset"] = event["csv_offset"]
+            if state["current"] is not None:
+                state["current"]["run_id"] = event["run_id"]
+                state["current"]["algorithms"].append(event["algorithm"])
+        elif kind == "done":
+            state["completed"] = event["run_id"]
+            state["current"] = None
+        elif kind == "finish":
+            state["finished"] = True
+    return state
+
+
+def truncate_outputs(state):
+    """Cut the CSV + seeds files back to what the journal knows about."""
+    for path, offset in ((state["csv_path"], state["csv_offset"]), (state["seed_path"], state["seeds_offset"])):
+        with open(path, "ab") as fh:
+            fh.truncate(offset)
@@ -0,0 +1,272 @@
+# Live progress of a batch / replay in the Prometheus text formats, so a long sweep can be watched by whatever
+# already scrapes this machine instead of someone looking at the window
+#
+# served on a localhost port (http://127.0.0.1:PORT/metrics) and/or written to a file every few seconds (written
+# to a temp file and renamed over, so node_exporter's textfile collector never sees half a file). The port answers
+# in OpenMetrics when the scraper asks for it (Prometheus does) and in the plain 0.0.4 text format otherwise, the
+# file is always 0.0.4 since that is all the textfile collector reads. The metrics:
+#   maze_batch_info{batch, mode}               the batch being run (its stamp, random / replay)
+#   maze_batch_running                         1 while a batch runs, 0 once it has finished or stopped
+#   maze_batch_mazes_completed                 mazes with every algorithm done
+#   maze_batch_mazes_target                    mazes asked for (random mode only)
+#   maze_batch_mazes_rejected_total{reason}    random mazes thrown away: unsolvable, duplicate
+#   maze_batch_reject_ratio                    rejected / generated
+#   maze_batch_runs_total{algorithm, status}   algorithm runs by outcome (success, fail, timeout, oom, error)
+#   maze_batch_runs_per_second                 over the last RATE_WINDOW seconds
+#   maze_batch_run_seconds{algorithm}          histogram of the runs' wall time
+#   maze_batch_elapsed_seconds                 since the batch started (or was resumed)
+#   maze_batch_resident_memory_bytes           this process's resident memory, not the pool workers' or
+#                                              supervised children's (Linux only, like searchWatchdog)
+# the numbers come from BatchOutputs as rows / mazes are recorded, so they are the same for any number of workers.
+# A resumed batch starts from the journal's maze counts, the run counts start again from 0.
+#
+# usage:
+#   python batchRunner.py --mazes 100000 --metrics-port 9464
+#   python batchRunner.py --mazes 100000 --metrics-file batch_outputs/batch.prom --metrics-interval 10
+#   MAZE_METRICS_PORT=9464 python main.py      the visualiser's batches (MAZE_METRICS_FILE for a file)
+import bisect
+import http.server
+import os
+import threading
+import time
+from collections import deque
+
+DEFAULT_WRITE_INTERVAL = 5.0
+
+# runs_per_second is worked out over this many seconds
+RATE_WINDOW = 60.0
+
+# Upper bounds of the run_seconds buckets, a run over the last one only counts in +Inf
+RUN_SECONDS_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                       1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 180.0)
+
+# Always listed for every algorithm, so a timeout count reads 0 rather than missing
+RUN_STATUSES = ("success", "fail", "timeout", "oom", "error")
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+TEXT_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def resident_bytes():
+    """Resident memory of this process, None where /proc isn't there."""
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _MetricsHandler(http.server.BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        openmetrics = "application/openmetrics-text" in self.headers.get("Accept", "")
+        body = self.server.metrics.render(openmetrics=openmetrics).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE if openmetrics else TEXT_CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # One line per scrape would drown out the batch's own output
+        pass
+
+
+class BatchMetrics:
+    """Counts what BatchOutputs records, served on port and/or written to path (both optional) until close()."""
+
+    def __init__(self, path=None, *, port=None, interval: float = DEFAULT_WRITE_INTERVAL):
+        self.path = str(path) if path else None
+        self.interval = max(0.1, float(interval))
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._write_failed = False
+        self.begin_batch("")
+        self._running = 0
+
+        self._server = None
+        self._threads = []
+        if port is not None:
+            self._server = http.server.ThreadingHTTPServer(("127.0.0.1", int(port)), _MetricsHandler)
+            self._server.daemon_threads = True
+            self._server.metrics = self
+            self._threads.append(threading.Thread(target=self._server.serve_forever, name="batch-metrics-http",
+                                                  daemon=True))
+        if self.path:
+            self._threads.append(threading.Thread(target=self._write_loop, name="batch-metrics-file", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    @property
+    def port(self):
+        """The port being served (the one picked by the OS for port 0), None if not serving."""
+        return self._server.server_address[1] if self._server is not None else None
+
+    # --- Fed by BatchOutputs ---
+
+    def begin_batch(self, stamp: str, *, mode: str = "random", target=None, completed: int = 0, accepted: int = 0,
+                    rejected: int = 0, duplicates: int = 0):
+        """Start counting a new batch, a resumed one passes the counts from its journal."""
+        with self._lock:
+            self._stamp = stamp
+            self._mode = mode
+            self._target = target
+            self._running = 1
+            self._completed = completed
+            self._accepted = accepted
+            self._rejected = {"unsolvable": rejected, "duplicate": duplicates}
+            self._runs = 0
+            self._statuses = {}
+            # algorithm -> [per bucket counts (last one = +Inf), sum of seconds]
+            self._histograms = {}
+            self._start = time.monotonic()
+            # (time, runs) after each maze, for runs_per_second
+            self._rate_samples = deque([(self._start, 0)])
+
+    def observe_run(self, algorithm: str, status: str, wall_time_ns):
+        seconds = max(0, int(wall_time_ns or 0)) / 1e9
+        with self._lock:
+            self._runs += 1
+            key = (algorithm, status)
+            self._statuses[key] = self._statuses.get(key, 0) + 1
+            histogram = self._histograms.get(algorithm)
+            if histogram is None:
+                histogram = self._histograms[algorithm] = [[0] * (len(RUN_SECONDS_BUCKETS) + 1), 0.0]
+            histogram[0][bisect.bisect_left(RUN_SECONDS_BUCKETS, seconds)] += 1
+            histogram[1] += seconds
+
+    def accept_maze(self):
+        with self._lock:
+            self._accepted += 1
+
+    def reject_maze(self, reason: str = "unsolvable"):
+        with self._lock:
+            self._rejected[reason] = self._rejected.get(reason, 0) + 1
+
+    def maze_done(self, completed: int):
+        with self._lock:
+            self._completed = completed
+            self._rate_samples.append((time.monotonic(), self._runs))
+
+    def end_batch(self):
+        """The batch finished or was stopped, the counts stay up until the next begin_batch."""
+        with self._lock:
+            self._running = 0
+        if self.path:
+            self.write()
+
+    # --- Output ---
+
+    def _runs_per_second(self, now: float) -> float:
+        samples = self._rate_samples
+        # Keep one sample from before the window, so the rate covers the whole window
+        while len(samples) > 1 and now - samples[1][0] >= RATE_WINDOW:
+            samples.popleft()
+        since, runs = samples[0]
+        return (self._runs - runs) / (now - since) if now > since else 0.0
+
+    def render(self, openmetrics: bool = False) -> str:
+        """The metrics as Prometheus 0.0.4 text, or OpenMetrics text."""
+        now = time.monotonic()
+        lines = []
+
+        def family(name, kind, help_text):
+            # 0.0.4 has no info type and names a counter by its _total series, OpenMetrics by the family
+            if not openmetrics:
+                if kind == "info":
+                    name, kind = f"{name}_info", "gauge"
+                elif kind == "counter":
+                    name = f"{name}_total"
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"# HELP {name} {help_text}")
+
+        with self._lock:
+            family("maze_batch", "info", "The batch being run.")
+            lines.append(f'maze_batch_info{{batch="{_label(self._stamp)}",mode="{_label(self._mode)}"}} 1')
+            family("maze_batch_running", "gauge", "1 while a batch is running.")
+            lines.append(f"maze_batch_running {self._running}")
+            family("maze_batch_mazes_completed", "gauge", "Mazes with every algorithm done.")
+            lines.append(f"maze_batch_mazes_completed {self._completed}")
+            if self._target is not None:
+                family("maze_batch_mazes_target", "gauge", "Mazes the batch was asked for.")
+                lines.append(f"maze_batch_mazes_target {self._target}")
+
+            family("maze_batch_mazes_rejected", "counter", "Random mazes thrown away.")
+            for reason, count in self._rejected.items():
+                lines.append(f'maze_batch_mazes_rejected_total{{reason="{_label(reason)}"}} {count}')
+            rejected = sum(self._rejected.values())
+            generated = rejected + self._accepted
+            family("maze_batch_reject_ratio", "gauge", "Rejected mazes / generated mazes.")
+            lines.append(f"maze_batch_reject_ratio {rejected / generated if generated else 0.0}")
+
+            family("maze_batch_runs", "counter", "Algorithm runs by outcome.")
+            statuses = list(RUN_STATUSES)
+            statuses += sorted({status for _, status in self._statuses} - set(statuses))
+            for algorithm in self._histograms:
+                for status in statuses:
+                    count = self._statuses.get((algorithm, status), 0)
+                    lines.append(f'maze_batch_runs_total{{algorithm="{_label(algorithm)}",'
+                                 f'status="{_label(status)}"}} {count}')
+            family("maze_batch_runs_per_second", "gauge", f"Algorithm runs per second over the last "
+                                                          f"{RATE_WINDOW:g} seconds.")
+            lines.append(f"maze_batch_runs_per_second {self._runs_per_second(now)}")
+
+            family("maze_batch_run_seconds", "histogram", "Wall time of the algorithm runs.")
+            for algorithm, (buckets, total) in self._histograms.items():
+                name = _label(algorithm)
+                cumulative = 0
+                for bound, count in zip((*RUN_SECONDS_BUCKETS, "+Inf"), buckets):
+                    cumulative += count
+                    le = bound if bound == "+Inf" else repr(float(bound))
+                    lines.append(f'maze_batch_run_seconds_bucket{{algorithm="{name}",le="{le}"}} {cumulative}')
+                lines.append(f'maze_batch_run_seconds_count{{algorithm="{name}"}} {cumulative}')
+                lines.append(f'maze_batch_run_seconds_sum{{algorithm="{name}"}} {total}')
+
+            family("maze_batch_elapsed_seconds", "gauge", "Seconds since the batch started.")
+            lines.append(f"maze_batch_elapsed_seconds {now - self._start}")
+
+        resident = resident_bytes()
+        if resident is not None:
+            family("maze_batch_resident_memory_bytes", "gauge", "Resident memory of the batch process.")
+            lines.append(f"maze_batch_resident_memory_bytes {resident}")
+        if openmetrics:
+            lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def write(self):
+        """Write the metrics file now (replacing it in one go)."""
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as fh:
+                fh.write(self.render())
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            if not self._write_failed:
+                print(f"Metrics: could not write {self.path} ({e})")
+            self._write_failed = True
+
+    def _write_loop(self):
+        while not self._stop.wait(self.interval):
+            self.write()
+
+    def close(self):
+        """Stop serving / writing, the file is written one last time."""
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self.write()
@@ -0,0 +1,533 @@
+# Headless batch runner, the same batch / replay tests as the visualiser's batch controls but without Tkinter
+# every algorithm is driven straight through its search() generator, so it runs at full CPU speed on machines with no display
+#
+# usage:
+#   python batchRunner.py --mazes 100                       random mazes, every algorithm on each
+#   python batchRunner.py --mazes 100 --seed 42 --workers 8 reproducible random mazes on 8 processes
+#   python batchRunner.py --replay batch_outputs/batch_seeds_XXXX.txt
+#   python batchRunner.py --replay corpus/ --replay-start 1 --replay-stride 4   2nd quarter of a sharded (gzip) corpus
+#   python batchRunner.py --mazes 100 --supervised --mem-limit 512   each algorithm in its own killable child process
+#   python batchRunner.py --resume batch_outputs/batch_journal_XXXX.jsonl   carry on a batch that was interrupted
+#   python batchRunner.py --mazes 100 --db results.sqlite   runs go into a SQLite store too (see resultsStore.py)
+#   python batchRunner.py --mazes 200000 --format columnar   compact binary results (see columnarResults.py)
+#   python batchRunner.py --mazes 100 --dedup skip          never run a maze an earlier batch already ran (mazeIndex.py)
+#   python batchRunner.py --mazes 100 --memory-probe        measure each search's own memory too (searchMemory.py)
+#   python batchRunner.py --mazes 20 --trace trace.json     Chrome trace of every 100th search step (searchTrace.py)
+#   python batchRunner.py --mazes 50 --profile              cProfile per algorithm next to the CSV (searchProfile.py)
+#   python batchRunner.py --mazes 100000 --metrics-port 9464  live metrics for Prometheus (batchMetrics.py)
+#
+# the CSV + seeds files have the same columns and names as the ones the visualiser writes. Rows are buffered and written
+# out every --flush-rows rows / --flush-seconds seconds (and at the end, or on Ctrl+C), --flush-rows 1 writes each row
+# straight away
+#
+# with --workers each maze (all eight algorithms on it) is one job for a process pool, the worker rebuilds the maze
+# from its seed token and times the searches itself. Results are merged back in submission order, so run ids,
+# row order and the seeds file are exactly what a serial run over the same tokens writes
+import argparse
+import itertools
+import os
+import random
+import sys
+import tracemalloc
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import Maze
+import SearchWorkspace
+import searchMemory
+import searchProfile
+import searchTrace
+import searchWatchdog
+from batchMetrics import DEFAULT_WRITE_INTERVAL, BatchMetrics
+from mazeIndex import DEDUP_MODES, DEFAULT_INDEX_PATH, MazeIndex
+from resultsStore import ResultsStore
+from seedStream import SeedStream
+from batchJournal import load_journal
+from batchCore import (ALGO_OPTIONS, DEFAULT_FLUSH_ROWS, DEFAULT_FLUSH_SECONDS, RESULT_FORMATS, BatchOutputs,
+                       decode_seed_token, make_row, max_steps_for, random_seed_token, randomize_from_seed,
+                       reject_summary, run_search, seed_maze_size, time_limit_ns_from_seconds)
+
+# Same size as the maze in main.py, so the seed tokens work in both the visualiser and here
+DEFAULT_WIDTH = 14
+DEFAULT_HEIGHT = 10
+
+# How many mazes each worker may have queued ahead of the one being written out
+JOBS_PER_WORKER = 4
+
+# Maze + workspace reused by every job run in this process (each pool worker has its own)
+_process_state = {}
+
+
+def run_maze(maze: Maze.Maze, workspace, time_limit_ns: int, *, stop_if_unsolvable=True, limits=None,
+             algorithms=ALGO_OPTIONS, precheck=False):
+    """Run every algorithm on one maze, returns the list of RunMetrics.
+
+    BFS (Graph) goes first; if it can't reach the goal the maze is unsolvable and only its metrics are returned.
+    precheck skips the searches altogether (returns []) for a maze whose goal can't be reached (Maze.is_solvable).
+    limits = (cpu_seconds, mem_bytes) runs each algorithm supervised in its own child process (see searchWatchdog).
+    """
+    if precheck and not maze.is_solvable():
+        return []
+    results = []
+    for algo_choice in algorithms:
+        if limits is not None:
+            metrics = searchWatchdog.run_supervised(maze, algo_choice, cpu_seconds=limits[0], mem_bytes=limits[1],
+                                                    max_steps=max_steps_for(algo_choice), time_limit_ns=time_limit_ns)
+        else:
+            metrics = run_search(maze, algo_choice, workspace=workspace,
+                                 max_steps=max_steps_for(algo_choice), time_limit_ns=time_limit_ns)
+        results.append(metrics)
+        if stop_if_unsolvable and algo_choice == "BFS (Graph)" and metrics.status != "success":
+            break
+    return results
+
+
+def evaluate_token(token: str, width: int, height: int, time_limit_ns: int, limits=None, algorithms=ALGO_OPTIONS,
+                   precheck=False):
+    """Build the maze for one seed token and run every algorithm on it.
+
+    Returns (wall_pct, oneway_pct, results), or None if the token is invalid.
+    Passing algorithms (e.g. the ones a resumed maze still misses) runs just those, without the solvability stop.
+    This is the unit of work for the process pool, so it only takes and returns picklable values.
+    """
+    payload = decode_seed_token(token)
+    if payload is None:
+        return None
+
+    # A token that carries its own size wins over the --width / --height
+    key = seed_maze_size(payload, width, height)
+    if key not in _process_state:
+        maze = Maze.Maze.blank(*key)
+        _process_state.clear()
+        _process_state[key] = (maze, SearchWorkspace.SearchWorkspace.for_maze(maze))
+    maze, workspace = _process_state[key]
+
+    wall_pct = int(payload["wall"])
+    oneway_pct = int(payload["oneway"])
+    randomize_from_seed(maze, payload)
+    return wall_pct, oneway_pct, run_maze(maze, workspace, time_limit_ns, limits=limits, algorithms=algorithms,
+                                          stop_if_unsolvable=algorithms is ALGO_OPTIONS, precheck=precheck)
+
+
+def _init_worker(trace_memory: bool, memory_probe: bool = False):
+    if (trace_memory or memory_probe) and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    searchMemory.set_file_probe(memory_probe)
+
+
+def _evaluate_job(job):
+    return evaluate_token(*job)
+
+
+def _limits(args):
+    # (cpu_seconds, mem_bytes) for supervised runs, None otherwise
+    if not args.supervised:
+        return None
+    return args.cpu_limit, int(args.mem_limit * 1024 * 1024)
+
+
+def evaluate_in_order(tokens, args, time_limit_ns: int, *, precheck=False, skip=None):
+    """Yield (token, evaluate_token(...)) for each token, in the order the tokens come in.
+
+    Tokens skip(token) is true for aren't run at all, they come out in their place as (token, None).
+
+    With one worker everything runs in this process. Otherwise the tokens are spread over a process pool with
+    at most JOBS_PER_WORKER jobs per worker in flight, so an endless token stream (random mode) is only read
+    as far as it is needed. Jobs still running when the caller stops are cancelled.
+    """
+    tokens = iter(tokens)
+    limits = _limits(args)
+    if args.workers <= 1:
+        for token in tokens:
+            if skip is not None and skip(token):
+                yield token, None
+                continue
+            yield token, evaluate_token(token, args.width, args.height, time_limit_ns, limits, precheck=precheck)
+        return
+
+    def submit(token):
+        if skip is not None and skip(token):
+            return None
+        return executor.submit(_evaluate_job, (token, args.width, args.height, time_limit_ns, limits, ALGO_OPTIONS,
+                                               precheck))
+
+    window = args.workers * JOBS_PER_WORKER
+    pending = deque()
+    executor = ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                                   initargs=(args.trace_memory, args.memory_probe))
+    try:
+        for token in itertools.islice(tokens, window):
+            pending.append((token, submit(token)))
+
+        while pending:
+            token, future = pending.popleft()
+            result = None if future is None else future.result()
+
+            # Refill before handing the result over so the workers stay busy while it is written out
+            for next_token in itertools.islice(tokens, 1):
+                pending.append((next_token, submit(next_token)))
+
+            yield token, result
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def random_tokens(args):
+    """Endless stream of candidate seed tokens, the same stream every time for a given --seed."""
+    rng = random.Random(args.seed) if args.seed is not None else None
+    while True:
+        yield random_seed_token(args.wall_max, args.oneway_max, rng, width=args.width, height=args.height)[0]
+
+
+def run_random(args, outputs: BatchOutputs, time_limit_ns: int, *, completed=0, first_candidate=0, tokens=None,
+               maze_index=None):
+    """Random batch mode: unsolvable mazes are regenerated and not counted. Yields the count after each maze.
+
+    Mazes whose goal can't be reached are thrown away by the cheap Maze.is_solvable check before any search runs,
+    BFS (Graph) failing anyway (e.g. over its time limit) rejects a maze the same way.
+    With a maze_index (mazeIndex.MazeIndex) a maze an earlier token already made is skipped without being run
+    (--dedup skip) or run and flagged (--dedup flag), and every accepted maze is added to the index.
+
+    A resumed batch passes the mazes it already has (completed) and where it was in the token stream.
+    """
+    if completed >= args.mazes:
+        return
+    if tokens is None:
+        tokens = random_tokens(args)
+
+    # Fingerprints are worked out here as the tokens are handed out, the index itself is only checked (again) and
+    # updated as results come back in order, so the outcome is the same for any number of workers
+    fingerprints = {}
+
+    def known_maze(token):
+        fingerprint = fingerprints[token] = maze_index.fingerprint(token, width=args.width, height=args.height)
+        return args.dedup == "skip" and maze_index.duplicate_of(token, fingerprint) is not None
+
+    results_in_order = evaluate_in_order(tokens, args, time_limit_ns, precheck=True,
+                                         skip=known_maze if maze_index is not None else None)
+    try:
+        for candidate, (token, evaluated) in enumerate(results_in_order, start=first_candidate):
+            outputs.start_maze(token, candidate=candidate)
+            fingerprint = duplicate_of = None
+            if maze_index is not None:
+                fingerprint = fingerprints.pop(token, None) or maze_index.fingerprint(token, width=args.width,
+                                                                                      height=args.height)
+                duplicate_of = maze_index.duplicate_of(token, fingerprint)
+                if duplicate_of is not None and args.dedup == "skip":
+                    outputs.reject_maze("duplicate")
+                    continue
+
+            wall_pct, oneway_pct, results = evaluated
+            if not results:
+                outputs.reject_maze()
+                continue
+            if results[0].status != "success":
+                outputs.reject_maze()
+                print("Batch: unsolvable maze -> regenerating")
+                continue
+
+            completed += 1
+            outputs.accept_maze(token, completed)
+            if maze_index is not None:
+                if duplicate_of is not None:
+                    outputs.flag_duplicate(duplicate_of)
+                    maze_index.flag(token, fingerprint, duplicate_of, outputs.stamp)
+                    print(f"Batch: maze {completed} is a duplicate of {duplicate_of}")
+                maze_index.add(token, fingerprint, outputs.stamp)
+            for metrics in results:
+                outputs.write_row(make_row(completed, token, wall_pct, oneway_pct, metrics))
+            outputs.finish_maze(completed)
+            print(f"Batch: completed {completed}/{args.mazes}")
+            yield completed
+
+            if completed >= args.mazes:
+                break
+    finally:
+        # Shuts the pool down (cancelling the extra candidates still queued)
+        results_in_order.close()
+
+
+def run_replay(args, outputs: BatchOutputs, time_limit_ns: int, *, completed=0, first_index=0):
+    """Replay mode: every valid token in the seeds files is run, unsolvable ones only get their BFS row.
+
+    The seeds files are streamed, so a replay of any size runs in constant memory.
+    Yields the count after each maze. A resumed batch passes the mazes it already has and the next line to run.
+    """
+    stream = SeedStream(args.replay, start=args.replay_start, stride=args.replay_stride, first_index=first_index)
+
+    # The pool hands results back in the order the tokens went in, so the indices can just queue up alongside
+    indices = deque()
+
+    def tokens():
+        for index, token in stream:
+            indices.append(index)
+            yield token
+
+    results_in_order = evaluate_in_order(tokens(), args, time_limit_ns)
+    try:
+        for token, evaluated in results_in_order:
+            index = indices.popleft()
+            wall_pct, oneway_pct, results = evaluated
+            completed += 1
+            outputs.start_maze(token, index=index)
+            if results[0].status != "success":
+                print("Replay: unsolvable seed -> skipping")
+            else:
+                outputs.accept_maze(token, completed)
+            for metrics in results:
+                outputs.write_row(make_row(completed, token, wall_pct, oneway_pct, metrics))
+            outputs.finish_maze(completed)
+            print(f"Replay: completed {completed} (line {index + 1})")
+            yield completed
+    finally:
+        results_in_order.close()
+        if stream.invalid:
+            print(f"Replay: skipped {stream.invalid} invalid seed line(s)")
+
+
+def finish_interrupted_maze(args, outputs: BatchOutputs, time_limit_ns: int, current: dict):
+    """Run the algorithms a maze was still missing when its batch stopped, returns its run_id."""
+    run_id = current["run_id"]
+    token = current["token"]
+    done = set(current["algorithms"])
+    remaining = [algo for algo in ALGO_OPTIONS if algo not in done]
+
+    # An unsolvable replay seed only ever gets its BFS row
+    if current["accepted"] and remaining:
+        wall_pct, oneway_pct, results = evaluate_token(token, args.width, args.height, time_limit_ns,
+                                                       _limits(args), remaining)
+        for metrics in results:
+            outputs.write_row(make_row(run_id, token, wall_pct, oneway_pct, metrics))
+    outputs.finish_maze(run_id)
+    return run_id
+
+
+def resume_batch(args, outputs: BatchOutputs, state, time_limit_ns: int, maze_index=None):
+    """Carry on an interrupted batch from its journal, outputs = BatchOutputs.resume(...). Yields like run_random."""
+    completed = state["completed"]
+    current = state["current"]
+
+    # A maze with some of its rows written is finished first, a maze with none is simply run again
+    if current is not None and current["run_id"] is not None:
+        completed = finish_interrupted_maze(args, outputs, time_limit_ns, current)
+        current = None
+        yield completed
+
+    if args.replay:
+        first_index = current["index"] if current is not None else state["next_index"]
+        yield from run_replay(args, outputs, time_limit_ns, completed=completed, first_index=first_index)
+    else:
+        first_candidate = current["candidate"] if current is not None else state["next_candidate"]
+        if args.seed is not None:
+            # A seeded token stream is the same every time, skip the part that was used
+            tokens = itertools.islice(random_tokens(args), first_candidate, None)
+        else:
+            # Unseeded: redo the maze in progress, then fresh tokens
+            tokens = itertools.chain([current["token"]] if current is not None else [], random_tokens(args))
+        yield from run_random(args, outputs, time_limit_ns, completed=completed,
+                              first_candidate=first_candidate, tokens=tokens, maze_index=maze_index)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Run the maze search batch tests without a GUI.")
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--mazes", type=int, help="number of random solvable mazes to test")
+    mode.add_argument("--replay", nargs="+",
+                      help="seeds file(s) from an earlier batch run to replay: files (plain or gzip), directories of "
+                           "shards or glob patterns")
+    mode.add_argument("--resume", help="journal (batch_journal_*.jsonl) of an interrupted batch to carry on")
+    parser.add_argument("--replay-start", type=int, default=0,
+                        help="replay only the seed lines start, start + stride, ... (default 0)")
+    parser.add_argument("--replay-stride", type=int, default=1,
+                        help="replay every stride-th seed line, so N runners with starts 0..N-1 split one corpus (default 1)")
+    parser.add_argument("--wall-max", type=int, default=30, help="max wall %% for random mazes (default 30)")
+    parser.add_argument("--oneway-max", type=int, default=30, help="max one-way %% for random mazes (default 30)")
+    parser.add_argument("--seed", help="master seed for random mode, the same seed gives the same mazes")
+    parser.add_argument("--time-limit", default="180", help="per algorithm time limit in seconds (default 180)")
+    parser.add_argument("--width", type=int, default=DEFAULT_WIDTH, help=f"maze width (default {DEFAULT_WIDTH})")
+    parser.add_argument("--height", type=int, default=DEFAULT_HEIGHT, help=f"maze height (default {DEFAULT_HEIGHT})")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="worker processes, 0 = one per CPU (default 1, run everything in this process)")
+    parser.add_argument("--supervised", action="store_true",
+                        help="run each algorithm in a child process that is killed when it goes over its budget")
+    parser.add_argument("--cpu-limit", type=float,
+                        help="supervised CPU time budget per algorithm in seconds (default: the time limit)")
+    parser.add_argument("--mem-limit", type=float, default=searchWatchdog.DEFAULT_MEM_LIMIT_MB,
+                        help=f"supervised resident memory budget per algorithm in MB (default {searchWatchdog.DEFAULT_MEM_LIMIT_MB})")
+    parser.add_argument("--out-dir", default="batch_outputs", help="where the CSV + seeds files go")
+    parser.add_argument("--db", help="SQLite results store to add the runs to as well (see resultsStore.py)")
+    parser.add_argument("--dedup", choices=DEDUP_MODES, default="off",
+                        help="random mode: skip mazes an earlier token (in any batch) already made, or run them and "
+                             "flag them, using the shared maze index (default off)")
+    parser.add_argument("--maze-index", default=DEFAULT_INDEX_PATH,
+                        help=f"maze fingerprint index for --dedup (default {DEFAULT_INDEX_PATH})")
+    parser.add_argument("--format", choices=RESULT_FORMATS, default="csv",
+                        help="results file: csv, or columnar for a compact binary .mzcol file (default csv)")
+    parser.add_argument("--flush-rows", type=int, default=DEFAULT_FLUSH_ROWS,
+                        help=f"write the results out every this many rows (default {DEFAULT_FLUSH_ROWS})")
+    parser.add_argument("--flush-seconds", type=float, default=DEFAULT_FLUSH_SECONDS,
+                        help=f"... or after this many seconds, whichever comes first (default {DEFAULT_FLUSH_SECONDS:g})")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="run tracemalloc for the avg_mem_bytes column (much slower, off by default)")
+    parser.add_argument("--memory-probe", action="store_true",
+                        help="measure the memory each search's own structures take (traced_bytes column) with "
+                             "filtered tracemalloc snapshots, slower still (off by default). The snapshot time is "
+                             "kept out of --time-limit and wall_time_ns (a supervised run's CPU budget still counts "
+                             "it), tracemalloc itself slows every step like --trace-memory does")
+    parser.add_argument("--trace",
+                        help="trace the searches into this file: Chrome trace JSON for a .json name, collapsed "
+                             "stacks (flamegraph) otherwise. Runs on one worker, not with --supervised")
+    parser.add_argument("--trace-every", type=int, default=searchTrace.DEFAULT_TRACE_EVERY,
+                        help=f"trace every N-th search step (default {searchTrace.DEFAULT_TRACE_EVERY})")
+    parser.add_argument("--profile", action="store_true",
+                        help="run the searches under cProfile and write a .pstats file per algorithm and a hotspot "
+                             "summary next to the CSV. Runs on one worker, not with --supervised")
+    parser.add_argument("--profile-every", type=int, default=searchProfile.DEFAULT_PROFILE_EVERY,
+                        help="profile every N-th run of each algorithm (default every run)")
+    parser.add_argument("--profile-top", type=int, default=searchProfile.DEFAULT_PROFILE_TOP,
+                        help=f"functions per algorithm in the summary (default {searchProfile.DEFAULT_PROFILE_TOP})")
+    parser.add_argument("--metrics-port", type=int,
+                        help="serve live batch metrics (Prometheus / OpenMetrics text) on http://127.0.0.1:PORT/metrics")
+    parser.add_argument("--metrics-file",
+                        help="write the same metrics to this file every --metrics-interval seconds")
+    parser.add_argument("--metrics-interval", type=float, default=DEFAULT_WRITE_INTERVAL,
+                        help=f"seconds between metrics file writes (default {DEFAULT_WRITE_INTERVAL:g})")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.mazes is not None and args.mazes <= 0:
+        print("Batch: enter a positive number of mazes", file=sys.stderr)
+        return 2
+
+    state = None
+    if args.resume:
+        journal_path = args.resume
+        try:
+            state = load_journal(journal_path)
+        except (OSError, ValueError) as e:
+            print(f"Resume: {e}", file=sys.stderr)
+            return 2
+        if state["finished"]:
+            print(f"Resume: that batch already finished | CSV: {state['csv_path']} | Seeds: {state['seed_path']}")
+            return 0
+
+        # The batch's own settings, only the worker count, memory tracing, tracing, profiling and metrics can change
+        # on resume
+        workers, trace_memory, memory_probe = args.workers, args.trace_memory, args.memory_probe
+        trace, trace_every = args.trace, args.trace_every
+        profile = (args.profile, args.profile_every, args.profile_top)
+        metrics_options = (args.metrics_port, args.metrics_file, args.metrics_interval)
+        args = build_parser().parse_args(["--mazes", "1"])
+        vars(args).update(state["settings"])
+        args.resume, args.workers, args.trace_memory = journal_path, workers, trace_memory
+        args.memory_probe, args.trace, args.trace_every = memory_probe, trace, trace_every
+        args.profile, args.profile_every, args.profile_top = profile
+        args.metrics_port, args.metrics_file, args.metrics_interval = metrics_options
+
+    if args.replay:
+        try:
+            SeedStream(args.replay, start=args.replay_start, stride=args.replay_stride)
+        except ValueError as e:
+            print(f"Replay: {e}", file=sys.stderr)
+            return 2
+
+    # Saved in the journal so a resume runs with exactly these settings
+    settings = {key: value for key, value in vars(args).items() if key != "resume"}
+
+    # Supervised searches run in child processes, their spans / profiles would never reach this process
+    for option, value in (("--trace", args.trace), ("--profile", args.profile)):
+        if value and args.supervised:
+            print(f"Batch: {option} can't be used with --supervised (the batch's own setting on --resume)",
+                  file=sys.stderr)
+            return 2
+
+    if args.workers <= 0:
+        args.workers = os.cpu_count() or 1
+
+    _init_worker(args.trace_memory, args.memory_probe)
+
+    # The spans are collected in this process, so a traced batch runs here too
+    tracer = None
+    if args.trace:
+        if args.workers > 1:
+            print("Batch: --trace runs on one worker")
+            args.workers = 1
+        tracer = searchTrace.SearchTracer(args.trace_every)
+        searchTrace.set_tracer(tracer)
+    # ... and so does a profiled one
+    profiler = None
+    if args.profile:
+        if args.workers > 1:
+            print("Batch: --profile runs on one worker")
+            args.workers = 1
+        profiler = searchProfile.RunProfiler(args.profile_every, top=args.profile_top)
+        searchProfile.set_profiler(profiler)
+
+    # Fail here on a bad size rather than in every worker
+    Maze.Maze.blank(args.width, args.height)
+    time_limit_ns = time_limit_ns_from_seconds(args.time_limit)
+    if args.cpu_limit is None or args.cpu_limit <= 0:
+        args.cpu_limit = time_limit_ns / 1_000_000_000
+
+    label = "Replay" if args.replay else "Batch"
+    completed = 0
+    metrics = None
+    if args.metrics_port is not None or args.metrics_file:
+        try:
+            metrics = BatchMetrics(args.metrics_file, port=args.metrics_port, interval=args.metrics_interval)
+        except OSError as e:
+            print(f"Metrics: {e}", file=sys.stderr)
+            return 2
+        if metrics.port is not None:
+            print(f"{label}: metrics on http://127.0.0.1:{metrics.port}/metrics")
+    store = ResultsStore(args.db) if args.db else None
+    # A replay runs its seeds as they are, dedup is for generating new mazes
+    maze_index = MazeIndex(args.maze_index) if args.dedup != "off" and not args.replay else None
+    if state is not None:
+        outputs = BatchOutputs.resume(args.resume, state, store=store, metrics=metrics, flush_rows=args.flush_rows,
+                                      flush_seconds=args.flush_seconds)
+        completed = state["completed"]
+        progress = resume_batch(args, outputs, state, time_limit_ns, maze_index)
+    else:
+        outputs = BatchOutputs(args.out_dir, settings=settings, store=store, metrics=metrics,
+                               results_format=args.format, flush_rows=args.flush_rows,
+                               flush_seconds=args.flush_seconds)
+        if args.replay:
+            progress = run_replay(args, outputs, time_limit_ns)
+        else:
+            progress = run_random(args, outputs, time_limit_ns, maze_index=maze_index)
+
+    try:
+        for completed in progress:
+            pass
+        outputs.finish()
+    except KeyboardInterrupt:
+        # Same as the stop button, everything written so far is kept and the journal can resume it
+        print(f"{label}: stopped, resume with --resume {outputs.journal_path}")
+    finally:
+        progress.close()
+        outputs.close()
+        if metrics is not None:
+            metrics.close()
+        if maze_index is not None:
+            maze_index.close()
+        if tracer is not None:
+            searchTrace.set_tracer(None)
+            spans = tracer.write(args.trace)
+            dropped = f", {tracer.dropped} dropped" if tracer.dropped else ""
+            print(f"{label}: {spans} trace spans{dropped} written to {args.trace}")
+        if profiler is not None:
+            searchProfile.set_profiler(None)
+            summary_path = profiler.write(os.path.dirname(outputs.csv_path), outputs.stamp)
+            if summary_path:
+                print(f"{label}: profile written to {summary_path} (+ one .pstats per algorithm)")
+
+    rejected = reject_summary(outputs.rejected, outputs.accepted, outputs.duplicates, outputs.flagged)
+    print(f"{label}: finished {completed}{rejected} | CSV: {outputs.csv_path} | Seeds: {outputs.seed_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,705 @@
+# Benchmark suite for the search algorithms
+#
+# Unlike a batch run (one timed run per maze, time summed from the per-step timers) this times whole searches:
+#   - a fixed seed corpus, either a seeds file or the first N solvable mazes drawn from a master seed
+#   - untimed warm-up runs, then repeated timed runs of every algorithm on every maze
+#   - the process pinned to one CPU where the OS allows it, and the garbage collector off while timing
+#   - medians, percentiles and a bootstrap confidence interval of the median, per maze size and algorithm
+# the results are written as JSON so runs can be compared across versions
+#
+# usage:
+#   python benchmark.py run --mazes 20 --repeats 7 --sizes 14x10,28x20 --out bench.json
+#   python benchmark.py run --corpus batch_outputs/batch_seeds_XXXX.txt --algorithms all
+#
+# regression gate: record a baseline once, later runs re-time the exact same corpus and fail (exit 1) on regressions
+#   python benchmark.py baseline --out bench_baseline.json
+#   python benchmark.py compare bench_baseline.json --time-tolerance 0.25
+#
+# scaling curves: square mazes from --min-side up, doubling each time, until every algorithm is over its time budget
+# or the next maze would not fit in memory; fits time ~ c * cells^k per algorithm and reports where each stops being usable
+#   python benchmark.py scaling --max-side 4096 --budget 2 --out scaling.json
+import argparse
+import gc
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+import Maze
+import SearchWorkspace
+from batchCore import (ALGO_OPTIONS, create_search_instance, decode_seed_token, max_steps_for, path_cost,
+                       random_seed_token, randomize_from_seed)
+
+BENCHMARK_SCHEMA = 1
+
+# Graph searches by default, the Tree ones mostly measure how fast they hit the step limit
+DEFAULT_ALGORITHMS = [algo for algo in ALGO_OPTIONS if "(Graph)" in algo]
+
+PERCENTILES = (5, 25, 75, 95)
+BOOTSTRAP_RESAMPLES = 1000
+
+
+# --- Statistics ---
+
+def percentile(sorted_values, pct):
+    """Linear interpolation between the closest ranks (the same as numpy's default)."""
+    if not sorted_values:
+        return None
+    rank = (len(sorted_values) - 1) * pct / 100
+    low = math.floor(rank)
+    high = math.ceil(rank)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+def bootstrap_median_ci(values, confidence=0.95, resamples=BOOTSTRAP_RESAMPLES, seed=0):
+    """Percentile bootstrap confidence interval of the median, seeded so the same samples give the same interval."""
+    if len(values) < 2:
+        return [values[0], values[0]] if values else [None, None]
+    rng = random.Random(seed)
+    n = len(values)
+    medians = sorted(statistics.median(rng.choices(values, k=n)) for _ in range(resamples))
+    tail = (1 - confidence) / 2 * 100
+    return [percentile(medians, tail), percentile(medians, 100 - tail)]
+
+
+def summarise(values):
+    """Median, percentiles, mean, stdev and the 95% CI of the median of a list of samples."""
+    ordered = sorted(values)
+    summary = {
+        "n": len(ordered),
+        "median": percentile(ordered, 50),
+        "mean": statistics.fmean(ordered) if ordered else None,
+        "stdev": statistics.stdev(ordered) if len(ordered) > 1 else 0.0,
+        "min": ordered[0] if ordered else None,
+        "max": ordered[-1] if ordered else None,
+    }
+    for pct in PERCENTILES:
+        summary[f"p{pct}"] = percentile(ordered, pct)
+    summary["ci95_median"] = bootstrap_median_ci(ordered)
+    return summary
+
+
+# --- Environment control ---
+
+def pin_cpu(cpu=None):
+    """Pin this process to one CPU (Linux only), returns the CPU or None when pinning isn't possible."""
+    if not hasattr(os, "sched_setaffinity"):
+        return None
+    try:
+        allowed = sorted(os.sched_getaffinity(0))
+        if cpu is None:
+            cpu = allowed[-1]  # the last one is the least likely to be handling interrupts
+        os.sched_setaffinity(0, {cpu})
+        return cpu
+    except (OSError, ValueError):
+        return None
+
+
+# --- Running ---
+
+def timed_search(maze: Maze.Maze, algo_choice: str, workspace, max_steps=None):
+    """Drive one search to the end, returns (elapsed_ns, steps, status, path).
+
+    Only the generator is driven, none of the per-step bookkeeping run_search does, so the time is the search itself.
+    max_steps defaults to the batch step limit of the algorithm.
+    """
+    search_instance, search_type = create_search_instance(maze, algo_choice, workspace)
+    goal = search_instance.end
+    if max_steps is None:
+        max_steps = max_steps_for(algo_choice)
+
+    steps = 0
+    status = "fail"
+    generator = search_instance.search()
+    start_ns = time.perf_counter_ns()
+    for current_node, _, _, _ in generator:
+        if current_node is None:
+            break
+        steps += 1
+        if current_node == goal:
+            status = "success"
+            break
+        if steps >= max_steps:
+            status = "timeout"
+            break
+    elapsed_ns = time.perf_counter_ns() - start_ns
+    generator.close()
+
+    path = None
+    if status == "success" and search_type != "Tree":
+        path = search_instance.reconstruct_path()
+    return elapsed_ns, steps, status, path
+
+
+def parse_size(text):
+    width, _, height = text.lower().partition("x")
+    return int(width), int(height)
+
+
+def load_corpus(path):
+    tokens = []
+    for line in Path(path).read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if line and not line.startswith("#") and decode_seed_token(line) is not None:
+            tokens.append(line)
+    return tokens
+
+
+def build_corpus(maze: Maze.Maze, count, seed, wall_max, oneway_max):
+    """The first count solvable mazes (the goal is reachable) from the token stream of a master seed."""
+    rng = random.Random(seed)
+    tokens = []
+    while len(tokens) < count:
+        token = random_seed_token(wall_max, oneway_max, rng, width=maze.maze_width, height=maze.maze_height)[0]
+        randomize_from_seed(maze, decode_seed_token(token))
+        if maze.is_solvable():
+            tokens.append(token)
+    return tokens
+
+
+def benchmark_size(width, height, args, algorithms, corpus=None):
+    """Run every algorithm over the corpus for one maze size, returns (corpus, results, per_maze).
+
+    per_maze has one entry per (seed token, algorithm), the unit the regression gate compares.
+    """
+    size = f"{width}x{height}"
+    maze = Maze.Maze.blank(width, height)
+    workspace = SearchWorkspace.SearchWorkspace.for_maze(maze)
+
+    if corpus is None and args.corpus:
+        corpus = load_corpus(args.corpus)
+    elif corpus is None:
+        corpus = build_corpus(maze, args.mazes, args.seed, args.wall_max, args.oneway_max)
+
+    samples = {algo: {"time_ns": [], "steps": [], "path_len": [], "path_cost": [], "statuses": {}}
+               for algo in algorithms}
+    per_maze = []
+
+    for token in corpus:
+        randomize_from_seed(maze, decode_seed_token(token))
+
+        for algo_choice in algorithms:
+            for _ in range(args.warmup):
+                timed_search(maze, algo_choice, workspace)
+
+            record = samples[algo_choice]
+            entry = {"size": size, "seed_token": token, "algorithm": algo_choice, "time_ns": []}
+            for repeat in range(args.repeats):
+                gc.collect()
+                if not args.keep_gc:
+                    gc.disable()
+                try:
+                    elapsed_ns, steps, status, path = timed_search(maze, algo_choice, workspace)
+                finally:
+                    gc.enable()
+                record["time_ns"].append(elapsed_ns)
+                entry["time_ns"].append(elapsed_ns)
+
+                # Everything but the time is the same on every repeat, so it is only kept once per maze
+                if repeat == 0:
+                    record["steps"].append(steps)
+                    record["statuses"][status] = record["statuses"].get(status, 0) + 1
+                    entry.update(expansions=steps, status=status, path_len=None, path_cost=None)
+                    if path:
+                        entry["path_len"] = len(path) - 1
+                        entry["path_cost"] = path_cost(maze, path)
+                        record["path_len"].append(entry["path_len"])
+                        record["path_cost"].append(entry["path_cost"])
+
+            entry["time_ns"] = summarise(entry["time_ns"])
+            per_maze.append(entry)
+
+    results = []
+    for algo_choice in algorithms:
+        record = samples[algo_choice]
+        results.append({
+            "size": size,
+            "algorithm": algo_choice,
+            "mazes": len(corpus),
+            "repeats": args.repeats,
+            "time_ns": summarise(record["time_ns"]),
+            "expansions": {
+                "total": sum(record["steps"]),
+                "per_maze": record["steps"],
+                "median": percentile(sorted(record["steps"]), 50),
+            },
+            "path_len_mean": statistics.fmean(record["path_len"]) if record["path_len"] else None,
+            "path_cost_mean": statistics.fmean(record["path_cost"]) if record["path_cost"] else None,
+            "statuses": record["statuses"],
+        })
+    return corpus, results, per_maze
+
+
+def print_table(results):
+    header = f"{'size':>8}  {'algorithm':<14} {'median us':>11} {'p5 us':>9} {'p95 us':>9} {'95% CI (median) us':>22} {'expansions':>11} {'avg path':>9}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        t = r["time_ns"]
+        lo, hi = t["ci95_median"]
+        ci = f"{lo / 1000:.1f} - {hi / 1000:.1f}" if lo is not None else "-"
+        avg_path = f"{r['path_len_mean']:.1f}" if r["path_len_mean"] is not None else "-"
+        print(f"{r['size']:>8}  {r['algorithm']:<14} {t['median'] / 1000:>11.1f} {t['p5'] / 1000:>9.1f} "
+              f"{t['p95'] / 1000:>9.1f} {ci:>22} {r['expansions']['total']:>11} {avg_path:>9}")
+
+
+def parse_algorithms(text):
+    """Algorithm labels from the --algorithms option, raises ValueError for unknown ones."""
+    if text == "all":
+        return list(ALGO_OPTIONS)
+    if not text:
+        return list(DEFAULT_ALGORITHMS)
+    algorithms = [a.strip() for a in text.split(",") if a.strip()]
+    unknown = [a for a in algorithms if a not in ALGO_OPTIONS]
+    if unknown:
+        raise ValueError(f"Unknown algorithm(s): {', '.join(unknown)}, choose from {', '.join(ALGO_OPTIONS)}")
+    return algorithms
+
+
+def run_benchmark(args, sizes, algorithms, corpora=None):
+    """Benchmark every size, corpora maps a size like "14x10" to the seed tokens to use instead of args' corpus."""
+    pinned = pin_cpu(args.cpu) if not args.no_pin else None
+
+    used_corpora = {}
+    results = []
+    per_maze = []
+    for width, height in sizes:
+        size = f"{width}x{height}"
+        corpus = corpora.get(size) if corpora else None
+        corpus, size_results, size_per_maze = benchmark_size(width, height, args, algorithms, corpus)
+        used_corpora[size] = corpus
+        results.extend(size_results)
+        per_maze.extend(size_per_maze)
+
+    return {
+        "schema": BENCHMARK_SCHEMA,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "environment": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "pinned_cpu": pinned,
+        },
+        "settings": {
+            "sizes": [f"{w}x{h}" for w, h in sizes],
+            "algorithms": algorithms,
+            "warmup": args.warmup,
+            "repeats": args.repeats,
+            "gc_disabled": not args.keep_gc,
+            "seed": args.seed if not args.corpus else None,
+            "corpus_file": args.corpus,
+        },
+        "corpus": used_corpora,
+        "results": results,
+        "per_maze": per_maze,
+    }
+
+
+def write_report(report, out):
+    if out:
+        with open(out, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+        print(f"Results written to {out}")
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+def command_run(args):
+    try:
+        algorithms = parse_algorithms(args.algorithms)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    sizes = [parse_size(s) for s in args.sizes.split(",") if s.strip()]
+    report = run_benchmark(args, sizes, algorithms)
+
+    print_table(report["results"])
+    write_report(report, args.out)
+    return 0
+
+
+# --- Regression gate ---
+
+def compare_reports(baseline, current, *, time_tolerance, min_time_delta_ns, cost_tolerance, check_time=True):
+    """Compare two reports entry by entry (size, seed token, algorithm).
+
+    Returns a list of (entry key, metric, baseline value, current value, note) rows, one per regression:
+      - expansions and status must match exactly, the searches are deterministic for a given seed
+      - path cost may not grow by more than cost_tolerance (a fraction)
+      - the median time may not grow by more than time_tolerance (a fraction) and min_time_delta_ns
+    """
+    current_entries = {(e["size"], e["seed_token"], e["algorithm"]): e for e in current["per_maze"]}
+    regressions = []
+    for base in baseline["per_maze"]:
+        key = (base["size"], base["seed_token"], base["algorithm"])
+        new = current_entries.get(key)
+        if new is None:
+            regressions.append((key, "entry", "present", "missing", "not run"))
+            continue
+
+        if new["status"] != base["status"]:
+            regressions.append((key, "status", base["status"], new["status"], "changed"))
+        if new["expansions"] != base["expansions"]:
+            regressions.append((key, "expansions", base["expansions"], new["expansions"],
+                                f"{new['expansions'] - base['expansions']:+d}"))
+
+        base_cost, new_cost = base.get("path_cost"), new.get("path_cost")
+        if base_cost is not None and (new_cost is None or new_cost > base_cost * (1 + cost_tolerance)):
+            note = "no path" if new_cost is None else f"{(new_cost - base_cost) / base_cost:+.1%}" if base_cost else "+"
+            regressions.append((key, "path_cost", base_cost, new_cost, note))
+
+        if check_time:
+            base_t, new_t = base["time_ns"]["median"], new["time_ns"]["median"]
+            if new_t > base_t * (1 + time_tolerance) and new_t - base_t > min_time_delta_ns:
+                regressions.append((key, "median_ns", round(base_t), round(new_t), f"{(new_t - base_t) / base_t:+.1%}"))
+    return regressions
+
+
+def print_diff_table(regressions):
+    header = f"{'size':>8}  {'seed token':<24} {'algorithm':<14} {'metric':<11} {'baseline':>12} {'current':>12}  change"
+    print(header)
+    print("-" * len(header))
+    for (size, token, algorithm), metric, base_value, new_value, note in regressions:
+        # every token starts with the same encoded header, the end is what tells them apart
+        short = token if len(token) <= 24 else "..." + token[-21:]
+        print(f"{size:>8}  {short:<24} {algorithm:<14} {metric:<11} {str(base_value):>12} {str(new_value):>12}  {note}")
+
+
+def command_baseline(args):
+    if not args.out:
+        print("baseline needs --out, the file later runs are compared against", file=sys.stderr)
+        return 2
+    result = command_run(args)
+    if result == 0:
+        print("Baseline recorded, check it with: python benchmark.py compare " + args.out)
+    return result
+
+
+def command_compare(args):
+    with open(args.baseline, encoding="utf-8") as fh:
+        baseline = json.load(fh)
+    if baseline.get("schema") != BENCHMARK_SCHEMA or "per_maze" not in baseline:
+        print(f"{args.baseline} is not a benchmark baseline (schema {BENCHMARK_SCHEMA})", file=sys.stderr)
+        return 2
+
+    # Re-run exactly what the baseline ran: same sizes, algorithms and corpus
+    settings = baseline["settings"]
+    args.warmup = settings["warmup"] if args.warmup is None else args.warmup
+    args.repeats = settings["repeats"] if args.repeats is None else args.repeats
+    args.keep_gc = not settings["gc_disabled"]
+    args.corpus = None
+    args.seed = settings.get("seed")
+    sizes = [parse_size(s) for s in settings["sizes"]]
+    current = run_benchmark(args, sizes, settings["algorithms"], baseline["corpus"])
+    if args.out:
+        write_report(current, args.out)
+
+    regressions = compare_reports(baseline, current, time_tolerance=args.time_tolerance,
+                                  min_time_delta_ns=int(args.min_time_delta_us * 1000),
+                                  cost_tolerance=args.cost_tolerance, check_time=not args.no_time)
+
+    checked = len(baseline["per_maze"])
+    if regressions:
+        print_diff_table(regressions)
+        print(f"\n{len(regressions)} regression(s) in {checked} (seed token, algorithm) entries")
+        return 1
+    print(f"No regressions in {checked} (seed token, algorithm) entries")
+    return 0
+
+
+# --- Scaling ---
+
+def fit_power_law(cells, values):
+    """Least squares fit of log(value) = log(c) + k * log(cells), returns {"c", "k", "r2"} or None.
+
+    Points with a value of 0 are left out (they have no logarithm), at least two points are needed.
+    """
+    points = [(math.log(n), math.log(v)) for n, v in zip(cells, values) if n > 0 and v and v > 0]
+    if len(points) < 2:
+        return None
+    xs, ys = zip(*points)
+    mean_x, mean_y = statistics.fmean(xs), statistics.fmean(ys)
+    sxx = sum((x - mean_x) ** 2 for x in xs)
+    if sxx == 0:
+        return None
+    k = sum((x - mean_x) * (y - mean_y) for x, y in points) / sxx
+    log_c = mean_y - k * mean_x
+    ss_tot = sum((y - mean_y) ** 2 for y in ys)
+    ss_res = sum((y - (log_c + k * x)) ** 2 for x, y in points)
+    return {"c": math.exp(log_c), "k": k, "r2": 1 - ss_res / ss_tot if ss_tot else 1.0}
+
+
+def cells_for_budget(fit, budget):
+    """Number of cells at which a fitted curve reaches budget (None if it never grows)."""
+    if fit is None or fit["k"] <= 0:
+        return None
+    return (budget / fit["c"]) ** (1 / fit["k"])
+
+
+def build_scaled_maze(side, token):
+    """Build + randomize a side x side maze and its lookup tables, returns (maze, timings in ns)."""
+    payload = decode_seed_token(token)
+
+    start_ns = time.perf_counter_ns()
+    maze = Maze.Maze.blank(side, side)
+    built_ns = time.perf_counter_ns()
+    randomize_from_seed(maze, payload)
+    randomized_ns = time.perf_counter_ns()
+    maze.neighbour_table()
+    maze.edge_costs("ucs")
+    maze.edge_costs("astar")
+    tables_ns = time.perf_counter_ns()
+
+    return maze, {"build_ns": built_ns - start_ns, "randomize_ns": randomized_ns - built_ns,
+                  "tables_ns": tables_ns - randomized_ns}
+
+
+def maze_memory_bytes(side, token):
+    """Memory held by one side x side maze with its tables, traced separately so tracing doesn't slow the timings."""
+    gc.collect()
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    maze, _ = build_scaled_maze(side, token)
+    held = tracemalloc.get_traced_memory()[0] - before
+    del maze
+    if not was_tracing:
+        tracemalloc.stop()
+    return max(0, held)
+
+
+def scaling_sides(min_side, max_side, factor):
+    side = max(2, min_side)
+    while side <= max_side:
+        yield side
+        side = max(side + 1, int(round(side * factor)))
+
+
+def command_scaling(args):
+    try:
+        algorithms = parse_algorithms(args.algorithms)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    pinned = pin_cpu(args.cpu) if not args.no_pin else None
+
+    rng = random.Random(args.seed)
+    tokens = [random_seed_token(args.wall_max, args.oneway_max, rng)[0] for _ in range(args.mazes)]
+    budget_ns = int(args.budget * 1_000_000_000)
+    memory_limit = int(args.max_memory_mb * 1024 * 1024)
+
+    rows = []
+    usable = {algo: True for algo in algorithms}
+    bytes_per_cell = None
+    stop_reason = f"reached --max-side {args.max_side}"
+    for side in scaling_sides(args.min_side, args.max_side, args.factor):
+        cells = side * side
+
+        # Don't start a size that won't fit (estimated from the last size's memory per cell)
+        if bytes_per_cell is not None and bytes_per_cell * cells > memory_limit:
+            stop_reason = f"a {side}x{side} maze needs ~{bytes_per_cell * cells / 2**20:.0f} MB, over --max-memory-mb"
+            break
+        if not any(usable.values()):
+            stop_reason = "every algorithm is over the time budget"
+            break
+
+        held = maze_memory_bytes(side, tokens[0])
+        bytes_per_cell = held / cells
+
+        construction = {"build_ns": [], "randomize_ns": [], "tables_ns": []}
+        searches = {algo: {"time_ns": [], "expansions": [], "statuses": {}} for algo in algorithms if usable[algo]}
+        for token in tokens:
+            maze, timings = build_scaled_maze(side, token)
+            for key, value in timings.items():
+                construction[key].append(value)
+            workspace = SearchWorkspace.SearchWorkspace.for_maze(maze)
+
+            for algo_choice, record in searches.items():
+                # No step limit for Graph searches, a big maze legitimately needs millions of steps
+                max_steps = None if "(Tree)" in algo_choice else sys.maxsize
+                gc.collect()
+                if not args.keep_gc:
+                    gc.disable()
+                try:
+                    elapsed_ns, steps, status, _ = timed_search(maze, algo_choice, workspace, max_steps)
+                finally:
+                    gc.enable()
+                record["time_ns"].append(elapsed_ns)
+                record["expansions"].append(steps)
+                record["statuses"][status] = record["statuses"].get(status, 0) + 1
+            del maze, workspace
+
+        row = {
+            "side": side,
+            "cells": cells,
+            "bytes_per_cell": bytes_per_cell,
+            "construction_ns": {key: statistics.median(values) for key, values in construction.items()},
+            "algorithms": {},
+        }
+        for algo_choice, record in searches.items():
+            median_ns = statistics.median(record["time_ns"])
+            row["algorithms"][algo_choice] = {
+                "median_ns": median_ns,
+                "expansions_median": statistics.median(record["expansions"]),
+                "statuses": record["statuses"],
+            }
+            if median_ns > budget_ns:
+                usable[algo_choice] = False
+        rows.append(row)
+
+        total_build = sum(row["construction_ns"].values())
+        timings = "  ".join(f"{algo.split()[0]} {info['median_ns'] / 1e6:.1f}ms"
+                            for algo, info in row["algorithms"].items())
+        print(f"{side:>6}x{side:<6} build {total_build / 1e6:>9.1f}ms  {bytes_per_cell:>7.1f} B/cell  {timings}")
+
+    # Fit the curves, tiny sizes are mostly timer noise so they only count when nothing bigger was measured
+    def fit(points):
+        big = [(n, v) for n, v in points if v >= args.fit_floor_ns]
+        use = big if len(big) >= 2 else points
+        return fit_power_law([n for n, _ in use], [v for _, v in use])
+
+    construction_points = [(r["cells"], sum(r["construction_ns"].values())) for r in rows]
+    summary = {"construction": {"time_fit": fit(construction_points)}, "algorithms": {}}
+    if rows:
+        summary["construction"]["bytes_per_cell"] = rows[-1]["bytes_per_cell"]
+        max_cells = memory_limit / rows[-1]["bytes_per_cell"] if rows[-1]["bytes_per_cell"] else None
+        summary["construction"]["max_side_in_memory"] = int(math.sqrt(max_cells)) if max_cells else None
+
+    print()
+    print(f"{'algorithm':<14} {'time ~ cells^k':>15} {'r2':>6} {'expansions ~ cells^k':>21} "
+          f"{'largest side under budget':>26} {'predicted side at budget':>25}")
+    for algo_choice in algorithms:
+        measured = [(r["cells"], r["algorithms"][algo_choice]) for r in rows if algo_choice in r["algorithms"]]
+        time_fit = fit([(n, info["median_ns"]) for n, info in measured])
+        expansion_fit = fit_power_law([n for n, _ in measured], [info["expansions_median"] for _, info in measured])
+        under = [n for n, info in measured if info["median_ns"] <= budget_ns]
+        largest_side = int(math.sqrt(max(under))) if under else None
+        predicted = cells_for_budget(time_fit, budget_ns)
+        predicted_side = int(math.sqrt(predicted)) if predicted else None
+        summary["algorithms"][algo_choice] = {
+            "time_fit": time_fit,
+            "expansions_fit": expansion_fit,
+            "largest_side_under_budget": largest_side,
+            "predicted_side_at_budget": predicted_side,
+        }
+        k_time = f"{time_fit['k']:.2f}" if time_fit else "-"
+        r2 = f"{time_fit['r2']:.3f}" if time_fit else "-"
+        k_exp = f"{expansion_fit['k']:.2f}" if expansion_fit else "-"
+        print(f"{algo_choice:<14} {k_time:>15} {r2:>6} {k_exp:>21} {str(largest_side or '-'):>26} "
+              f"{str(predicted_side or '-'):>25}")
+    print(f"Stopped: {stop_reason}")
+
+    report = {
+        "schema": BENCHMARK_SCHEMA,
+        "kind": "scaling",
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "environment": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "pinned_cpu": pinned,
+        },
+        "settings": {
+            "min_side": args.min_side,
+            "max_side": args.max_side,
+            "factor": args.factor,
+            "mazes": args.mazes,
+            "seed": args.seed,
+            "budget_s": args.budget,
+            "max_memory_mb": args.max_memory_mb,
+            "algorithms": algorithms,
+            "gc_disabled": not args.keep_gc,
+        },
+        "corpus": tokens,
+        "rows": rows,
+        "summary": summary,
+        "stop_reason": stop_reason,
+    }
+    if args.out:
+        write_report(report, args.out)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark the maze search algorithms.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    # Options every command has
+    timing = argparse.ArgumentParser(add_help=False)
+    timing.add_argument("--cpu", type=int, help="CPU to pin to (default: the last allowed one)")
+    timing.add_argument("--no-pin", action="store_true", help="don't pin the process to a CPU")
+    timing.add_argument("--out", help="JSON output file (default: print the JSON)")
+
+    # Options of a fresh benchmark (run, baseline)
+    corpus = argparse.ArgumentParser(add_help=False, parents=[timing])
+    corpus.add_argument("--corpus", help="seeds file to use as the corpus (default: generate one from --seed)")
+    corpus.add_argument("--mazes", type=int, default=20, help="size of the generated corpus (default 20)")
+    corpus.add_argument("--seed", default="0", help="master seed of the generated corpus (default 0)")
+    corpus.add_argument("--wall-max", type=int, default=30, help="max wall %% of generated mazes (default 30)")
+    corpus.add_argument("--oneway-max", type=int, default=30, help="max one-way %% of generated mazes (default 30)")
+    corpus.add_argument("--sizes", default="14x10", help="comma separated maze sizes, e.g. 14x10,28x20 (default 14x10)")
+    corpus.add_argument("--algorithms", help="comma separated algorithm labels, or 'all' (default: the Graph searches)")
+    corpus.add_argument("--warmup", type=int, default=2, help="untimed runs per maze and algorithm (default 2)")
+    corpus.add_argument("--repeats", type=int, default=5, help="timed runs per maze and algorithm (default 5)")
+    corpus.add_argument("--keep-gc", action="store_true", help="leave the garbage collector on while timing")
+
+    run = commands.add_parser("run", parents=[corpus], help="time every algorithm over a seed corpus")
+    run.set_defaults(handler=command_run)
+
+    # The report a baseline writes is a normal run report, it just has to be saved
+    baseline = commands.add_parser("baseline", parents=[corpus], help="record a baseline to compare later runs against")
+    baseline.set_defaults(handler=command_baseline)
+
+    compare = commands.add_parser("compare", parents=[timing], help="re-run a baseline's corpus and fail on regressions")
+    compare.add_argument("baseline", help="baseline JSON written by the baseline command")
+    compare.add_argument("--time-tolerance", type=float, default=0.25,
+                         help="allowed growth of a median time as a fraction (default 0.25)")
+    compare.add_argument("--min-time-delta-us", type=float, default=50.0,
+                         help="ignore median time growth below this many microseconds (default 50)")
+    compare.add_argument("--cost-tolerance", type=float, default=0.0,
+                         help="allowed growth of a path cost as a fraction (default 0)")
+    compare.add_argument("--no-time", action="store_true",
+                         help="only compare expansions, statuses and costs (e.g. on a different machine)")
+    compare.add_argument("--warmup", type=int, help="untimed runs (default: as in the baseline)")
+    compare.add_argument("--repeats", type=int, help="timed runs (default: as in the baseline)")
+    compare.set_defaults(handler=command_compare)
+
+    scaling = commands.add_parser("scaling", parents=[timing], help="fit how construction and search time grow with maze size")
+    scaling.add_argument("--min-side", type=int, default=8, help="side of the smallest (square) maze (default 8)")
+    scaling.add_argument("--max-side", type=int, default=4096, help="side of the largest maze (default 4096)")
+    scaling.add_argument("--factor", type=float, default=2.0, help="growth of the side per step (default 2)")
+    scaling.add_argument("--mazes", type=int, default=3, help="mazes per size, the medians are used (default 3)")
+    scaling.add_argument("--seed", default="0", help="master seed of the mazes (default 0)")
+    scaling.add_argument("--wall-max", type=int, default=30, help="max wall %% (default 30)")
+    scaling.add_argument("--oneway-max", type=int, default=30, help="max one-way %% (default 30)")
+    scaling.add_argument("--algorithms", help="comma separated algorithm labels, or 'all' (default: the Graph searches)")
+    scaling.add_argument("--budget", type=float, default=2.0,
+                         help="seconds per search after which an algorithm counts as unusable (default 2)")
+    scaling.add_argument("--max-memory-mb", type=float, default=2048,
+                         help="don't build mazes estimated to need more memory than this (default 2048)")
+    scaling.add_argument("--fit-floor-ns", type=int, default=100_000,
+                         help="leave times below this out of the fits when enough bigger ones exist (default 100000)")
+    scaling.add_argument("--keep-gc", action="store_true", help="leave the garbage collector on while timing")
+    scaling.set_defaults(handler=command_scaling)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
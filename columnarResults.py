@@ -0,0 +1,289 @@
+# Compact columnar binary results files (batch_results_*.mzcol), for batches too big for a comfortable CSV
+#
+# same rows as the batch CSV, but stored a column at a time in typed arrays, so a million row batch is a fraction of
+# the size and loads back with one frombytes() per column instead of parsing every line.
+#
+# file layout (all little endian):
+#   header   MAGIC, u32 length, JSON {"version": 1, "columns": [[name, typecode], ...]}
+#   chunks   b"MZCK", u32 rows, u32 payload length, payload, u32 CRC32 of the payload
+# the payload is each column in header order:
+#   numbers  the raw array (typecode from COLUMN_TYPES), an empty cell (path_len of a failed run) is stored as -1
+#   strings  u32 length + JSON list of the distinct values in the chunk, then a typecode byte (H / I) and the codes
+# a chunk is written every time the batch outputs flush, a torn last chunk (crash mid write) is ignored when reading.
+#
+# usage:
+#   python columnarResults.py info batch_outputs/batch_results_XXXX.mzcol
+#   python columnarResults.py to-csv batch_outputs/batch_results_XXXX.mzcol out.csv
+import argparse
+import csv
+import json
+import struct
+import sys
+import zlib
+from array import array
+
+MAGIC = b"MZCOL1\n"
+COLUMNAR_VERSION = 1
+SUFFIX = ".mzcol"
+
+_LENGTH = struct.Struct("<I")
+_CHUNK = struct.Struct("<4sII")
+CHUNK_MAGIC = b"MZCK"
+
+# Array typecode of every numeric RunMetrics column, anything not listed is a dictionary encoded string column
+COLUMN_TYPES = {
+    "run_id": "i",
+    "wall_pct": "b",
+    "oneway_pct": "b",
+    "steps": "i",
+    "unique_visited": "i",
+    "repeats": "i",
+    "path_len": "i",
+    "path_cost": "i",
+    "reported_time_ns": "q",
+    "wall_time_ns": "q",
+    "avg_mem_bytes": "d",
+    "generated": "i",
+    "expanded": "i",
+    "pushes": "i",
+    "pops": "i",
+    "stale_pops": "i",
+    "peak_frontier": "i",
+    "peak_parents": "i",
+    "frontier_bytes": "q",
+    "visited_bytes": "q",
+    "parent_bytes": "q",
+    "g_score_bytes": "q",
+    "traced_bytes": "q",
+}
+STRING = "s"
+EMPTY_INT = -1
+
+_SWAP = sys.byteorder != "little"
+
+
+def _to_bytes(values: array) -> bytes:
+    if _SWAP:
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_bytes(typecode: str, data) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if _SWAP:
+        values.byteswap()
+    return values
+
+
+def read_header(fh):
+    """Read the header of an open .mzcol file, returns [(name, typecode), ...]."""
+    if fh.read(len(MAGIC)) != MAGIC:
+        raise ValueError(f"{getattr(fh, 'name', 'file')} is not a columnar results file")
+    (length,) = _LENGTH.unpack(fh.read(_LENGTH.size))
+    header = json.loads(fh.read(length).decode("utf-8"))
+    if header.get("version") != COLUMNAR_VERSION:
+        raise ValueError(f"Unsupported columnar results version {header.get('version')}")
+    return [tuple(column) for column in header["columns"]]
+
+
+class ColumnarWriter:
+    """Appends rows (CSV row dicts) to a .mzcol file, one chunk per write_pending()."""
+
+    def __init__(self, path, fieldnames=None, *, append=False):
+        self.path = str(path)
+        if append:
+            with open(self.path, "rb") as fh:
+                self.columns = read_header(fh)
+            self._fh = open(self.path, "ab")
+        else:
+            self.columns = [(name, COLUMN_TYPES.get(name, STRING)) for name in fieldnames]
+            header = json.dumps({"version": COLUMNAR_VERSION, "columns": self.columns}).encode("utf-8")
+            self._fh = open(self.path, "wb")
+            self._fh.write(MAGIC + _LENGTH.pack(len(header)) + header)
+            self._fh.flush()
+        self.fieldnames = [name for name, _ in self.columns]
+        self.size = self._fh.tell()
+        self._reset()
+
+    def _reset(self):
+        self._rows = 0
+        self._values = [[] if typecode == STRING else array(typecode) for _, typecode in self.columns]
+
+    def add(self, row: dict):
+        for (name, typecode), values in zip(self.columns, self._values):
+            value = row.get(name, "")
+            if typecode == STRING:
+                values.append("" if value is None else str(value))
+            elif value is None or value == "":
+                values.append(float("nan") if typecode == "d" else EMPTY_INT)
+            elif typecode == "d":
+                values.append(float(value))
+            else:
+                values.append(int(value))
+        self._rows += 1
+
+    def write_pending(self):
+        """Write the rows added since the last call as one chunk, returns the file size after each of them."""
+        if self._fh is None or not self._rows:
+            return []
+        parts = []
+        for (_, typecode), values in zip(self.columns, self._values):
+            if typecode != STRING:
+                parts.append(_to_bytes(values))
+                continue
+            codes = {}
+            for value in values:
+                codes.setdefault(value, len(codes))
+            table = json.dumps(list(codes), separators=(",", ":")).encode("utf-8")
+            code_type = "H" if len(codes) <= 0xFFFF else "I"
+            parts += [_LENGTH.pack(len(table)), table, code_type.encode("ascii"),
+                      _to_bytes(array(code_type, map(codes.__getitem__, values)))]
+        payload = b"".join(parts)
+
+        self._fh.write(_CHUNK.pack(CHUNK_MAGIC, self._rows, len(payload)) + payload
+                       + _LENGTH.pack(zlib.crc32(payload)))
+        self._fh.flush()
+        self.size = self._fh.tell()
+        rows = self._rows
+        self._reset()
+        return [self.size] * rows
+
+    def fileno(self):
+        return self._fh.fileno()
+
+    def close(self):
+        if self._fh is not None:
+            try:
+                self._fh.close()
+            except Exception:
+                pass
+        self._fh = None
+
+
+def _decode_chunk(columns, rows, payload):
+    view = memoryview(payload)
+    pos = 0
+    chunk = {}
+    for name, typecode in columns:
+        if typecode != STRING:
+            size = array(typecode).itemsize * rows
+            chunk[name] = _from_bytes(typecode, view[pos:pos + size])
+            pos += size
+            continue
+        (length,) = _LENGTH.unpack_from(view, pos)
+        pos += _LENGTH.size
+        table = json.loads(bytes(view[pos:pos + length]).decode("utf-8"))
+        pos += length
+        code_type = chr(view[pos])
+        pos += 1
+        size = array(code_type).itemsize * rows
+        codes = _from_bytes(code_type, view[pos:pos + size])
+        pos += size
+        chunk[name] = [table[code] for code in codes]
+    return chunk
+
+
+def iter_chunks(path):
+    """Yields (rows, {column: array or list}) for every complete chunk of a .mzcol file."""
+    with open(path, "rb") as fh:
+        columns = read_header(fh)
+        while True:
+            head = fh.read(_CHUNK.size)
+            if len(head) < _CHUNK.size:
+                return
+            magic, rows, length = _CHUNK.unpack(head)
+            payload = fh.read(length)
+            crc = fh.read(_LENGTH.size)
+            if magic != CHUNK_MAGIC or len(payload) < length or len(crc) < _LENGTH.size:
+                return
+            if _LENGTH.unpack(crc)[0] != zlib.crc32(payload):
+                return
+            yield rows, _decode_chunk(columns, rows, payload)
+
+
+def read_columns(path):
+    """Load a whole .mzcol file as {column: array (numbers) or list (strings)}, empty cells are -1 / nan."""
+    with open(path, "rb") as fh:
+        columns = read_header(fh)
+    data = {name: [] if typecode == STRING else array(typecode) for name, typecode in columns}
+    for _, chunk in iter_chunks(path):
+        for name, values in chunk.items():
+            data[name].extend(values)
+    return data
+
+
+def iter_rows(path):
+    """Rows of a .mzcol file as dicts like csv.DictReader gives for the CSV, with "" for empty cells."""
+    with open(path, "rb") as fh:
+        columns = read_header(fh)
+    for rows, chunk in iter_chunks(path):
+        cells = []
+        for name, typecode in columns:
+            values = chunk[name]
+            if typecode == "d":
+                values = ["" if value != value else value for value in values]
+            elif typecode != STRING:
+                values = ["" if value == EMPTY_INT else value for value in values]
+            cells.append(values)
+        names = [name for name, _ in columns]
+        for row in zip(*cells):
+            yield dict(zip(names, row))
+
+
+# --- Command line ---
+
+def command_info(args):
+    with open(args.path, "rb") as fh:
+        columns = read_header(fh)
+        fh.seek(0, 2)
+        size = fh.tell()
+    rows = chunks = 0
+    for count, _ in iter_chunks(args.path):
+        rows += count
+        chunks += 1
+    per_row = f", {size / rows:.1f} bytes/row" if rows else ""
+    print(f"{args.path}: {rows} rows in {chunks} chunks, {size} bytes{per_row}")
+    for name, typecode in columns:
+        print(f"  {name:<18} {'string' if typecode == STRING else typecode}")
+    return 0
+
+
+def command_to_csv(args):
+    with open(args.path, "rb") as fh:
+        fieldnames = [name for name, _ in read_header(fh)]
+    count = 0
+    with open(args.out, "w", newline="", encoding="utf-8") as fh:
+        writer = csv.DictWriter(fh, fieldnames=fieldnames)
+        writer.writeheader()
+        for row in iter_rows(args.path):
+            writer.writerow(row)
+            count += 1
+    print(f"Columnar: wrote {count} rows to {args.out}")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect or convert columnar batch results files.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    info = commands.add_parser("info", help="row / chunk counts and the column types")
+    info.add_argument("path")
+    info.set_defaults(func=command_info)
+
+    to_csv = commands.add_parser("to-csv", help="write the rows out as a batch CSV")
+    to_csv.add_argument("path")
+    to_csv.add_argument("out")
+    to_csv.set_defaults(func=command_to_csv)
+
+    args = parser.parse_args(argv)
+    try:
+        return args.func(args)
+    except (OSError, ValueError) as e:
+        print(f"Columnar: {e}", file=sys.stderr)
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,7 @@
+import os
 import tkinter as tk
+import searchTrace
+from batchMetrics import BatchMetrics
 from mazeVisualiser import MazeVisualizer 
 
 
@@ -30,13 +33,31 @@ if __name__ == "__main__":
     # Create the main window
     root = tk.Tk()
     
+    # MAZE_TRACE=trace.json traces the searches + redraws (see searchTrace.py), written once the window is closed
+    trace_path = os.environ.get("MAZE_TRACE")
+    tracer = None
+    if trace_path:
+        tracer = searchTrace.SearchTracer(int(os.environ.get("MAZE_TRACE_EVERY", searchTrace.DEFAULT_TRACE_EVERY)))
+
+    # MAZE_METRICS_PORT=9464 / MAZE_METRICS_FILE=batch.prom publish the batches' progress (see batchMetrics.py)
+    metrics = None
+    metrics_port = os.environ.get("MAZE_METRICS_PORT")
+    metrics_file = os.environ.get("MAZE_METRICS_FILE")
+    if metrics_port or metrics_file:
+        metrics = BatchMetrics(metrics_file, port=int(metrics_port) if metrics_port else None)
+
     # Create the application instance pass the root window and maze data to it
-    app = MazeVisualizer(root, maze_layout, start_pos, end_pos, animation_delay=150)
+    app = MazeVisualizer(root, maze_layout, start_pos, end_pos, animation_delay=150, tracer=tracer, metrics=metrics)
     # print(Maze.Maze(MAZE, start_pos[0], start_pos[1], end_pos[0], end_pos[1]))
     
     # Start tkinter event loop
     root.mainloop()
 
+    if tracer is not None:
+        tracer.write(trace_path)
+    if metrics is not None:
+        metrics.close()
+
     # Old code
 """
     environment = Maze.Maze(MAZE, 0, 0, 12, 3)
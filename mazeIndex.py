@@ -0,0 +1,214 @@
+# Maze fingerprint index shared by every batch, so the same maze isn't tested twice under different seeds
+#
+# small mazes come out identical surprisingly often (a 5x5 maze at 60% walls has few possible layouts), and two seed
+# tokens that build the same maze just inflate the sample count. The index keeps the fingerprint
+# (Maze.canonical_fingerprint: size, walls, costs, start and goal, the same for every rotation / mirror image, so a
+# turned copy counts as the same maze) of every maze a batch has accepted, with the first token that made it.
+# A token whose maze is already in the index under a *different* token is a duplicate; the same token again
+# (a resumed or replayed batch) is not.
+#
+# tables:
+#   mazes       fingerprint -> first seed token, the batch it came from
+#   duplicates  tokens flagged as duplicates (batchRunner --dedup flag), with the token they duplicate
+#
+# usage:
+#   python batchRunner.py --mazes 100 --dedup skip      skip duplicates while generating (--dedup flag keeps them)
+#   python mazeIndex.py add batch_outputs/maze_index.sqlite batch_outputs/   index existing seeds files
+#   python mazeIndex.py stats batch_outputs/maze_index.sqlite
+import argparse
+import sqlite3
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import Maze
+from batchCore import decode_seed_token, randomize_from_seed, seed_maze_size
+from seedStream import SeedStream
+
+DEFAULT_INDEX_PATH = "batch_outputs/maze_index.sqlite"
+
+DEDUP_MODES = ("off", "flag", "skip")
+
+DEFAULT_COMMIT_EVERY = 1000
+
+# 2 = canonical fingerprints, a version 1 index (exact fingerprints) is fingerprinted again from its tokens when opened
+INDEX_VERSION = 2
+
+# Size of the maze a v1 seed token (no size of its own) was made for, the visualiser's maze
+DEFAULT_SIZE = (14, 10)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS mazes (
+    fingerprint TEXT PRIMARY KEY,
+    seed_token TEXT NOT NULL,
+    batch TEXT,
+    added TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS duplicates (
+    seed_token TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    duplicate_of TEXT NOT NULL,
+    batch TEXT
+);
+"""
+
+
+class MazeIndex:
+    """Fingerprint index, create it (or open an existing one) with MazeIndex(path)."""
+
+    def __init__(self, path=DEFAULT_INDEX_PATH, *, commit_every: int = DEFAULT_COMMIT_EVERY,
+                 default_size=DEFAULT_SIZE):
+        self.path = str(path)
+        self.commit_every = max(1, int(commit_every))
+        self.default_size = default_size
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._uncommitted = 0
+        self._mazes = {}
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] < INDEX_VERSION:
+            self._refingerprint()
+        self._conn.execute(f"PRAGMA user_version={INDEX_VERSION}")
+        self._conn.commit()
+
+    def _refingerprint(self):
+        # Turned copies of a maze had their own fingerprints before version 2, the later ones of those become
+        # duplicates of the first (kept in the duplicates table like --dedup flag's, nothing is dropped). All in the
+        # one transaction __init__ commits
+        rows = self._conn.execute("SELECT seed_token, batch, added FROM mazes ORDER BY rowid").fetchall()
+        self._conn.execute("DELETE FROM mazes")
+        for seed_token, batch, added in rows:
+            fingerprint = self.fingerprint(seed_token)
+            first = self.duplicate_of(seed_token, fingerprint)
+            if first is None:
+                self._conn.execute("INSERT INTO mazes (fingerprint, seed_token, batch, added) VALUES (?, ?, ?, ?)",
+                                   (fingerprint, seed_token, batch, added))
+            else:
+                self._conn.execute("INSERT OR IGNORE INTO duplicates (seed_token, fingerprint, duplicate_of, batch)"
+                                   " VALUES (?, ?, ?, ?)", (seed_token, fingerprint, first, batch))
+        for (seed_token,) in self._conn.execute("SELECT seed_token FROM duplicates").fetchall():
+            self._conn.execute("UPDATE duplicates SET fingerprint = ? WHERE seed_token = ?",
+                               (self.fingerprint(seed_token), seed_token))
+
+    def fingerprint(self, seed_token: str, *, width=None, height=None) -> str:
+        """Fingerprint of the maze a seed token builds. width / height are for v1 tokens (no size of their own)."""
+        payload = decode_seed_token(seed_token)
+        if payload is None:
+            raise ValueError(f"Invalid seed token: {seed_token}")
+        key = seed_maze_size(payload, width or self.default_size[0], height or self.default_size[1])
+        # One blank maze per size, reused
+        maze = self._mazes.get(key)
+        if maze is None:
+            maze = self._mazes[key] = Maze.Maze.blank(*key)
+        randomize_from_seed(maze, payload)
+        return maze.canonical_fingerprint()
+
+    def duplicate_of(self, seed_token: str, fingerprint: str):
+        """The token that first made this maze, if that was a different token, else None."""
+        row = self._conn.execute("SELECT seed_token FROM mazes WHERE fingerprint = ?", (fingerprint,)).fetchone()
+        if row is None or row[0] == seed_token:
+            return None
+        return row[0]
+
+    def add(self, seed_token: str, fingerprint: str, batch: str = ""):
+        """Index an accepted maze (a maze already in the index keeps its first token)."""
+        self._conn.execute("INSERT OR IGNORE INTO mazes (fingerprint, seed_token, batch, added) VALUES (?, ?, ?, ?)",
+                           (fingerprint, seed_token, batch, datetime.now().isoformat(timespec="seconds")))
+        self._count()
+
+    def flag(self, seed_token: str, fingerprint: str, duplicate_of: str, batch: str = ""):
+        """Remember a duplicate that was kept anyway (--dedup flag)."""
+        self._conn.execute("INSERT OR IGNORE INTO duplicates (seed_token, fingerprint, duplicate_of, batch)"
+                           " VALUES (?, ?, ?, ?)", (seed_token, fingerprint, duplicate_of, batch))
+        self._count()
+
+    def _count(self):
+        self._uncommitted += 1
+        if self._uncommitted >= self.commit_every:
+            self.commit()
+
+    def commit(self):
+        self._conn.commit()
+        self._uncommitted = 0
+
+    def stats(self) -> dict:
+        self.commit()
+        mazes = self._conn.execute("SELECT COUNT(*) FROM mazes").fetchone()[0]
+        flagged = self._conn.execute("SELECT COUNT(*) FROM duplicates").fetchone()[0]
+        batches = self._conn.execute("SELECT COUNT(DISTINCT batch) FROM mazes").fetchone()[0]
+        return {"mazes": mazes, "flagged": flagged, "batches": batches}
+
+    def close(self):
+        if self._conn is None:
+            return
+        self.commit()
+        self._conn.close()
+        self._conn = None
+
+
+# --- Command line ---
+
+def command_add(args):
+    index = MazeIndex(args.index)
+    added = duplicates = 0
+    try:
+        stream = SeedStream(args.sources)
+        for _, token in stream:
+            fingerprint = index.fingerprint(token, width=args.width, height=args.height)
+            first = index.duplicate_of(token, fingerprint)
+            if first is not None:
+                duplicates += 1
+                if args.verbose:
+                    print(f"{token} duplicates {first}")
+                continue
+            index.add(token, fingerprint, args.batch)
+            added += 1
+    except ValueError as e:
+        print(f"Index: {e}", file=sys.stderr)
+        return 2
+    finally:
+        index.close()
+    print(f"Index: {added} mazes indexed, {duplicates} duplicates "
+          f"({100 * duplicates / max(1, added + duplicates):.1f}%) in {args.index}")
+    return 0
+
+
+def command_stats(args):
+    index = MazeIndex(args.index)
+    try:
+        stats = index.stats()
+    finally:
+        index.close()
+    print(f"Index: {stats['mazes']} distinct mazes from {stats['batches']} batch(es), "
+          f"{stats['flagged']} duplicates flagged")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Maze fingerprint index shared by batch runs.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="index the mazes of seeds files (plain, gzip, directories, globs)")
+    add.add_argument("index")
+    add.add_argument("sources", nargs="+")
+    add.add_argument("--batch", default="", help="batch name to store with the new mazes")
+    add.add_argument("--width", type=int, help=f"maze width for v1 tokens (default {DEFAULT_SIZE[0]})")
+    add.add_argument("--height", type=int, help=f"maze height for v1 tokens (default {DEFAULT_SIZE[1]})")
+    add.add_argument("-v", "--verbose", action="store_true", help="print every duplicate")
+    add.set_defaults(func=command_add)
+
+    stats = commands.add_parser("stats", help="how many mazes / duplicates the index holds")
+    stats.add_argument("index")
+    stats.set_defaults(func=command_stats)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
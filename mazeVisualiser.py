@@ -1,89 +1,35 @@
 import secrets
 import gc
+import itertools
+import os
 import tkinter as tk
 import tracemalloc
 # --------- (Aiman) -----------------
-import base64
-import json
-import csv
 import time
-from dataclasses import dataclass
-from datetime import datetime
-from pathlib import Path
 from typing import Callable, Optional
 # ------------------------------------
 from tkinter import ttk, StringVar, IntVar, filedialog
 import Maze
-import DFS
-import BFS
-import UCS
-import AAStar
+import SearchWorkspace
+import SearchCheckpoint
+import batchCore
+import searchMemory
+import searchProfile
+import searchTrace
+# Seed tokens, RunMetrics and the batch CSV writer live in batchCore so the headless runner (batchRunner.py) can share them
+from batchCore import encode_seed_token, decode_seed_token, RunMetrics, BatchOutputs
+from seedStream import SeedStream
+from resultsStore import ResultsStore
+from mazeIndex import DEFAULT_INDEX_PATH, MazeIndex
 
 # import AStar (search needs to be changed to a generator first)
 
+# SQLite archive a GUI batch is added to with "Store" ticked
+BATCH_STORE_PATH = "batch_outputs/batch_results.sqlite"
+
+# Unsolvable random mazes thrown away per Tk callback before handing control back to the event loop
+BATCH_PRECHECK_TRIES = 200
 
-# -------- (Aiman) ----------------------------
-# If we do change the seed format, we should increase the version
-SEED_PREFIX = "MZ1:"  # Somewhat redundant with the version in the payload, so we can change it to just "MZ" if we really want
-
-# Base64 is used so we can convert bytes into strings
-def _seed_padding(b64: str):
-    # Restores base64 padding (=) for urlsafe decoding, as base64 strings length needs to be a multiple of 4
-    return "=" * (-len(b64) % 4)
-
-# We use encoding and decoding so we can easily change the seed to include more data, e.g. max/min cost
-def encode_seed_token(*, rng_seed, wall_percentage: int, oneway_percentage: int):
-    # When the same token is used again, the maze + settings are reproducible
-    payload = {
-        "v": 1,  # V stands for version
-        "rng": str(rng_seed),
-        "wall": int(wall_percentage),
-        "oneway": int(oneway_percentage),
-    }
-    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
-    token = base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
-    return f"{SEED_PREFIX}{token}"
-
-
-def decode_seed_token(seed_text: str):
-    # Returns a dict if valid, otherwise None
-
-    if not isinstance(seed_text, str):
-        return None
-    seed_text = seed_text.strip()
-    if not seed_text.startswith(SEED_PREFIX):
-        return None
-
-    try:
-        token = seed_text[len(SEED_PREFIX):]
-        raw = base64.urlsafe_b64decode(token + _seed_padding(token))
-        payload = json.loads(raw.decode("utf-8"))
-    except Exception:
-        return None
-
-    # Basic validation
-    if payload.get("v") != 1:
-        return None
-    if "rng" not in payload or "wall" not in payload or "oneway" not in payload:
-        return None
-
-    return payload
-
-@dataclass
-class RunMetrics:
-    """Lightweight container for one search run's results (manual or batch)."""
-
-    algo_choice: str
-    search_type: str
-    status: str  # success/fail/timeout/error/stopped
-    steps: int
-    unique_visited: int
-    repeats: int
-    reported_time_ns: int
-    wall_time_ns: int
-    avg_mem_bytes: float
-    path_len: Optional[int] = None
-# ------------------------------------
 
 # Maze Visualizer Class
 class MazeVisualizer:
@@ -96,16 +42,20 @@ class MazeVisualizer:
 
     # --------- (Aiman) -----------------
     # Safeguards for batch mode (prevents Tree search from looping forever)
-    DEFAULT_MAX_STEPS_TREE = 200_000
-    DEFAULT_MAX_STEPS_GRAPH = 50_000
+    DEFAULT_MAX_STEPS_TREE = batchCore.DEFAULT_MAX_STEPS_TREE
+    DEFAULT_MAX_STEPS_GRAPH = batchCore.DEFAULT_MAX_STEPS_GRAPH
     # ------------------------------------
 
     # Initialises the visualiser, root = tkinter root window, maze_data = 4D list of maze walls,
     # start_coords = (x,y) tuple for start, end_coords = (x,y) tuple for end, animation_delay for the base delay in milliseconds for search step (i.e. the delay when clicking the play button)
-    def __init__(self, root, maze_data, start_coords, end_coords, animation_delay = 20):
+    # tracer = optional searchTrace.SearchTracer, the searches and the redraws get traced into it
+    # metrics = optional batchMetrics.BatchMetrics, every batch / replay reports its progress to it
+    def __init__(self, root, maze_data, start_coords, end_coords, animation_delay = 20, tracer=None, metrics=None):
 
         # Main tkinter window
         self.root = root
+        self.tracer = tracer
+        self.metrics = metrics
 
         # --------- (Aiman) -----------------
         # Ensure tracemalloc is active (for memory stats in batch results)
@@ -120,6 +70,9 @@ class MazeVisualizer:
                               start_coords[0], start_coords[1],
                               end_coords[0], end_coords[1])
 
+        # Scratch arrays (visited marks, parents, g-scores) shared by every search run on this maze
+        self.search_workspace = SearchWorkspace.SearchWorkspace.for_maze(self.maze)
+
         # stores animation delay, aka delay between search steps
         self.animation_delay = animation_delay
 
@@ -168,22 +121,34 @@ class MazeVisualizer:
         #   - "replay": replay mazes from a seeds file
         self._batch_mode = "random"
         # Replay state
-        self._batch_replay_tokens = []
+        # seeds are streamed from the file (seedStream.SeedStream) rather than all read up front
+        self._batch_replay_seeds = None
+        self._batch_replay_stream = None
         self._batch_replay_index = 0
         self._batch_algo_list = []
         self._batch_algo_index = 0
+        # None for a replay, the number of seeds isn't known until the file has been read to the end
         self._batch_total_target = 0
         self._batch_completed = 0
+        # Random mazes generated so far, the journal's place in the token stream
+        self._batch_candidates = 0
+        # Random mazes thrown away as unsolvable / as duplicates of a maze some batch already ran, for the summary
+        self._batch_rejected = 0
+        self._batch_duplicates = 0
+        # Shared fingerprint index random batches skip duplicate mazes with (see mazeIndex.py)
+        self._batch_maze_index = None
+        self._batch_current_fingerprint = ""
         self._batch_current_run_id = 0
         self._batch_current_token = ""
         self._batch_current_rng_seed = ""
         self._batch_current_wall = 0
         self._batch_current_oneway = 0
-        self._batch_csv_fh = None
-        self._batch_seed_fh = None
-        self._batch_csv_writer = None
+        self._batch_outputs = None
         self._batch_csv_path = ""
         self._batch_seed_path = ""
+        # searchProfile.RunProfiler of the batch when "Profile" is ticked, written out next to the CSV at the end
+        self._batch_profiler = None
+        self._batch_profile_path = ""
         self._batch_prev_algo_choice = ""
         # ------------------------------------
 
@@ -250,7 +215,7 @@ class MazeVisualizer:
         self.algo_var = tk.StringVar(value="BFS")
 
         # List of options for the dropdown
-        options = ["BFS (Graph)", "DFS (Graph)", "UCS (Graph)", "AStar (Graph)", "BFS (Tree)", "DFS (Tree)", "UCS (Tree)", "AStar (Tree)"]
+        options = list(batchCore.ALGO_OPTIONS)
 
         # --------- (Aiman) -----------------
         # Keep a copy of the algorithm labels for batch testing
@@ -349,6 +314,12 @@ class MazeVisualizer:
         self.copy_seed_button = ttk.Button(self.line_three, text="Copy", command=self.copy_seed_to_clipboard, width=6)
         self.copy_seed_button.pack(side=tk.LEFT, padx=(0, 5))
 
+        # Search checkpoints: save a paused search to disk and pick it up again later
+        self.save_run_button = ttk.Button(self.line_three, text="Save run", command=self.save_search_checkpoint, width=9)
+        self.save_run_button.pack(side=tk.LEFT, padx=(0, 5))
+        self.resume_run_button = ttk.Button(self.line_three, text="Resume run", command=self.resume_search_checkpoint, width=10)
+        self.resume_run_button.pack(side=tk.LEFT, padx=(0, 5))
+
         # Batch test controls (runs all algorithms on many random mazes)
         self.batch_count_var = tk.IntVar(value=10)
         self.batch_wall_max_var = tk.IntVar(value=30)
@@ -359,6 +330,15 @@ class MazeVisualizer:
         # NOTE: This is intentionally a StringVar so invalid user input won't crash Tk.
         self.batch_time_limit_seconds_var = tk.StringVar(value="180")
 
+        # Profile the batch / replay runs with cProfile (see searchProfile.py)
+        self.batch_profile_var = tk.BooleanVar(value=False)
+
+        # Skip random mazes an earlier batch on this machine already ran (mazeIndex.py), off like batchRunner's --dedup
+        self.batch_dedup_var = tk.BooleanVar(value=False)
+
+        # Add the batch / replay runs to the SQLite archive too (BATCH_STORE_PATH, see resultsStore.py)
+        self.batch_store_var = tk.BooleanVar(value=False)
+
         # Replay file path (seeds file generated by batch mode)
         self.replay_seed_file_var = tk.StringVar(value="")
 
@@ -388,6 +368,14 @@ class MazeVisualizer:
         self.batch_time_limit_entry = ttk.Entry(self.line_four, textvariable=self.batch_time_limit_seconds_var, width=7)
         self.batch_time_limit_entry.pack(side=tk.LEFT, padx=(2, 8))
 
+        self.batch_profile_toggle = ttk.Checkbutton(self.line_four, text="Profile", variable=self.batch_profile_var)
+        self.batch_profile_toggle.pack(side=tk.LEFT, padx=(0, 8))
+
+        self.batch_dedup_toggle = ttk.Checkbutton(self.line_four, text="Skip dups", variable=self.batch_dedup_var)
+        self.batch_dedup_toggle.pack(side=tk.LEFT, padx=(0, 8))
+
+        self.batch_store_toggle = ttk.Checkbutton(self.line_four, text="Store", variable=self.batch_store_var)
+        self.batch_store_toggle.pack(side=tk.LEFT, padx=(0, 8))
 
         self.batch_start_button = ttk.Button(self.line_four, text="Run batch", command=self.start_batch_tests, width=9)
         self.batch_start_button.pack(side=tk.LEFT, padx=(0, 5))
@@ -473,6 +461,7 @@ class MazeVisualizer:
             raise ValueError("diagonal arrows are not supported")
 
     # Draws the initial maze layout on the canvas
+    @searchTrace.traced("draw_initial_map")
     def draw_initial_map(self):
         ARROW_OFFSET = 0.3
 
@@ -535,6 +524,7 @@ class MazeVisualizer:
                         self.canvas.create_line(x1, y0, x1, y1, fill='black', width=self.wall_thickness)
 
     # Cell content drawing helper
+    @searchTrace.traced("draw_cell_content", sample=True)
     def draw_cell_content(self, x, y, text=None, color=None):
         # Helper to draw text or colored square in a cell
         x0, y0, x1, y1 = self.get_canvas_coords(x, y)
@@ -584,21 +574,11 @@ class MazeVisualizer:
 # ------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
     def _create_search_instance(self, algo_choice: str):
         """Create a search instance based on the dropdown label."""
-        search_type = "Graph"
         if "(Tree)" in algo_choice:
-            search_type = "Tree"
             print("Warning: Tree Search may cause an infinite loop!")
 
-        if "BFS" in algo_choice:
-            return BFS.BFS(self.maze, search_type), search_type
-        elif "DFS" in algo_choice:
-            return DFS.DFS(self.maze, search_type), search_type
-        elif "UCS" in algo_choice:
-            return UCS.UCS(self.maze, search_type), search_type
-        elif "AStar" in algo_choice:
-            return AAStar.AAStar(self.maze, search_type), search_type
-
-        raise ValueError(f"Unknown algorithm: {algo_choice}")
+        # Only one search runs at a time, so they can all share the same workspace
+        return batchCore.create_search_instance(self.maze, algo_choice, self.search_workspace)
 
     def _start_search(
             self,
@@ -607,10 +587,12 @@ class MazeVisualizer:
             on_complete: Optional[Callable[[RunMetrics], None]] = None,
             max_steps: Optional[int] = None,
             force_max_speed: bool = False,
+            search_instance=None,
     ):
         """Start a search run.
 
         This is used by both the UI (manual runs) and the batch tester.
+        Pass search_instance to continue an existing search (e.g. one restored from a checkpoint).
         """
 
         # Reset board and start the search animation loop
@@ -625,12 +607,21 @@ class MazeVisualizer:
         self.algo_menu.config(state=tk.DISABLED)
 
         # Create search instance + generator
-        self.search_instance, search_type = self._create_search_instance(algo_choice)
+        if search_instance is None:
+            self.search_instance, search_type = self._create_search_instance(algo_choice)
+        else:
+            self.search_instance, search_type = search_instance, search_instance.search_type
         self.search_generator = self.search_instance.search()
+        if self.tracer is not None:
+            self.search_instance.trace = self.tracer
+            self.tracer.begin_run(algo_choice)
+        if self._batch_profiler is not None:
+            self._batch_profiler.begin_run(algo_choice)
 
         # Bookkeeping for metrics + batch callbacks
         self._on_search_complete = on_complete
-        self._run_step_count = 0
+        # A restored search carries on counting from where it was saved
+        self._run_step_count = int(getattr(self.search_instance, "steps", 0))
         self._run_repeat_count = 0
         self._run_start_perf_ns = time.perf_counter_ns()
         self._run_algo_choice = algo_choice
@@ -660,6 +651,10 @@ class MazeVisualizer:
                 pass
 
         self.search_generator = None
+        if self.tracer is not None:
+            self.tracer.end_run()
+        if self._batch_profiler is not None:
+            self._batch_profiler.end_run()
 
         # Re-enable menu only when not batching
         if not getattr(self, "_batch_running", False):
@@ -677,7 +672,7 @@ class MazeVisualizer:
         if reported_time_ns < 0:
             reported_time_ns = 0
 
-        unique_visited = len(self.visited) if isinstance(self.visited, list) else 0
+        unique_visited = len(self.visited) if isinstance(self.visited, dict) else 0
 
         avg_mem = 0.0
         if self.mem_use_record:
@@ -689,13 +684,16 @@ class MazeVisualizer:
             avg_mem = 0.0
 
         path_len = None
+        path_cost = None
         if status == "success" and getattr(self.search_instance, "search_type", "") != "Tree":
             try:
                 path = self.search_instance.reconstruct_path()
                 if path:
                     path_len = max(0, len(path) - 1)
+                    path_cost = batchCore.path_cost(self.maze, path)
             except Exception:
                 path_len = None
+                path_cost = None
 
         metrics = RunMetrics(
             algo_choice=str(self._run_algo_choice or ""),
@@ -708,6 +706,9 @@ class MazeVisualizer:
             wall_time_ns=int(wall_time_ns),
             avg_mem_bytes=float(avg_mem),
             path_len=path_len,
+            path_cost=path_cost,
+            **batchCore.search_counters(self.search_instance),
+            **searchMemory.structure_bytes(self.search_instance),
         )
 
         cb = self._on_search_complete
@@ -752,31 +753,76 @@ class MazeVisualizer:
         If the user enters an invalid value, we fall back to the default.
         """
 
-        default_seconds = 180.0
         raw = ""
         try:
             raw = str(self.batch_time_limit_seconds_var.get())
         except Exception:
             raw = ""
 
-        raw = (raw or "").strip()
-        seconds = default_seconds
+        return batchCore.time_limit_ns_from_seconds(raw)
 
-        if raw:
-            try:
-                seconds = float(raw)
-            except Exception:
-                seconds = default_seconds
+    def save_search_checkpoint(self):
+        """Pause the current search and save its state (frontier, visited, parents, counters) to a file."""
+        if not self.search_running or self.search_instance is None:
+            self.search_text_display.set(f"{self.canvas_legend}\nNo search running to save")
+            return
 
-        # Keep it safe + predictable
-        if seconds <= 0:
-            seconds = default_seconds
+        self.search_paused = True
+        path = filedialog.asksaveasfilename(
+            title="Save search checkpoint",
+            defaultextension=".mzck",
+            filetypes=[("Search checkpoints", "*.mzck"), ("All files", "*.*")],
+        )
+        if not path:
+            return
 
-        # Cap to 24h to avoid ridiculous values
-        if seconds > 24 * 60 * 60:
-            seconds = 24 * 60 * 60
+        try:
+            SearchCheckpoint.save_checkpoint(self.search_instance, path, seed_token=(self.seed_var.get() or "").strip())
+        except Exception as e:
+            self.search_text_display.set(f"{self.canvas_legend}\nCould not save checkpoint: {e}")
+            return
+        self.search_text_display.set(f"{self.canvas_legend}\nCheckpoint saved to {path} (paused, press ▶ to continue)")
 
-        return int(seconds * 1_000_000_000)
+    def resume_search_checkpoint(self):
+        """Load a checkpoint file and continue that search from where it was saved."""
+        if self.search_running or self._batch_running:
+            return
+
+        path = filedialog.askopenfilename(
+            title="Select a search checkpoint",
+            filetypes=[("Search checkpoints", "*.mzck"), ("All files", "*.*")],
+        )
+        if not path:
+            return
+
+        try:
+            state = SearchCheckpoint.load_checkpoint(path)
+
+            # The checkpoint may come from another maze, rebuild it from the seed token saved with it
+            if self.maze.fingerprint() != state["fingerprint"]:
+                payload = decode_seed_token(state["seed_token"])
+                if payload is None:
+                    raise ValueError("the checkpoint was taken on a different maze and has no seed to rebuild it")
+                self._check_seed_size(payload)
+                self.set_generation_settings(int(payload["wall"]), int(payload["oneway"]))
+                batchCore.randomize_from_seed(self.maze, payload)
+                self.start_node = (self.maze.startx, self.maze.starty)
+                self.goal_node = (self.maze.endx, self.maze.endy)
+                self.seed_var.set(state["seed_token"])
+
+            search = SearchCheckpoint.restore_search(state, self.maze, self.search_workspace)
+        except Exception as e:
+            self.search_text_display.set(f"{self.canvas_legend}\nCould not resume checkpoint: {e}")
+            return
+
+        # Same labels as the dropdown
+        label = {"BFS": "BFS", "DFS": "DFS", "UCS": "UCS", "AAStar": "AStar"}[state["algorithm"]]
+        algo_choice = f"{label} ({state['search_type']})"
+        self.algo_var.set(algo_choice)
+
+        self.search_fast_forward = False
+        self.search_max_speed = False
+        self._start_search(algo_choice, search_instance=search)
 
     # Start Search button logic or if search started already function as resume function
     def start_resume_search(self):
@@ -827,7 +873,7 @@ class MazeVisualizer:
         # --------- (Aiman) -----------------
         # Step limit safety (mainly for Tree search in batch mode)
         if self._run_max_steps is not None:
-            self.batch_status_var.set(f"Batch: running {self._batch_completed + 1}/{self._batch_total_target} algorithm: {self.algo_var.get()} count: {self._run_step_count}")
+            self.batch_status_var.set(f"Batch: running {self._batch_progress(self._batch_completed + 1)} algorithm: {self.algo_var.get()} count: {self._run_step_count}")
             try:
                 if self._run_step_count >= int(self._run_max_steps):
                     print(f"Batch {self._batch_completed + 1} Algorithm {self.algo_var.get()} Stopped (step limit reached).")
@@ -852,8 +898,14 @@ class MazeVisualizer:
             return
 
         try:
-            # Get the next node from the search generator
-            current_node, text, execution_time, mem_use = next(self.search_generator)
+            # Get the next node from the search generator (only this is profiled, not the drawing)
+            if self._batch_profiler is not None:
+                self._batch_profiler.resume()
+            try:
+                current_node, text, execution_time, mem_use = next(self.search_generator)
+            finally:
+                if self._batch_profiler is not None:
+                    self._batch_profiler.pause()
 
             # --------- (Aiman) -----------------
             # Metrics bookkeeping (for batch results)
@@ -1060,15 +1112,18 @@ class MazeVisualizer:
         oneway_pct = int(self.oneway_percentage)
 
         # Determine RNG seed + (possibly) restore settings from the token
+        payload = None
         if (not locked) or (not seed_text):
             # New random seed every time (or lock-on but empty seed)
-            rng_seed = secrets.token_hex(8)
-            seed_text = encode_seed_token(rng_seed=rng_seed, wall_percentage=wall_pct, oneway_percentage=oneway_pct)
+            rng_seed = secrets.randbits(128)
+            seed_text = encode_seed_token(rng_seed=rng_seed, wall_percentage=wall_pct, oneway_percentage=oneway_pct,
+                                          width=self.maze.maze_width, height=self.maze.maze_height)
             self.seed_var.set(seed_text)
         else:
             payload = decode_seed_token(seed_text)
             if payload is None:
                 # If a user typed a raw seed, keep it, but wrap it into our token format (stores the settings too)
+                # (a text seed can only go in a v1 token)
                 rng_seed = seed_text
                 seed_text = encode_seed_token(
                     rng_seed=rng_seed,
@@ -1077,13 +1132,22 @@ class MazeVisualizer:
                 )
                 self.seed_var.set(seed_text)
             else:
+                try:
+                    self._check_seed_size(payload)
+                except ValueError as e:
+                    self.search_text_display.set(f"{self.canvas_legend}\n{e}")
+                    return
                 rng_seed = payload["rng"]
                 wall_pct = int(payload["wall"])
                 oneway_pct = int(payload["oneway"])
                 self.set_generation_settings(wall_pct, oneway_pct)
 
         # Randomise the environment (deterministic if rng_seed is reused)
-        self.maze.randomize(wall_pct, oneway_pct, seed = rng_seed)
+        if payload is not None:
+            # the token's own cost range + start/end placement too
+            batchCore.randomize_from_seed(self.maze, payload)
+        else:
+            self.maze.randomize(wall_pct, oneway_pct, seed = rng_seed)
         self.start_node = (self.maze.startx, self.maze.starty)
         self.goal_node = (self.maze.endx, self.maze.endy)
         self.reset()
@@ -1092,58 +1156,77 @@ class MazeVisualizer:
     def randomize_maze(self):
         self.generate_maze()
 
+    def _check_seed_size(self, payload: dict):
+        # v2 tokens can be for a maze of another size, which this window can't show
+        size = batchCore.seed_maze_size(payload, self.maze.maze_width, self.maze.maze_height)
+        if size != (self.maze.maze_width, self.maze.maze_height):
+            raise ValueError(f"That seed is for a {size[0]}x{size[1]} maze, this one is "
+                             f"{self.maze.maze_width}x{self.maze.maze_height}")
 
-    def _open_batch_outputs(self):
-        """Create CSV + seeds files for a batch run."""
-        out_dir = Path("batch_outputs")
-        out_dir.mkdir(exist_ok=True)
-
-        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        csv_path = out_dir / f"batch_results_{stamp}.csv"
-        seeds_path = out_dir / f"batch_seeds_{stamp}.txt"
-
-        self._batch_csv_path = str(csv_path)
-        self._batch_seed_path = str(seeds_path)
-
-        self._batch_csv_fh = open(csv_path, "w", newline="", encoding="utf-8")
-        fieldnames = [
-            "run_id",
-            "seed_token",
-            "wall_pct",
-            "oneway_pct",
-            "algorithm",
-            "search_type",
-            "status",
-            "steps",
-            "unique_visited",
-            "repeats",
-            "path_len",
-            "reported_time_ns",
-            "wall_time_ns",
-            "avg_mem_bytes",
-        ]
-        self._batch_csv_writer = csv.DictWriter(self._batch_csv_fh, fieldnames=fieldnames)
-        self._batch_csv_writer.writeheader()
-        self._batch_csv_fh.flush()
-
-        self._batch_seed_fh = open(seeds_path, "w", encoding="utf-8")
 
-    def _close_batch_outputs(self):
-        """Close any open batch output files."""
-        if self._batch_csv_fh is not None:
-            try:
-                self._batch_csv_fh.close()
-            except Exception:
-                pass
-        self._batch_csv_fh = None
-        self._batch_csv_writer = None
+    def _open_batch_outputs(self, **mode):
+        """Create CSV + seeds files (and the progress journal) for a batch run.
 
-        if self._batch_seed_fh is not None:
+        mode is mazes=N or replay=path, stored in the journal with the other settings (same names as
+        batchRunner's options) so an interrupted batch can be carried on with batchRunner.py --resume.
+        """
+        settings = dict(mode)
+        settings["wall_max"] = self._int_var(self.batch_wall_max_var, 30)
+        settings["oneway_max"] = self._int_var(self.batch_oneway_max_var, 30)
+        settings["time_limit"] = str(self.batch_time_limit_seconds_var.get())
+        settings["width"] = self.maze.maze_width
+        settings["height"] = self.maze.maze_height
+        if "mazes" in mode and self.batch_dedup_var.get():
+            # Never run a maze some earlier batch already ran under another seed
             try:
-                self._batch_seed_fh.close()
-            except Exception:
-                pass
-        self._batch_seed_fh = None
+                self._batch_maze_index = MazeIndex(DEFAULT_INDEX_PATH)
+                settings["dedup"] = "skip"
+            except Exception as e:
+                print(f"Batch: maze index unavailable ({e}), duplicates won't be skipped")
+        # With "Store" ticked the runs also go into one SQLite archive, queryable with resultsStore.py
+        store = None
+        if self.batch_store_var.get():
+            try:
+                store = ResultsStore(BATCH_STORE_PATH)
+            except Exception as e:
+                print(f"Batch: results store unavailable ({e}), writing the CSV only")
+        self._batch_outputs = BatchOutputs("batch_outputs", settings=settings, store=store, metrics=self.metrics)
+        self._batch_csv_path = self._batch_outputs.csv_path
+        self._batch_seed_path = self._batch_outputs.seed_path
+        self._batch_profile_path = ""
+        self._batch_profiler = searchProfile.RunProfiler() if self.batch_profile_var.get() else None
+
+    @staticmethod
+    def _int_var(var, default: int) -> int:
+        try:
+            return int(var.get())
+        except Exception:
+            return default
+
+    def _batch_record(self, method: str, *args, **kwargs):
+        """Call a journal method of the batch outputs (start_maze, reject_maze, finish_maze, finish)."""
+        if self._batch_outputs is None:
+            return
+        try:
+            getattr(self._batch_outputs, method)(*args, **kwargs)
+        except Exception:
+            pass
+
+    def _close_batch_outputs(self):
+        """Close any open batch output files (and write the profile, if the batch was profiled)."""
+        if self._batch_outputs is not None:
+            self._batch_outputs.close()
+            if self._batch_profiler is not None:
+                try:
+                    self._batch_profile_path = self._batch_profiler.write(
+                        os.path.dirname(self._batch_outputs.csv_path), self._batch_outputs.stamp) or ""
+                except Exception as e:
+                    print(f"Batch: could not write the profile ({e})")
+        self._batch_profiler = None
+        self._batch_outputs = None
+        if self._batch_maze_index is not None:
+            self._batch_maze_index.close()
+        self._batch_maze_index = None
 
     def start_batch_tests(self):
         """Run a batch test: generate N random mazes, run every algorithm, and save results."""
@@ -1169,34 +1252,28 @@ class MazeVisualizer:
 
         # Ensure we are in RANDOM batch mode (not replay)
         self._batch_mode = "random"
-        self._batch_replay_tokens = []
+        self._batch_replay_seeds = None
         self._batch_replay_index = 0
 
         self._batch_total_target = target
         self._batch_completed = 0
+        self._batch_candidates = 0
+        self._batch_rejected = 0
+        self._batch_duplicates = 0
 
         # Use the same labels as the dropdown so selection logic stays consistent
         self._batch_algo_list = list(getattr(self, "_algo_options", []))
         if not self._batch_algo_list:
-            self._batch_algo_list = [
-                "BFS (Graph)",
-                "DFS (Graph)",
-                "UCS (Graph)",
-                "AStar (Graph)",
-                "BFS (Tree)",
-                "DFS (Tree)",
-                "UCS (Tree)",
-                "AStar (Tree)",
-            ]
+            self._batch_algo_list = list(batchCore.ALGO_OPTIONS)
 
         self._batch_prev_algo_choice = self.algo_var.get()
 
         # prep the class csv writer object
-        self._open_batch_outputs()
+        self._open_batch_outputs(mazes=target)
         # disable all controls except stop test
         self._set_controls_enabled(False)
 
-        self.batch_status_var.set(f"Batch: running 0/{self._batch_total_target}")
+        self.batch_status_var.set(f"Batch: running {self._batch_progress(0)}")
         self.root.after(1, self._batch_prepare_new_maze_random) # trigger the main batch maze generator
 
     def stop_batch_tests(self):
@@ -1218,7 +1295,7 @@ class MazeVisualizer:
         """Browse for a seeds file (txt) created by a previous batch run."""
         path = filedialog.askopenfilename(
             title="Select a seeds file",
-            filetypes=[("Text files", "*.txt"), ("All files", "*.*")],
+            filetypes=[("Seeds files", "*.txt *.txt.gz"), ("All files", "*.*")],
         )
         if path:
             try:
@@ -1244,22 +1321,16 @@ class MazeVisualizer:
             self.batch_status_var.set("Replay: select a seeds file")
             return
 
+        # Read lazily (plain or gzip), only the first seed is read here to check the file is usable
         try:
-            text = Path(path).read_text(encoding="utf-8")
+            stream = SeedStream(path)
+            seeds = iter(stream)
+            first = next(seeds, None)
         except Exception:
             self.batch_status_var.set("Replay: failed to read file")
             return
 
-        tokens = []
-        for line in text.splitlines():
-            line = (line or "").strip()
-            if not line:
-                continue
-            if line.startswith("#"):
-                continue
-            tokens.append(line)
-
-        if not tokens:
+        if first is None:
             self.batch_status_var.set("Replay: no valid seeds found")
             return
 
@@ -1267,31 +1338,23 @@ class MazeVisualizer:
         self._batch_running = True
         self._batch_stop_requested = False
         self._batch_mode = "replay"
-        self._batch_replay_tokens = list(tokens)
+        self._batch_replay_stream = stream
+        self._batch_replay_seeds = itertools.chain([first], seeds)
         self._batch_replay_index = 0
-        self._batch_total_target = len(tokens)
+        self._batch_total_target = None
         self._batch_completed = 0
 
         # Use the same labels as the dropdown so selection logic stays consistent
         self._batch_algo_list = list(getattr(self, "_algo_options", []))
         if not self._batch_algo_list:
-            self._batch_algo_list = [
-                "BFS (Graph)",
-                "DFS (Graph)",
-                "UCS (Graph)",
-                "AStar (Graph)",
-                "BFS (Tree)",
-                "DFS (Tree)",
-                "UCS (Tree)",
-                "AStar (Tree)",
-            ]
+            self._batch_algo_list = list(batchCore.ALGO_OPTIONS)
 
         self._batch_prev_algo_choice = self.algo_var.get()
 
-        self._open_batch_outputs()
+        self._open_batch_outputs(replay=path)
         self._set_controls_enabled(False)
 
-        self.batch_status_var.set(f"Replay: running 0/{self._batch_total_target}")
+        self.batch_status_var.set(f"Replay: running {self._batch_progress(0)}")
         self.root.after(1, self._batch_prepare_next_replay)
 
     def _batch_prepare_maze_from_token(self, token: str):
@@ -1299,6 +1362,7 @@ class MazeVisualizer:
         payload = decode_seed_token(token)
         if payload is None:
             raise ValueError("Invalid seed token")
+        self._check_seed_size(payload)
 
         rng_seed = payload["rng"]
         wall_pct = int(payload["wall"])
@@ -1314,7 +1378,7 @@ class MazeVisualizer:
         self.set_generation_settings(wall_pct, oneway_pct)
 
         # Generate deterministic maze
-        self.maze.randomize(wall_pct, oneway_pct, seed=rng_seed)
+        batchCore.randomize_from_seed(self.maze, payload)
         self.start_node = (self.maze.startx, self.maze.starty)
         self.goal_node = (self.maze.endx, self.maze.endy)
         self.reset()
@@ -1328,20 +1392,26 @@ class MazeVisualizer:
             self._batch_finish()
             return
 
-        if self._batch_replay_index >= len(self._batch_replay_tokens):
+        # Invalid lines are skipped (and counted) by the stream
+        try:
+            seed = next(self._batch_replay_seeds, None)
+        except Exception:
+            seed = None
+            self.batch_status_var.set("Replay: failed to read file")
+        if seed is None:
+            self._batch_record("finish")
             self._batch_finish()
             return
 
-        token = self._batch_replay_tokens[self._batch_replay_index]
+        self._batch_replay_index, token = seed
         try:
             self._batch_prepare_maze_from_token(token)
         except Exception:
-            # Skip invalid lines
             self.batch_status_var.set(f"Replay: invalid seed at line {self._batch_replay_index + 1} (skipping)")
-            self._batch_replay_index += 1
             self.root.after(1, self._batch_prepare_next_replay)
             return
 
+        self._batch_record("start_maze", token, index=self._batch_replay_index)
         self._batch_algo_index = 0
         self.root.after(1, self._batch_start_next_algorithm)
 
@@ -1351,31 +1421,34 @@ class MazeVisualizer:
             return
 
         # Pick random wall/one-way settings within user-provided maxima
-        try:
-            wall_max = int(self.batch_wall_max_var.get())
-        except Exception:
-            wall_max = 30
-        try:
-            oneway_max = int(self.batch_oneway_max_var.get())
-        except Exception:
-            oneway_max = 30
-
-        wall_max = max(0, min(100, wall_max))
-        oneway_max = max(0, min(100, oneway_max))
-
-        wall_pct = 0
-        oneway_pct = 0
-        for _ in range(200):
-            wall_pct = secrets.randbelow(wall_max + 1)
-            oneway_pct = secrets.randbelow(oneway_max + 1)
-            if wall_pct + oneway_pct <= 100:
+        wall_max = self._int_var(self.batch_wall_max_var, 30)
+        oneway_max = self._int_var(self.batch_oneway_max_var, 30)
+
+        # Rejection sampling without the GUI: mazes whose goal can't be reached, or that the maze index says some batch
+        # already ran under another seed, are dropped straight after randomize(), only the maze kept gets drawn
+        for _ in range(BATCH_PRECHECK_TRIES):
+            token, rng_seed, wall_pct, oneway_pct = batchCore.random_seed_token(
+                wall_max, oneway_max, width=self.maze.maze_width, height=self.maze.maze_height)
+            self.maze.randomize(wall_pct, oneway_pct, seed=rng_seed)
+            self._batch_record("start_maze", token, candidate=self._batch_candidates)
+            self._batch_candidates += 1
+            if not self.maze.is_solvable():
+                self._batch_record("reject_maze")
+                self._batch_rejected += 1
+                continue
+            if self._batch_maze_index is None:
                 break
-        else: # runs if break triggered in for loop
-            wall_pct = min(wall_max, 100)
-            oneway_pct = min(oneway_max, max(0, 100 - wall_pct))
-
-        rng_seed = secrets.token_hex(8)
-        token = encode_seed_token(rng_seed=rng_seed, wall_percentage=wall_pct, oneway_percentage=oneway_pct)
+            self._batch_current_fingerprint = self.maze.canonical_fingerprint()
+            if self._batch_maze_index.duplicate_of(token, self._batch_current_fingerprint) is None:
+                break
+            self._batch_record("reject_maze", "duplicate")
+            self._batch_duplicates += 1
+        else:
+            # Nothing usable yet, let the GUI breathe (and the stop button work) before trying again
+            self.batch_status_var.set(f"Batch: {self._batch_rejected + self._batch_duplicates} mazes rejected, "
+                                      f"still looking...")
+            self.root.after(1, self._batch_prepare_new_maze_random)
+            return
 
         self._batch_current_token = token
         self._batch_current_rng_seed = rng_seed
@@ -1386,8 +1459,6 @@ class MazeVisualizer:
         self.seed_var.set(token)
         self.set_generation_settings(wall_pct, oneway_pct)
 
-        # Generate maze
-        self.maze.randomize(wall_pct, oneway_pct, seed=rng_seed)
         self.start_node = (self.maze.startx, self.maze.starty)
         self.goal_node = (self.maze.endx, self.maze.endy)
         self.reset()
@@ -1401,37 +1472,24 @@ class MazeVisualizer:
 
     def _batch_accept_maze(self):
         """Record the accepted maze seed token so the batch can be replayed."""
-        if self._batch_seed_fh is None:
+        if self._batch_outputs is None:
             return
         try:
-            self._batch_seed_fh.write(f"{self._batch_current_token}\n")
-            self._batch_seed_fh.flush()
+            self._batch_outputs.accept_maze(self._batch_current_token, self._batch_current_run_id)
+            if self._batch_maze_index is not None:
+                self._batch_maze_index.add(self._batch_current_token, self._batch_current_fingerprint,
+                                           self._batch_outputs.stamp)
         except Exception:
             pass
 
     def _batch_write_row(self, metrics: RunMetrics):
-        if self._batch_csv_writer is None:
+        if self._batch_outputs is None:
             return
 
-        row = {
-            "run_id": self._batch_current_run_id,
-            "seed_token": self._batch_current_token,
-            "wall_pct": self._batch_current_wall,
-            "oneway_pct": self._batch_current_oneway,
-            "algorithm": metrics.algo_choice,
-            "search_type": metrics.search_type,
-            "status": metrics.status,
-            "steps": metrics.steps,
-            "unique_visited": metrics.unique_visited,
-            "repeats": metrics.repeats,
-            "path_len": "" if metrics.path_len is None else metrics.path_len,
-            "reported_time_ns": metrics.reported_time_ns,
-            "wall_time_ns": metrics.wall_time_ns,
-            "avg_mem_bytes": round(metrics.avg_mem_bytes, 2),
-        }
+        row = batchCore.make_row(self._batch_current_run_id, self._batch_current_token,
+                                 self._batch_current_wall, self._batch_current_oneway, metrics)
         try:
-            self._batch_csv_writer.writerow(row)
-            self._batch_csv_fh.flush()
+            self._batch_outputs.write_row(row)
         except Exception:
             pass
 
@@ -1443,19 +1501,19 @@ class MazeVisualizer:
         # Completed all algorithms for this maze
         if self._batch_algo_index >= len(self._batch_algo_list):
             self._batch_completed += 1
-
+            self._batch_record("finish_maze", self._batch_current_run_id)
 
             # Slightly different status text depending on the mode.
             label = "Replay" if getattr(self, "_batch_mode", "random") == "replay" else "Batch"
-            self.batch_status_var.set(f"{label}: completed {self._batch_completed}/{self._batch_total_target}")
+            self.batch_status_var.set(f"{label}: completed {self._batch_progress(self._batch_completed)}")
 
-            if self._batch_completed >= self._batch_total_target:
+            if self._batch_total_target is not None and self._batch_completed >= self._batch_total_target:
+                self._batch_record("finish")
                 self._batch_finish()
                 return
 
             # Continue based on runner mode
             if getattr(self, "_batch_mode", "random") == "replay":
-                self._batch_replay_index += 1
                 self.root.after(1, self._batch_prepare_next_replay)
             else:
                 self.root.after(1, self._batch_prepare_new_maze_random)
@@ -1465,10 +1523,7 @@ class MazeVisualizer:
         self.algo_var.set(algo_choice)
 
         # Step limit safety (Tree can loop)
-        if "(Tree)" in algo_choice:
-            max_steps = self.DEFAULT_MAX_STEPS_TREE
-        else:
-            max_steps = self.DEFAULT_MAX_STEPS_GRAPH
+        max_steps = batchCore.max_steps_for(algo_choice)
 
         # Run at max speed during batching
         self.search_max_speed = True
@@ -1507,6 +1562,8 @@ class MazeVisualizer:
                 self.root.after(1, self._batch_start_next_algorithm)
             else:
                 self.batch_status_var.set("Batch: unsolvable maze -> regenerating")
+                self._batch_record("reject_maze")
+                self._batch_rejected += 1
                 self.root.after(1, self._batch_prepare_new_maze_random)
             return
 
@@ -1536,8 +1593,10 @@ class MazeVisualizer:
         self._batch_running = False
 
         # Reset replay state so the next run starts cleanly.
+        invalid = self._batch_replay_stream.invalid if self._batch_mode == "replay" else 0
         self._batch_mode = "random"
-        self._batch_replay_tokens = []
+        self._batch_replay_seeds = None
+        self._batch_replay_stream = None
         self._batch_replay_index = 0
 
         # Stop any active search loop cleanly
@@ -1554,13 +1613,23 @@ class MazeVisualizer:
 
         self._set_controls_enabled(True)
 
+        finished = f"{finished_label}: finished {self._batch_progress(self._batch_completed)}"
+        finished += batchCore.reject_summary(self._batch_rejected, self._batch_completed, self._batch_duplicates)
+        if invalid:
+            finished += f" ({invalid} invalid seeds skipped)"
         if self._batch_csv_path and self._batch_seed_path:
-            self.batch_status_var.set(
-                f"{finished_label}: finished {self._batch_completed}/{self._batch_total_target} | "
-                f"CSV: {self._batch_csv_path} | Seeds: {self._batch_seed_path}"
-            )
+            finished += f" | CSV: {self._batch_csv_path} | Seeds: {self._batch_seed_path}"
+            if self._batch_profile_path:
+                finished += f" | Profile: {self._batch_profile_path}"
+            self.batch_status_var.set(finished)
         else:
-            self.batch_status_var.set(f"{finished_label}: finished {self._batch_completed}/{self._batch_total_target}")
+            self.batch_status_var.set(finished)
+
+    def _batch_progress(self, count: int) -> str:
+        # "3/10", or just "3" for a replay (its length isn't known up front)
+        if self._batch_total_target is None:
+            return str(count)
+        return f"{count}/{self._batch_total_target}"
 
 # ------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 # ------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
@@ -0,0 +1,391 @@
+# SQLite results store, a queryable archive of batch runs next to (or instead of digging through) the CSV files
+#
+# tables:
+#   batches  one row per batch (its stamp, when it started and its settings)
+#   mazes    one row per seed token: the generation parameters from the token and the maze fingerprint
+#   runs     one row per algorithm run with every RunMetrics field, importing a batch that is already there
+#            replaces its runs as a whole (so importing the same CSV twice doesn't count its runs twice)
+# indexed for the usual questions: by algorithm / status, by wall% / one-way%, by fingerprint, by batch.
+#
+# rows are buffered and written with executemany in one transaction every commit_every rows (and when the store
+# is flushed or closed), so the per row cost is a list append rather than a commit.
+# the fingerprint is rebuilt from the seed token (a v1 token doesn't know its size, default_size is used for those).
+#
+# usage:
+#   python batchRunner.py --mazes 100 --db results.sqlite              batch straight into the store (CSV still written)
+#   python resultsStore.py import results.sqlite batch_outputs/        load existing batch CSVs (plain, gzip, globs)
+#   python resultsStore.py export results.sqlite out.csv --batch 20260101_120000   back to the batch CSV format
+#   python resultsStore.py summary results.sqlite --wall 10:20         per algorithm averages straight from SQL
+import argparse
+import csv
+import json
+import sqlite3
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import Maze
+from SearchWorkspace import SEARCH_COUNTERS
+from searchMemory import MEMORY_FIELDS
+from batchCore import CSV_FIELDNAMES, decode_seed_token, randomize_from_seed, seed_maze_size
+from seedStream import RESULT_PATTERNS, expand_seed_paths, iter_result_rows
+
+# 2 = the search counter columns, 3 = the memory per structure columns
+# (an older store gets them added, NULL for the runs it already has)
+# 4 = (batch, run_id, algorithm) unique, 5 = a plain index again (a re-import replaces the batch instead, sweep CSVs
+# repeated run_ids), the runs a version 4 store replaced are gone, import their CSV again to get them back
+SCHEMA_VERSION = 5
+
+DEFAULT_COMMIT_EVERY = 1000
+
+# Size of the maze a v1 seed token (no size of its own) was made for, the visualiser's maze
+DEFAULT_SIZE = (14, 10)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS batches (
+    name TEXT PRIMARY KEY,
+    created TEXT NOT NULL,
+    settings TEXT
+);
+CREATE TABLE IF NOT EXISTS mazes (
+    id INTEGER PRIMARY KEY,
+    seed_token TEXT NOT NULL UNIQUE,
+    fingerprint TEXT,
+    wall_pct INTEGER NOT NULL,
+    oneway_pct INTEGER NOT NULL,
+    width INTEGER,
+    height INTEGER,
+    max_cost INTEGER,
+    start_end_split INTEGER
+);
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    batch TEXT NOT NULL,
+    run_id INTEGER NOT NULL,
+    maze_id INTEGER NOT NULL REFERENCES mazes(id),
+    algorithm TEXT NOT NULL,
+    search_type TEXT NOT NULL,
+    status TEXT NOT NULL,
+    steps INTEGER,
+    unique_visited INTEGER,
+    repeats INTEGER,
+    path_len INTEGER,
+    path_cost INTEGER,
+    reported_time_ns INTEGER,
+    wall_time_ns INTEGER,
+    avg_mem_bytes REAL,
+    generated INTEGER,
+    expanded INTEGER,
+    pushes INTEGER,
+    pops INTEGER,
+    stale_pops INTEGER,
+    peak_frontier INTEGER,
+    peak_parents INTEGER,
+    frontier_bytes INTEGER,
+    visited_bytes INTEGER,
+    parent_bytes INTEGER,
+    g_score_bytes INTEGER,
+    traced_bytes INTEGER
+);
+CREATE INDEX IF NOT EXISTS runs_algorithm ON runs (algorithm, status);
+CREATE INDEX IF NOT EXISTS runs_batch ON runs (batch, run_id);
+CREATE INDEX IF NOT EXISTS runs_maze ON runs (maze_id);
+CREATE INDEX IF NOT EXISTS mazes_params ON mazes (wall_pct, oneway_pct);
+CREATE INDEX IF NOT EXISTS mazes_fingerprint ON mazes (fingerprint);
+"""
+
+_RUN_COLUMNS = ("batch", "run_id", "maze_id", "algorithm", "search_type", "status", "steps", "unique_visited",
+                "repeats", "path_len", "path_cost", "reported_time_ns", "wall_time_ns", "avg_mem_bytes",
+                *SEARCH_COUNTERS, *MEMORY_FIELDS)
+_INSERT_RUN = f"INSERT INTO runs ({', '.join(_RUN_COLUMNS)}) VALUES ({', '.join('?' * len(_RUN_COLUMNS))})"
+
+# CSV column -> how it is stored (empty cells are NULL)
+_INTEGER_FIELDS = ("steps", "unique_visited", "repeats", "path_len", "path_cost", "reported_time_ns", "wall_time_ns")
+
+
+def _number(raw, cast):
+    if raw is None or raw == "":
+        return None
+    try:
+        return cast(raw)
+    except ValueError:
+        return cast(float(raw))
+
+
+class ResultsStore:
+    """A results database, create it (or open an existing one) with ResultsStore(path)."""
+
+    def __init__(self, path, *, commit_every: int = DEFAULT_COMMIT_EVERY, default_size=DEFAULT_SIZE):
+        self.path = str(path)
+        self.commit_every = max(1, int(commit_every))
+        self.default_size = default_size
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path)
+        # WAL: readers don't block the writer, and a commit doesn't have to wait for an fsync
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._migrate_runs_batch()
+        self._conn.executescript(_SCHEMA)
+        self._migrate()
+        self._conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+        self._conn.commit()
+
+        self._pending = []
+        # The rows of one maze come together, so remembering the last token saves most lookups
+        self._last_maze = (None, None)
+        self._fingerprint_mazes = {}
+
+    def _migrate_runs_batch(self):
+        # A version 4 store has runs_batch as a unique index, drop it (no rows are touched), the schema script makes
+        # the plain one
+        indexes = {row[1]: row[2] for row in self._conn.execute("PRAGMA index_list(runs)")}
+        if indexes.get("runs_batch"):
+            self._conn.execute("DROP INDEX runs_batch")
+
+    def _migrate(self):
+        # CREATE TABLE IF NOT EXISTS leaves an older runs table as it was, add the columns it is missing
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(runs)")}
+        for name in (*SEARCH_COUNTERS, *MEMORY_FIELDS):
+            if name not in columns:
+                self._conn.execute(f"ALTER TABLE runs ADD COLUMN {name} INTEGER")
+
+    # --- Writing ---
+
+    def begin_batch(self, name: str, settings=None):
+        self._conn.execute("INSERT OR IGNORE INTO batches (name, created, settings) VALUES (?, ?, ?)",
+                           (name, datetime.now().isoformat(timespec="seconds"), json.dumps(settings or {})))
+
+    def _fingerprint(self, payload, width, height):
+        # Rebuild the maze from its token (one blank maze per size, reused)
+        maze = self._fingerprint_mazes.get((width, height))
+        if maze is None:
+            maze = self._fingerprint_mazes[(width, height)] = Maze.Maze.blank(width, height)
+        randomize_from_seed(maze, payload)
+        return maze.fingerprint()
+
+    def maze_id(self, seed_token: str, *, width=None, height=None):
+        """Row id of a seed token's maze, added on first sight. width / height are for v1 tokens (no size of their own)."""
+        if self._last_maze[0] == seed_token:
+            return self._last_maze[1]
+
+        row = self._conn.execute("SELECT id FROM mazes WHERE seed_token = ?", (seed_token,)).fetchone()
+        if row is not None:
+            maze_id = row[0]
+        else:
+            payload = decode_seed_token(seed_token)
+            if payload is None:
+                raise ValueError(f"Invalid seed token: {seed_token}")
+            width, height = seed_maze_size(payload, width or self.default_size[0], height or self.default_size[1])
+            maze_id = self._conn.execute(
+                "INSERT INTO mazes (seed_token, fingerprint, wall_pct, oneway_pct, width, height, max_cost, start_end_split)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (seed_token, self._fingerprint(payload, width, height), int(payload["wall"]), int(payload["oneway"]),
+                 width, height, payload["max_cost"], int(payload["split"])),
+            ).lastrowid
+        self._last_maze = (seed_token, maze_id)
+        return maze_id
+
+    def add_run(self, batch: str, row: dict):
+        """Queue one batch CSV row (make_row's dict, or a row read back from a CSV) for the next commit."""
+        maze_id = self.maze_id(row["seed_token"], width=_number(row.get("width"), int),
+                               height=_number(row.get("height"), int))
+        values = [batch, int(row["run_id"]), maze_id, row["algorithm"], row["search_type"], row["status"]]
+        values += [_number(row.get(field), int) for field in _INTEGER_FIELDS]
+        values.append(_number(row.get("avg_mem_bytes"), float))
+        values += [_number(row.get(field), int) for field in (*SEARCH_COUNTERS, *MEMORY_FIELDS)]
+        self._pending.append(values)
+        if len(self._pending) >= self.commit_every:
+            self.flush()
+
+    def flush(self):
+        """Write the queued rows and commit."""
+        if self._pending:
+            self._conn.executemany(_INSERT_RUN, self._pending)
+            self._pending.clear()
+        self._conn.commit()
+
+    def discard_runs_after(self, batch: str, run_id: int) -> int:
+        """Drop a batch's runs past run_id (a resumed batch writes them again), returns how many were dropped."""
+        self.flush()
+        dropped = self._conn.execute("DELETE FROM runs WHERE batch = ? AND run_id > ?", (batch, run_id)).rowcount
+        self._conn.commit()
+        return dropped
+
+    def close(self):
+        if self._conn is None:
+            return
+        self.flush()
+        self._conn.close()
+        self._conn = None
+
+    # --- Reading ---
+
+    def query(self, sql: str, params=()):
+        """Run a read query, returns the rows (sqlite3.Row, so columns can be read by name)."""
+        self.flush()
+        self._conn.row_factory = sqlite3.Row
+        try:
+            return self._conn.execute(sql, params).fetchall()
+        finally:
+            self._conn.row_factory = None
+
+    def export_csv(self, path, *, batch=None):
+        """Write runs back out in the batch CSV format, a single batch or all of them. Returns the row count."""
+        self.flush()
+        sql = ("SELECT r.run_id, m.seed_token, m.wall_pct, m.oneway_pct, r.algorithm, r.search_type, r.status,"
+               " r.steps, r.unique_visited, r.repeats, r.path_len, r.path_cost, r.reported_time_ns, r.wall_time_ns,"
+               " r.avg_mem_bytes, " + ", ".join(f"r.{name}" for name in (*SEARCH_COUNTERS, *MEMORY_FIELDS)) +
+               " FROM runs r JOIN mazes m ON m.id = r.maze_id")
+        params = ()
+        if batch is not None:
+            sql += " WHERE r.batch = ?"
+            params = (batch,)
+        sql += " ORDER BY r.batch, r.run_id, r.id"
+
+        count = 0
+        with open(path, "w", newline="", encoding="utf-8") as fh:
+            writer = csv.writer(fh)
+            writer.writerow(CSV_FIELDNAMES)
+            for row in self._conn.execute(sql, params):
+                writer.writerow(["" if value is None else value for value in row])
+                count += 1
+        return count
+
+
+def batch_name(csv_path) -> str:
+    """A batch's name in the store: the stamp of its batch_results_<stamp>.csv file."""
+    stem = Path(csv_path).name
+    for suffix in (".gz", ".csv", ".mzcol"):
+        stem = stem[:-len(suffix)] if stem.endswith(suffix) else stem
+    return stem[len("batch_results_"):] if stem.startswith("batch_results_") else stem
+
+
+# --- Command line ---
+
+def command_import(args):
+    paths = expand_seed_paths(args.sources, patterns=RESULT_PATTERNS)
+    if not paths:
+        print("Store: no result CSVs found", file=sys.stderr)
+        return 2
+    store = ResultsStore(args.db, commit_every=args.commit_every)
+    try:
+        total = 0
+        replaced = 0
+        for path in paths:
+            name = batch_name(path)
+            store.begin_batch(name, {"imported_from": str(path)})
+            # A batch that is already in the store is replaced as a whole, a CSV is always the complete batch
+            dropped = store.discard_runs_after(name, 0)
+            replaced += dropped
+            for row in iter_result_rows(path):
+                store.add_run(name, row)
+                total += 1
+            store.flush()
+            note = f", replacing the {dropped} runs it already had" if dropped else ""
+            print(f"Store: imported {path} as batch {name}{note}")
+    except ValueError as e:
+        print(f"Store: {e}", file=sys.stderr)
+        return 2
+    finally:
+        store.close()
+    note = f" ({replaced} runs already there replaced)" if replaced else ""
+    print(f"Store: {total} runs from {len(paths)} file(s) into {args.db}{note}")
+    return 0
+
+
+def command_export(args):
+    store = ResultsStore(args.db)
+    try:
+        count = store.export_csv(args.out, batch=args.batch)
+    finally:
+        store.close()
+    print(f"Store: exported {count} runs to {args.out}")
+    return 0
+
+
+def command_summary(args):
+    where = []
+    params = []
+    if args.batch:
+        where.append("r.batch = ?")
+        params.append(args.batch)
+    if args.search_type:
+        where.append("r.search_type = ?")
+        params.append(args.search_type)
+    for column, bounds in (("m.wall_pct", args.wall), ("m.oneway_pct", args.oneway)):
+        if bounds:
+            where.append(f"{column} BETWEEN ? AND ?")
+            params += list(bounds)
+
+    sql = ("SELECT r.algorithm, COUNT(*) AS runs, AVG(r.status = 'success') AS success_rate, AVG(r.steps) AS steps,"
+           " AVG(r.path_len) AS path_len, AVG(r.path_cost) AS path_cost, AVG(r.wall_time_ns) AS wall_time_ns"
+           " FROM runs r JOIN mazes m ON m.id = r.maze_id")
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " GROUP BY r.algorithm ORDER BY r.algorithm"
+
+    store = ResultsStore(args.db)
+    try:
+        start_ns = time.perf_counter_ns()
+        rows = store.query(sql, params)
+        elapsed_ms = (time.perf_counter_ns() - start_ns) / 1e6
+    finally:
+        store.close()
+
+    def fmt(value):
+        return "-" if value is None else f"{value:.2f}"
+
+    print(f"{'algorithm':<16} {'runs':>8} {'success':>8} {'steps':>10} {'path_len':>9} {'path_cost':>10} {'wall ms':>9}")
+    for row in rows:
+        wall_ms = None if row["wall_time_ns"] is None else row["wall_time_ns"] / 1e6
+        print(f"{row['algorithm']:<16} {row['runs']:>8} {row['success_rate']:>8.1%} {fmt(row['steps']):>10} "
+              f"{fmt(row['path_len']):>9} {fmt(row['path_cost']):>10} {fmt(wall_ms):>9}")
+    print(f"\nquery took {elapsed_ms:.1f} ms")
+    return 0
+
+
+def percent_range(text):
+    """--wall / --oneway: "10" or "10:20" -> (low, high)."""
+    low, _, high = text.partition(":")
+    try:
+        return int(low), int(high or low)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a % value or low:high range, not {text!r}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="SQLite store for batch results.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    importer = commands.add_parser("import",
+                                   help="load batch result CSVs (plain, gzip) or .mzcol files (directories, globs)")
+    importer.add_argument("db")
+    importer.add_argument("sources", nargs="+")
+    importer.add_argument("--commit-every", type=int, default=DEFAULT_COMMIT_EVERY,
+                          help=f"rows per transaction (default {DEFAULT_COMMIT_EVERY})")
+    importer.set_defaults(func=command_import)
+
+    exporter = commands.add_parser("export", help="write runs back out as a batch results CSV")
+    exporter.add_argument("db")
+    exporter.add_argument("out")
+    exporter.add_argument("--batch", help="only this batch (its stamp), default every batch")
+    exporter.set_defaults(func=command_export)
+
+    summary = commands.add_parser("summary", help="per algorithm averages")
+    summary.add_argument("db")
+    summary.add_argument("--batch", help="only this batch (its stamp)")
+    summary.add_argument("--search-type", choices=("Graph", "Tree"))
+    summary.add_argument("--wall", type=percent_range, help="wall %% value or low:high range")
+    summary.add_argument("--oneway", type=percent_range, help="one-way %% value or low:high range")
+    summary.set_defaults(func=command_summary)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
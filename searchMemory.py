@@ -0,0 +1,141 @@
+# Memory taken by a search's own data structures, so the algorithms can be compared on memory and not just time
+#
+# avg_mem_bytes is tracemalloc's process wide total sampled every step, so it also counts everything else the
+# process allocates (the visualiser's canvas items, the CSV rows, ...). These are just the search's structures:
+#   frontier_bytes   the queue / stack / heap at its largest (peak_frontier entries): the container + the entry objects
+#   visited_bytes    the seen + closed stamp arrays
+#   parent_bytes     the parent array
+#   g_score_bytes    the g-score array, 0 for the searches that don't keep one (BFS, DFS, and UCS keeps its costs
+#                    in the heap entries)
+#   traced_bytes     measured instead of estimated, see FileMemoryProbe (empty unless the probe is on)
+# the arrays are the workspace's flat per cell arrays (see SearchWorkspace), so they are sized by the maze, not the run.
+# frontier_bytes is worked out from CPython's object sizes (sys.getsizeof) since the frontier at its peak is long
+# gone by the time the run is over.
+#
+# FileMemoryProbe (tracemalloc has to be tracing, batchRunner --memory-probe) snapshots the allocations made from
+# the algorithm's own source file every time the frontier grows by PROBE_GROWTH, and keeps the largest total.
+# That is the real frontier + entries, to within the growth step, at the cost of a snapshot now and then
+# (run_search stops its clock while sample() runs, so the time limit and wall_time_ns don't pay for them).
+# The lines that build the yielded (x, y) nodes are left out, those tuples belong to whoever drives the search
+# (run_search keeps them in its visited set). sample() is handed each node and finds its line with tracemalloc.
+import inspect
+import struct
+import sys
+import tracemalloc
+from collections import deque
+
+MEMORY_FIELDS = ("frontier_bytes", "visited_bytes", "parent_bytes", "g_score_bytes", "traced_bytes")
+
+# Attribute each search keeps its frontier in (by class name, like SearchCheckpoint) and whether it has g-scores
+_STRUCTURES = {
+    "BFS": ("queue", False),
+    "DFS": ("stack", False),
+    "UCS": ("queue", False),
+    "AAStar": ("open_list", True),
+}
+
+# What a frontier entry looks like, for a frontier that is empty by the end of the run
+_SAMPLE_ENTRIES = {
+    "BFS": 1000,
+    "DFS": 1000,
+    "UCS": (1000, 1000),
+    "AAStar": (1000.0, 1000.0, 1000),
+}
+
+_POINTER = struct.calcsize("P")
+# A deque allocates its slots in blocks of 64 (+ two links)
+_DEQUE_BLOCK = 64 * _POINTER + 2 * _POINTER
+
+# Frontier growth between two probe snapshots
+PROBE_GROWTH = 1.25
+
+# Set by set_file_probe, run_search probes every run while it is on and tracemalloc is tracing
+_file_probe = False
+
+
+def set_file_probe(enabled: bool):
+    """Turn the tracemalloc file probe on / off for every run_search in this process."""
+    global _file_probe
+    _file_probe = bool(enabled)
+
+
+def file_probe_enabled() -> bool:
+    return _file_probe and tracemalloc.is_tracing()
+
+
+def _object_bytes(value) -> int:
+    # CPython keeps one shared object for each of the ints -5..256, an entry holding one costs no extra memory
+    if type(value) is int and -5 <= value <= 256:
+        return 0
+    return sys.getsizeof(value)
+
+
+def _entry_bytes(entry) -> int:
+    if isinstance(entry, tuple):
+        return sys.getsizeof(entry) + sum(_object_bytes(item) for item in entry)
+    return _object_bytes(entry)
+
+
+def _container_bytes(frontier, count: int) -> int:
+    if isinstance(frontier, deque):
+        return sys.getsizeof(deque()) + (count // 64) * _DEQUE_BLOCK
+    # list (stack / heap), grown by appends: CPython over allocates by about an eighth
+    capacity = (count + (count >> 3) + 6) & ~3 if count else 0
+    return sys.getsizeof([]) + capacity * _POINTER
+
+
+def frontier_bytes(search, count=None) -> int:
+    """Estimated bytes of a search's frontier holding count entries (default its peak_frontier)."""
+    name = type(search).__name__
+    frontier = getattr(search, _STRUCTURES[name][0])
+    if count is None:
+        count = getattr(search, "peak_frontier", len(frontier))
+    entry = frontier[0] if len(frontier) else _SAMPLE_ENTRIES[name]
+    return _container_bytes(frontier, count) + count * _entry_bytes(entry)
+
+
+def structure_bytes(search) -> dict:
+    """Bytes per structure of a finished (or paused) search, keyword arguments for RunMetrics."""
+    name = type(search).__name__
+    if name not in _STRUCTURES:
+        return {}
+    workspace = search.workspace
+    has_g_scores = _STRUCTURES[name][1]
+    return {
+        "frontier_bytes": frontier_bytes(search),
+        "visited_bytes": (len(workspace.seen) * workspace.seen.itemsize
+                          + len(workspace.closed) * workspace.closed.itemsize),
+        "parent_bytes": len(workspace.parent) * workspace.parent.itemsize,
+        "g_score_bytes": len(workspace.g_score) * workspace.g_score.itemsize if has_g_scores else 0,
+    }
+
+
+class FileMemoryProbe:
+    """Largest traced memory allocated from the search's own source file during one run (tracemalloc must be on)."""
+
+    def __init__(self, search, growth: float = PROBE_GROWTH):
+        self.growth = growth
+        self.peak_bytes = 0
+        self._path = inspect.getsourcefile(type(search))
+        self._filters = [tracemalloc.Filter(True, self._path)]
+        self._node_lines = set()
+        self._frontier = getattr(search, _STRUCTURES[type(search).__name__][0])
+        self._next_size = 1
+
+    def sample(self, node=None, force=False):
+        """Snapshot if the frontier has grown past the next threshold (or always with force), node = the node yielded."""
+        if node is not None:
+            traceback = tracemalloc.get_object_traceback(node)
+            if traceback is not None and traceback[0].filename == self._path:
+                line = traceback[0].lineno
+                if line not in self._node_lines:
+                    self._node_lines.add(line)
+                    self._filters.append(tracemalloc.Filter(False, self._path, line))
+        size = len(self._frontier)
+        if size < self._next_size and not force:
+            return
+        self._next_size = max(size + 1, int(size * self.growth) + 1)
+        snapshot = tracemalloc.take_snapshot().filter_traces(self._filters)
+        total = sum(trace.size for trace in snapshot.traces)
+        if total > self.peak_bytes:
+            self.peak_bytes = total
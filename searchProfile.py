@@ -0,0 +1,106 @@
+# cProfile of batch / replay runs, summed up per algorithm, so a regression in BFS.py / UCS.py / ... shows up without
+# hand timing the search code
+#
+# every N-th run of each algorithm is run under cProfile, only while the search itself runs (run_search's step loop,
+# or the visualiser's next() on the search generator, not its redraws). The profiles of one algorithm are added
+# together and written next to the results file:
+#   batch_profile_<stamp>_<algorithm>.pstats   one per algorithm, python -m pstats / snakeviz / gprof2dot read these
+#   batch_profile_<stamp>.txt                  the top N functions of every algorithm by their own time
+# profiled runs run slower (cProfile costs every Python call), so their times in the results are inflated too
+#
+# usage:
+#   python batchRunner.py --mazes 50 --profile
+#   python batchRunner.py --replay batch_outputs/batch_seeds_XXXX.txt --profile --profile-every 10 --profile-top 30
+#   the visualiser: tick "Profile" before Run batch / Run replay
+import cProfile
+import io
+import pstats
+import re
+from pathlib import Path
+
+DEFAULT_PROFILE_EVERY = 1
+DEFAULT_PROFILE_TOP = 20
+
+# The process wide profiler run_search picks up, see set_profiler
+_active = None
+
+
+def set_profiler(profiler):
+    """Make profiler the one every run_search in this process reports to (None switches profiling off)."""
+    global _active
+    _active = profiler
+
+
+def active_profiler():
+    return _active
+
+
+def _file_label(algo_choice: str) -> str:
+    # "BFS (Graph)" -> "BFS_Graph"
+    return re.sub(r"\W+", "_", algo_choice).strip("_") or "search"
+
+
+class RunProfiler:
+    """Profiles every N-th run of each algorithm, write() the summed profiles out when done."""
+
+    def __init__(self, every: int = DEFAULT_PROFILE_EVERY, *, top: int = DEFAULT_PROFILE_TOP):
+        self.every = max(1, int(every))
+        self.top = max(1, int(top))
+        # algorithm -> runs seen / runs profiled / summed pstats.Stats, in the order the algorithms first ran
+        self._runs = {}
+        self._profiled = {}
+        self._stats = {}
+        self._label = None
+        self._profile = None
+
+    def begin_run(self, label: str):
+        """A run of label starts, it is profiled if it is that algorithm's N-th."""
+        count = self._runs.get(label, 0)
+        self._runs[label] = count + 1
+        self._label = label
+        self._profile = None if count % self.every else cProfile.Profile()
+
+    def resume(self):
+        """The search is about to run (again), start timing it if this run is profiled."""
+        if self._profile is not None:
+            self._profile.enable()
+
+    def pause(self):
+        if self._profile is not None:
+            self._profile.disable()
+
+    def end_run(self):
+        profile, self._profile = self._profile, None
+        if profile is None:
+            return
+        profile.disable()
+        stats = self._stats.get(self._label)
+        if stats is None:
+            self._stats[self._label] = pstats.Stats(profile)
+        else:
+            stats.add(profile)
+        self._profiled[self._label] = self._profiled.get(self._label, 0) + 1
+
+    def summary(self) -> str:
+        """The top N functions of every profiled algorithm, by own time."""
+        out = io.StringIO()
+        for label, stats in self._stats.items():
+            out.write(f"=== {label}: {self._profiled[label]} of {self._runs[label]} runs profiled ===\n")
+            stats.stream = out
+            stats.sort_stats(pstats.SortKey.TIME, pstats.SortKey.CUMULATIVE).print_stats(self.top)
+        return out.getvalue()
+
+    def write(self, out_dir, stamp: str):
+        """Write the .pstats files and the summary into out_dir, returns the summary's path (None if nothing ran)."""
+        if not self._stats:
+            return None
+        out_dir = Path(out_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        for label, stats in self._stats.items():
+            stats.dump_stats(str(out_dir / f"batch_profile_{stamp}_{_file_label(label)}.pstats"))
+        # Paths shortened for the summary only, the .pstats files keep them in full
+        for stats in self._stats.values():
+            stats.strip_dirs()
+        summary_path = out_dir / f"batch_profile_{stamp}.txt"
+        summary_path.write_text(self.summary(), encoding="utf-8")
+        return str(summary_path)
@@ -0,0 +1,173 @@
+# Tracing of where the time goes inside a search (and the visualiser's redraws), for Chrome's trace viewer or a flamegraph
+#
+# every N-th step of a search is timed phase by phase, the steps in between only pay for one modulo:
+#   pop          taking the next node off the frontier (a heap pop for UCS / A*)
+#   yield        the search paused at its yield, i.e. the time the driver (run_search or the GUI) spends per step
+#   goal_check   comparing the node against the goal
+#   expand       generating the neighbours and pushing them
+#   expand;push  one frontier push (append / heappush)
+# the sampled expansions take turns: one is timed as a whole, the next has each of its pushes timed (the search calls
+# its push through a local that expand_begin swaps for a timing wrapper), so neither number pays for the other.
+# the visualiser's draw_initial_map / draw_cell_content are traced the same way (draw_cell_content sampled every N calls).
+#
+# output, picked by the file name:
+#   *.json   Chrome trace events, open in chrome://tracing or https://ui.perfetto.dev (search and GUI on their own rows)
+#   other    collapsed stacks ("BFS (Graph);expand;append 12345" = self time in ns) for flamegraph.pl / speedscope,
+#            the sampled spans are scaled up by their sampling interval so the totals estimate the whole run
+#
+# usage:
+#   python batchRunner.py --mazes 20 --trace trace.json --trace-every 100
+#   python batchRunner.py --replay batch_outputs/batch_seeds_XXXX.txt --trace search.folded
+#   MAZE_TRACE=gui.json python main.py        trace the visualiser, written when the window is closed
+import functools
+import json
+import os
+import time
+from collections import defaultdict
+
+DEFAULT_TRACE_EVERY = 100
+
+# Stop recording after this many events, so a trace left on for a huge batch can't eat the memory
+DEFAULT_MAX_EVENTS = 1_000_000
+
+# Chrome trace rows
+SEARCH_TID = 1
+GUI_TID = 2
+
+# The process wide tracer run_search picks up, see set_tracer
+_active = None
+
+
+def set_tracer(tracer):
+    """Make tracer the one every run_search in this process reports to (None switches tracing off)."""
+    global _active
+    _active = tracer
+
+
+def active_tracer():
+    return _active
+
+
+class SearchTracer:
+    """Collects sampled spans, write() them out when done."""
+
+    def __init__(self, every: int = DEFAULT_TRACE_EVERY, *, max_events: int = DEFAULT_MAX_EVENTS):
+        self.every = max(1, int(every))
+        self.max_events = max_events
+        self.dropped = 0
+        self._origin = time.perf_counter_ns()
+        # (tid, stack, start_ns, end_ns, weight), stack = tuple of names root first
+        self._spans = []
+        self._run_label = "search"
+        self._run_start = None
+        self._gui_stack = []
+        self._calls = {}
+        self._expansions = 0
+        self._expand_start = None
+
+    # --- Search side ---
+
+    def begin_run(self, label: str):
+        self._run_label = label
+        self._run_start = time.perf_counter_ns()
+
+    def end_run(self):
+        if self._run_start is not None:
+            self._add(SEARCH_TID, (self._run_label,), self._run_start, time.perf_counter_ns(), 1)
+        self._run_start = None
+
+    def sampled(self, step: int) -> bool:
+        return not step % self.every
+
+    def span(self, name: str, start_ns: int, end_ns: int):
+        """A phase of a sampled search step."""
+        self._add(SEARCH_TID, (self._run_label, name), start_ns, end_ns, self.every)
+
+    def expand_begin(self, push):
+        """Start of a sampled expansion, returns the push function the search should use for it."""
+        self._expansions += 1
+        if self._expansions % 2:
+            self._expand_start = time.perf_counter_ns()
+            return push
+        self._expand_start = None
+        stack = (self._run_label, "expand", "push")
+        weight = 2 * self.every
+
+        def timed_push(*args):
+            start = time.perf_counter_ns()
+            push(*args)
+            self._add(SEARCH_TID, stack, start, time.perf_counter_ns(), weight)
+        return timed_push
+
+    def expand_end(self):
+        if self._expand_start is not None:
+            self._add(SEARCH_TID, (self._run_label, "expand"), self._expand_start, time.perf_counter_ns(),
+                      2 * self.every)
+
+    # --- GUI side ---
+
+    def sample_call(self, name: str) -> bool:
+        count = self._calls.get(name, 0)
+        self._calls[name] = count + 1
+        return not count % self.every
+
+    def _add(self, tid, stack, start_ns, end_ns, weight):
+        if len(self._spans) >= self.max_events:
+            self.dropped += 1
+            return
+        self._spans.append((tid, stack, start_ns, end_ns, weight))
+
+    # --- Output ---
+
+    def chrome_events(self):
+        events = [
+            {"ph": "M", "name": "thread_name", "pid": os.getpid(), "tid": SEARCH_TID, "args": {"name": "search"}},
+            {"ph": "M", "name": "thread_name", "pid": os.getpid(), "tid": GUI_TID, "args": {"name": "gui"}},
+        ]
+        for tid, stack, start, end, weight in self._spans:
+            events.append({"ph": "X", "name": stack[-1], "cat": "search" if tid == SEARCH_TID else "gui",
+                           "pid": os.getpid(), "tid": tid, "ts": (start - self._origin) / 1000,
+                           "dur": (end - start) / 1000, "args": {"stack": ";".join(stack), "sample_every": weight}})
+        return events
+
+    def collapsed(self):
+        """{stack: self time in ns}, sampled spans scaled by their sampling interval."""
+        totals = defaultdict(int)
+        for _, stack, start, end, weight in self._spans:
+            duration = (end - start) * weight
+            totals[stack] += duration
+            if len(stack) > 1:
+                totals[stack[:-1]] -= duration
+        return {stack: max(0, total) for stack, total in totals.items()}
+
+    def write(self, path):
+        """Write the trace, Chrome JSON for a .json path, collapsed stacks otherwise. Returns the number of spans."""
+        path = str(path)
+        with open(path, "w", encoding="utf-8") as fh:
+            if path.endswith(".json"):
+                json.dump({"traceEvents": self.chrome_events(), "displayTimeUnit": "ns"}, fh)
+            else:
+                for stack, total in sorted(self.collapsed().items()):
+                    if total:
+                        fh.write(f"{';'.join(stack)} {total}\n")
+        return len(self._spans)
+
+
+def traced(name: str, *, sample: bool = False):
+    """Decorator for visualiser methods: a span on the GUI row when self.tracer is set (sample = every N-th call)."""
+    def decorate(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            tracer = self.tracer
+            if tracer is None or (sample and not tracer.sample_call(name)):
+                return method(self, *args, **kwargs)
+            tracer._gui_stack.append(name)
+            start = time.perf_counter_ns()
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                stack = tuple(tracer._gui_stack)
+                tracer._gui_stack.pop()
+                tracer._add(GUI_TID, stack, start, time.perf_counter_ns(), tracer.every if sample else 1)
+        return wrapper
+    return decorate
@@ -0,0 +1,190 @@
+# Supervised search runs, every algorithm run gets its own child process with a CPU time and memory budget
+#
+# run_search's step and time limits are only checked between steps, so a search stuck inside one expansion
+# (e.g. UCS's linear queue scan once a Tree search has blown the heap up) can't be stopped by them.
+# Here the limits are enforced from outside the search:
+#   - the child sets RLIMIT_CPU (the kernel kills it once the CPU budget is used) and an address space limit
+#     (allocations past it raise MemoryError, which run_search records as "oom")
+#   - the parent polls the child's resident memory and CPU time and kills it when either goes over budget,
+#     with a wall clock deadline as a last resort. The memory budget is on top of the resident memory the child
+#     starts with (a forked child shares everything the parent had), the same base RLIMIT_AS is set from
+# a killed run is recorded with status "timeout" (CPU / wall clock) or "oom" (memory, or a SIGKILL from outside
+# while the CPU budget wasn't used up, which on Linux is the kernel's OOM killer)
+#
+# resource limits and /proc polling are Linux / Unix only, elsewhere only the wall clock deadline applies
+import multiprocessing
+import os
+import signal
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+import Maze
+from batchCore import RunMetrics, run_search
+
+# How often the parent checks on the child (seconds)
+POLL_INTERVAL = 0.02
+
+# Extra wall clock time on top of the CPU budget before the parent gives up on a child
+WALL_SLACK_SECONDS = 5.0
+
+DEFAULT_MEM_LIMIT_MB = 1024
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+_CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+# --- /proc readers (return None when the numbers are not available) ---
+
+def _statm(pid):
+    # (virtual size, resident size) in bytes
+    try:
+        with open(f"/proc/{pid}/statm") as fh:
+            fields = fh.read().split()
+        return int(fields[0]) * _PAGE_SIZE, int(fields[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _cpu_seconds(pid):
+    # user + system time of the process
+    try:
+        with open(f"/proc/{pid}/stat") as fh:
+            stat = fh.read()
+        # the command name is in brackets and can contain spaces, so split after it
+        fields = stat[stat.rindex(")") + 2:].split()
+        return (int(fields[11]) + int(fields[12])) / _CLOCK_TICKS
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+# --- Child side ---
+
+def _set_limits(cpu_seconds, mem_bytes):
+    if resource is None:
+        return
+
+    # CPU: SIGXCPU at the soft limit, SIGKILL a second later
+    used = resource.getrusage(resource.RUSAGE_SELF)
+    spent = int(used.ru_utime + used.ru_stime)
+    soft = spent + max(1, int(cpu_seconds + 0.999))
+    try:
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, soft + 1))
+    except (ValueError, OSError):
+        pass
+
+    # Memory: the budget on top of what the (forked) process already maps
+    # RSS is what the parent watches, the address space limit only backs it up so it is a bit generous
+    sizes = _statm(os.getpid())
+    base = sizes[0] if sizes else 0
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (base + mem_bytes, base + mem_bytes))
+    except (ValueError, OSError):
+        pass
+
+
+def _child(conn, maze, algo_choice, max_steps, time_limit_ns, cpu_seconds, mem_bytes, progress, base_rss):
+    # What the child holds before it runs anything, the parent measures the budget from here
+    sizes = _statm(os.getpid())
+    base_rss.value = sizes[1] if sizes else 0
+    _set_limits(cpu_seconds, mem_bytes)
+    try:
+        metrics = run_search(maze, algo_choice, max_steps=max_steps, time_limit_ns=time_limit_ns, progress=progress)
+        conn.send(metrics)
+    except MemoryError:
+        os._exit(3)
+    finally:
+        conn.close()
+
+
+# --- Parent side ---
+
+def _context():
+    # fork hands the child the maze without pickling it, use the platform default where fork doesn't exist
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context()
+
+
+def run_supervised(maze: Maze.Maze, algo_choice: str, *, cpu_seconds: float, mem_bytes: int,
+                   max_steps=None, time_limit_ns=None) -> RunMetrics:
+    """Run one algorithm in a child process that is killed if it goes over its CPU time or memory budget.
+
+    Returns the child's RunMetrics, or for a killed child a RunMetrics with status "timeout" / "oom",
+    the steps it had reached (roughly, see run_search's progress) and the wall time until it was killed.
+    """
+    ctx = _context()
+    receiver, sender = ctx.Pipe(duplex=False)
+    progress = ctx.Value("q", 0, lock=False)
+    # -1 until the child has recorded its starting resident memory
+    base_rss = ctx.Value("q", -1, lock=False)
+    child = ctx.Process(target=_child, args=(sender, maze, algo_choice, max_steps, time_limit_ns,
+                                             cpu_seconds, mem_bytes, progress, base_rss))
+
+    start_ns = time.perf_counter_ns()
+    child.start()
+    sender.close()
+
+    deadline = time.monotonic() + cpu_seconds + WALL_SLACK_SECONDS
+    status = None
+    cpu = None
+    try:
+        while True:
+            if receiver.poll(POLL_INTERVAL):
+                try:
+                    return receiver.recv()
+                except EOFError:
+                    # Child died before sending anything
+                    break
+
+            if not child.is_alive():
+                break
+
+            base = base_rss.value
+            sizes = _statm(child.pid) if base >= 0 else None
+            if sizes is not None and sizes[1] - base > mem_bytes:
+                status = "oom"
+            polled = _cpu_seconds(child.pid)
+            if polled is not None:
+                cpu = polled
+                if cpu > cpu_seconds:
+                    status = "timeout"
+            if time.monotonic() > deadline:
+                status = "timeout"
+
+            if status is not None:
+                child.kill()
+                break
+    finally:
+        child.join()
+        receiver.close()
+
+    if status is None:
+        # Killed by the kernel or bailed out of a MemoryError. SIGXCPU is the CPU limit, a SIGKILL is the hard CPU
+        # limit only if the CPU budget had been used up, otherwise it came from the OOM killer
+        sigxcpu = getattr(signal, "SIGXCPU", None)
+        sigkill = getattr(signal, "SIGKILL", None)
+        if sigxcpu is not None and child.exitcode == -sigxcpu:
+            status = "timeout"
+        elif sigkill is not None and child.exitcode == -sigkill:
+            status = "timeout" if cpu is not None and cpu >= cpu_seconds else "oom"
+        elif child.exitcode == 3:
+            status = "oom"
+        else:
+            status = "error"
+
+    return RunMetrics(
+        algo_choice=algo_choice,
+        search_type="Tree" if "(Tree)" in algo_choice else "Graph",
+        status=status,
+        steps=int(progress.value),
+        unique_visited=0,
+        repeats=0,
+        reported_time_ns=0,
+        wall_time_ns=max(0, time.perf_counter_ns() - start_ns),
+        avg_mem_bytes=0.0,
+        path_len=None,
+    )
@@ -0,0 +1,111 @@
+# Lazy reading of replay seeds files, so a replay of a huge corpus runs in constant memory
+#
+# a replay source is one or more seeds files (the batch_seeds_*.txt a batch writes), each either plain text or
+# gzip compressed (detected from the file itself, not its name). Sources can be given as:
+#   - a file:       batch_seeds_XXXX.txt / corpus.txt.gz
+#   - a directory:  every *.txt / *.txt.gz file in it, in name order (the shards of one corpus)
+#   - a glob:       "corpus/shard_*.txt.gz"
+# the shards are read one after the other as a single stream of tokens.
+#
+# every non-empty, non-comment line gets an index (its place in the whole stream, invalid lines included), which is
+# what start / stride and a resumed batch refer to. With stride N and start K (0 <= K < N) worker K only reads
+# every Nth line, so N workers or machines can split one corpus between them.
+import csv
+import glob
+import gzip
+import os
+from pathlib import Path
+
+import columnarResults
+from batchCore import decode_seed_token
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+SHARD_PATTERNS = ("*.txt", "*.txt.gz")
+
+# Batch / sweep result files in a directory (aggregateResults, resultsStore): CSVs and columnar files
+RESULT_PATTERNS = ("*.csv", "*.csv.gz", "*" + columnarResults.SUFFIX)
+
+
+def expand_seed_paths(sources, patterns=SHARD_PATTERNS):
+    """Turn a path / directory / glob (or a list of them) into the list of seeds files to read, in order.
+
+    patterns are the file names picked up from a directory.
+    """
+    if isinstance(sources, (str, os.PathLike)):
+        sources = [sources]
+
+    paths = []
+    for source in sources:
+        source = str(source)
+        if os.path.isdir(source):
+            shards = set()
+            for pattern in patterns:
+                shards.update(Path(source).glob(pattern))
+            paths.extend(sorted(str(p) for p in shards))
+        elif glob.has_magic(source):
+            paths.extend(sorted(glob.glob(source)))
+        else:
+            paths.append(source)
+    return paths
+
+
+def open_seeds_file(path, newline=None):
+    """Open a seeds file (or any other text file) for reading, gzip or not."""
+    with open(path, "rb") as fh:
+        magic = fh.read(2)
+    if magic == GZIP_MAGIC:
+        return gzip.open(path, "rt", encoding="utf-8", newline=newline)
+    return open(path, encoding="utf-8", newline=newline)
+
+
+def iter_result_rows(path):
+    """Rows of a result file as dicts: a CSV (plain or gzip) or a columnar .mzcol file."""
+    if str(path).endswith(columnarResults.SUFFIX):
+        yield from columnarResults.iter_rows(path)
+        return
+    with open_seeds_file(path, newline="") as fh:
+        yield from csv.DictReader(fh)
+
+
+class SeedStream:
+    """Iterates (index, token) over the valid tokens of one or more seeds files, reading one line at a time.
+
+    invalid counts the lines this stream skipped because they weren't seed tokens (only the lines it was meant to
+    read, i.e. the ones matching start / stride), tokens counts what it handed out.
+    """
+
+    def __init__(self, sources, *, start: int = 0, stride: int = 1, first_index: int = 0):
+        if stride < 1:
+            raise ValueError("stride must be at least 1")
+        if not 0 <= start < stride:
+            raise ValueError("start must be between 0 and stride - 1")
+        self.paths = expand_seed_paths(sources)
+        if not self.paths:
+            raise ValueError(f"No seeds files found for {sources}")
+        self.start = start
+        self.stride = stride
+        # Lines before this index are skipped without being decoded (resuming a replay)
+        self.first_index = first_index
+        self.invalid = 0
+        self.tokens = 0
+
+    def _lines(self):
+        # Every non-empty, non-comment line of every shard, in order
+        for path in self.paths:
+            with open_seeds_file(path) as fh:
+                for line in fh:
+                    line = line.strip()
+                    if not line or line.startswith("#"):
+                        continue
+                    yield line
+
+    def __iter__(self):
+        for index, line in enumerate(self._lines()):
+            if index < self.first_index or (index - self.start) % self.stride:
+                continue
+            if decode_seed_token(line) is None:
+                self.invalid += 1
+                continue
+            self.tokens += 1
+            yield index, line
@@ -0,0 +1,397 @@
+# Parameter sweep scheduler for batch experiments
+#
+# A random batch run picks wall% / one-way% uniformly below two maxima and runs a fixed number of mazes, so every
+# part of the parameter space gets the same number of runs whether its results are still noisy or long settled.
+# Here the space is split into cells (every combination of wall%, one-way%, maze size and max cost from a sweep spec)
+# and runs are handed out in rounds:
+#   - every cell first gets --min-runs runs
+#   - a cell is finished once the 95% confidence interval of the mean of the watched metric is within --precision
+#     (relative) of the mean, for every algorithm, or it hit --max-runs
+#   - each round spreads --round-size runs over the unfinished cells, in proportion to how many more runs each one
+#     still needs at its current variance
+# quiet cells stop early and the runs go where the variance is, so the same precision costs far fewer runs
+#
+# usage:
+#   python sweepScheduler.py --wall 0:40:10 --oneway 0,10,20 --sizes 14x10,28x20 --metric steps --precision 0.05
+#   python sweepScheduler.py --spec sweep.json
+# a spec file holds the same keys: {"wall": [0, 10, 20], "oneway": "0:30:10", "sizes": ["14x10"], "max_cost": [5]}
+import argparse
+import csv
+import itertools
+import json
+import math
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import Maze
+import SearchWorkspace
+from batchCore import ALGO_OPTIONS, CSV_FIELDNAMES, encode_seed_token, make_row, time_limit_ns_from_seconds
+from batchRunner import run_maze
+
+# Same columns as the batch CSV, the (v2) seed token carries the cell's size and max cost along with wall% / one-way%
+# (aggregateResults and resultsStore read them from there, and still take the width / height / max_cost columns
+# sweeps written before the v2 token had)
+SWEEP_FIELDNAMES = CSV_FIELDNAMES
+
+# RunMetrics fields that can be watched for precision
+METRICS = ("steps", "unique_visited", "repeats", "path_len", "path_cost", "wall_time_ns", "reported_time_ns",
+           "generated", "expanded", "pushes", "peak_frontier", "frontier_bytes", "traced_bytes")
+
+Z_95 = 1.959964
+
+# Maze + workspace per size, reused by every run in this process
+_process_state = {}
+
+
+class RunningStats:
+    """Mean and variance in one pass (Welford), so a cell's stats never need its old samples."""
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def add(self, value):
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self._m2 += delta * (value - self.mean)
+
+    @property
+    def variance(self):
+        return self._m2 / (self.n - 1) if self.n > 1 else 0.0
+
+    def ci_half_width(self, z=Z_95):
+        return z * math.sqrt(self.variance / self.n) if self.n > 1 else math.inf
+
+    def relative_precision(self, z=Z_95):
+        """CI half width as a fraction of the mean, 0 for a constant metric (nothing left to learn)."""
+        if self.n < 2:
+            return math.inf
+        if self.variance == 0:
+            return 0.0
+        return self.ci_half_width(z) / abs(self.mean) if self.mean else math.inf
+
+    def runs_needed(self, precision, z=Z_95):
+        """Total runs for the CI to shrink to precision, going by the variance seen so far."""
+        if self.n < 2:
+            return math.inf
+        if self.variance == 0:
+            return self.n
+        if not self.mean:
+            return math.inf
+        return math.ceil((z * math.sqrt(self.variance) / (precision * abs(self.mean))) ** 2)
+
+
+# --- Sweep spec ---
+
+def parse_values(spec, cast=int):
+    """A list of values from a list, a "a,b,c" string or an inclusive "start:stop:step" range."""
+    if isinstance(spec, (list, tuple)):
+        return [cast(v) for v in spec]
+    if isinstance(spec, (int, float)):
+        return [cast(spec)]
+    spec = str(spec).strip()
+    if ":" in spec:
+        parts = [float(p) for p in spec.split(":")]
+        start, stop = parts[0], parts[1]
+        step = parts[2] if len(parts) > 2 else 1
+        if step <= 0:
+            raise ValueError(f"Range step must be positive: {spec}")
+        count = int(math.floor((stop - start) / step + 1e-9)) + 1
+        return [cast(start + i * step) for i in range(max(0, count))]
+    return [cast(v) for v in spec.split(",") if v.strip()]
+
+
+def parse_size(text):
+    width, _, height = str(text).lower().partition("x")
+    return int(width), int(height)
+
+
+def build_cells(spec):
+    """Every (wall, oneway, width, height, max_cost) combination of a spec, skipping ones over 100%."""
+    walls = parse_values(spec.get("wall", "0:30:10"))
+    oneways = parse_values(spec.get("oneway", "0:30:10"))
+    sizes = spec.get("sizes", ["14x10"])
+    if isinstance(sizes, str):
+        sizes = [s for s in sizes.split(",") if s.strip()]
+    sizes = [parse_size(s) for s in sizes]
+    max_costs = parse_values(spec.get("max_cost", [5]))
+
+    cells = []
+    for wall, oneway, (width, height), max_cost in itertools.product(walls, oneways, sizes, max_costs):
+        if wall < 0 or oneway < 0 or wall + oneway > 100 or max_cost < 0:
+            continue
+        cells.append((wall, oneway, width, height, max_cost))
+    return cells
+
+
+def parse_algorithms(text):
+    """Algorithm labels from --algorithms, BFS (Graph) always runs first as it decides if a maze is solvable."""
+    if text == "all":
+        return list(ALGO_OPTIONS)
+    if not text:
+        algorithms = [algo for algo in ALGO_OPTIONS if "(Graph)" in algo]
+    else:
+        algorithms = [a.strip() for a in text.split(",") if a.strip()]
+        unknown = [a for a in algorithms if a not in ALGO_OPTIONS]
+        if unknown:
+            raise ValueError(f"Unknown algorithm(s): {', '.join(unknown)}")
+    return ["BFS (Graph)"] + [a for a in algorithms if a != "BFS (Graph)"]
+
+
+def cell_label(cell):
+    wall, oneway, width, height, max_cost = cell
+    return f"wall {wall}% oneway {oneway}% {width}x{height} cost<={max_cost}"
+
+
+# --- Running ---
+
+def evaluate_cell_run(cell, rng_seed, time_limit_ns, algorithms):
+    """One maze of a cell with every algorithm on it, returns the list of RunMetrics (see batchRunner.run_maze)."""
+    wall, oneway, width, height, max_cost = cell
+    key = (width, height)
+    if key not in _process_state:
+        maze = Maze.Maze.blank(width, height)
+        _process_state.clear()
+        _process_state[key] = (maze, SearchWorkspace.SearchWorkspace.for_maze(maze))
+    maze, workspace = _process_state[key]
+
+    maze.randomize(wall, oneway, max_cost_rng=max_cost, seed=rng_seed)
+    return run_maze(maze, workspace, time_limit_ns, algorithms=algorithms, precheck=True)
+
+
+def _evaluate_job(job):
+    return evaluate_cell_run(*job)
+
+
+class CellState:
+    """Runs and running stats of one cell of the sweep."""
+
+    def __init__(self, cell, seed):
+        self.cell = cell
+        # Each cell draws its mazes from its own stream, so what a cell gets doesn't depend on the scheduling order
+        self.rng = random.Random(f"{seed}:{cell}")
+        self.runs = 0
+        self.rejected = 0
+        self.stats = {}
+        self.finished = False
+
+    def next_seed(self):
+        return self.rng.getrandbits(128)
+
+    def add(self, results, metric):
+        self.runs += 1
+        for metrics in results:
+            value = getattr(metrics, metric)
+            if value is not None:
+                self.stats.setdefault(metrics.algo_choice, RunningStats()).add(value)
+
+    def precision(self):
+        # The worst algorithm decides
+        if not self.stats:
+            return math.inf
+        return max(s.relative_precision() for s in self.stats.values())
+
+    def runs_needed(self, precision):
+        if not self.stats:
+            return math.inf
+        return max(s.runs_needed(precision) for s in self.stats.values())
+
+
+def allocate(states, round_size, precision, max_runs):
+    """Split round_size runs over the unfinished cells in proportion to how many more runs each still needs."""
+    open_states = [s for s in states if not s.finished]
+    if not open_states:
+        return {}
+
+    needs = {}
+    for state in open_states:
+        needed = state.runs_needed(precision)
+        extra = max_runs - state.runs if math.isinf(needed) else min(needed, max_runs) - state.runs
+        needs[state.cell] = max(1, extra)
+
+    total = sum(needs.values())
+    plan = {}
+    for state in open_states:
+        share = max(1, round(round_size * needs[state.cell] / total))
+        plan[state.cell] = min(share, needs[state.cell], max_runs - state.runs)
+    return plan
+
+
+def run_sweep(args, spec, writer=None, log=print):
+    """Run the sweep, returns the cell states. writer gets one CSV row per algorithm run."""
+    cells = build_cells(spec)
+    if not cells:
+        raise ValueError("The sweep spec has no valid cells")
+    states = [CellState(cell, args.seed) for cell in cells]
+    algorithms = parse_algorithms(args.algorithms)
+    time_limit_ns = time_limit_ns_from_seconds(args.time_limit)
+    executor = ProcessPoolExecutor(max_workers=args.workers) if args.workers > 1 else None
+
+    def run_jobs(jobs):
+        if executor is None:
+            return [_evaluate_job(job) for job in jobs]
+        return list(executor.map(_evaluate_job, jobs))
+
+    try:
+        plan = {state.cell: args.min_runs for state in states}
+        round_no = 0
+        # Numbered across the whole sweep like a batch's run_id, state.runs restarts at 1 in every cell
+        run_id = 0
+        while plan:
+            round_no += 1
+
+            # Draw every maze of the round up front, in cell order, then run them (possibly in parallel)
+            by_cell = {state.cell: state for state in states}
+            jobs = []
+            for cell, count in plan.items():
+                for _ in range(count):
+                    jobs.append((cell, by_cell[cell].next_seed(), time_limit_ns, algorithms))
+
+            for (cell, rng_seed, _, _), results in zip(jobs, run_jobs(jobs)):
+                state = by_cell[cell]
+                if not results or results[0].status != "success":
+                    # Unsolvable maze, same as a random batch: it doesn't count
+                    state.rejected += 1
+                    continue
+                state.add(results, args.metric)
+                run_id += 1
+
+                if writer is not None:
+                    wall, oneway, width, height, max_cost = cell
+                    token = encode_seed_token(rng_seed=rng_seed, wall_percentage=wall, oneway_percentage=oneway,
+                                              width=width, height=height, max_cost=max_cost)
+                    for metrics in results:
+                        writer.writerow(make_row(run_id, token, wall, oneway, metrics))
+
+            for state in states:
+                if state.finished:
+                    continue
+                if state.runs >= args.min_runs and (state.precision() <= args.precision or state.runs >= args.max_runs):
+                    state.finished = True
+                elif state.rejected >= args.max_runs:
+                    # (Almost) nothing in this cell is solvable, give up on it
+                    state.finished = True
+
+            done = sum(s.finished for s in states)
+            total_runs = sum(s.runs for s in states)
+            log(f"Round {round_no}: {total_runs} runs, {done}/{len(states)} cells finished")
+
+            plan = allocate(states, args.round_size, args.precision, args.max_runs)
+            # Cells still short of their minimum (after rejected mazes) top up first
+            for state in states:
+                if not state.finished and state.runs < args.min_runs:
+                    plan[state.cell] = max(plan.get(state.cell, 0), args.min_runs - state.runs)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+    return states
+
+
+def summary(states, args):
+    cells = []
+    for state in states:
+        wall, oneway, width, height, max_cost = state.cell
+        cells.append({
+            "wall_pct": wall,
+            "oneway_pct": oneway,
+            "width": width,
+            "height": height,
+            "max_cost": max_cost,
+            "runs": state.runs,
+            "rejected": state.rejected,
+            "finished": state.finished,
+            "precision": None if math.isinf(state.precision()) else state.precision(),
+            "algorithms": {
+                algo: {"n": s.n, "mean": s.mean, "stdev": math.sqrt(s.variance),
+                       "ci95_half_width": None if math.isinf(s.ci_half_width()) else s.ci_half_width()}
+                for algo, s in state.stats.items()
+            },
+        })
+    total = sum(s.runs for s in states)
+    fixed = len(states) * args.max_runs
+    return {
+        "metric": args.metric,
+        "precision_target": args.precision,
+        "min_runs": args.min_runs,
+        "max_runs": args.max_runs,
+        "seed": args.seed,
+        "total_runs": total,
+        "fixed_design_runs": fixed,
+        "cells": cells,
+    }
+
+
+def print_summary(states, args):
+    print()
+    print(f"{'cell':<38} {'runs':>5} {'rejected':>8} {'rel. CI':>8}  done")
+    for state in states:
+        precision = state.precision()
+        shown = "-" if math.isinf(precision) else f"{precision:.1%}"
+        print(f"{cell_label(state.cell):<38} {state.runs:>5} {state.rejected:>8} {shown:>8}  "
+              f"{'yes' if state.finished else 'no'}")
+    total = sum(s.runs for s in states)
+    print(f"\n{total} runs in total, a fixed design of {args.max_runs} runs per cell would take {len(states) * args.max_runs}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Adaptive parameter sweep over maze generation settings.")
+    parser.add_argument("--spec", help="JSON sweep spec (the options below override its keys)")
+    parser.add_argument("--wall", help="wall %% values, e.g. 0,10,20 or 0:40:10 (default 0:30:10)")
+    parser.add_argument("--oneway", help="one-way %% values (default 0:30:10)")
+    parser.add_argument("--sizes", help="maze sizes, e.g. 14x10,28x20 (default 14x10)")
+    parser.add_argument("--max-cost", help="max cell cost values for randomize (default 5)")
+    parser.add_argument("--algorithms", help="comma separated algorithm labels, or 'all' (default: the Graph searches)")
+    parser.add_argument("--metric", choices=METRICS, default="steps", help="metric whose precision is tracked (default steps)")
+    parser.add_argument("--precision", type=float, default=0.05,
+                        help="target CI half width relative to the mean (default 0.05)")
+    parser.add_argument("--min-runs", type=int, default=5, help="runs every cell gets first (default 5)")
+    parser.add_argument("--max-runs", type=int, default=200, help="most runs a cell can get (default 200)")
+    parser.add_argument("--round-size", type=int, default=50, help="runs handed out per round (default 50)")
+    parser.add_argument("--seed", default="0", help="master seed, the same seed gives the same mazes (default 0)")
+    parser.add_argument("--time-limit", default="180", help="per algorithm time limit in seconds (default 180)")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes (default 1)")
+    parser.add_argument("--out-dir", default="batch_outputs", help="where the CSV + summary go")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.min_runs < 2 or args.max_runs < args.min_runs:
+        print("Sweep: need 2 <= --min-runs <= --max-runs", file=sys.stderr)
+        return 2
+
+    spec = {}
+    if args.spec:
+        spec = json.loads(Path(args.spec).read_text(encoding="utf-8"))
+    for key, value in (("wall", args.wall), ("oneway", args.oneway), ("sizes", args.sizes), ("max_cost", args.max_cost)):
+        if value is not None:
+            spec[key] = value
+
+    out_dir = Path(args.out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    csv_path = out_dir / f"sweep_results_{stamp}.csv"
+    summary_path = out_dir / f"sweep_summary_{stamp}.json"
+
+    with open(csv_path, "w", newline="", encoding="utf-8") as fh:
+        writer = csv.DictWriter(fh, fieldnames=SWEEP_FIELDNAMES)
+        writer.writeheader()
+        try:
+            states = run_sweep(args, spec, writer)
+        except ValueError as e:
+            print(f"Sweep: {e}", file=sys.stderr)
+            return 2
+
+    summary_path.write_text(json.dumps(summary(states, args), indent=2), encoding="utf-8")
+    print_summary(states, args)
+    print(f"CSV: {csv_path} | Summary: {summary_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())